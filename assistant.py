@@ -1,73 +1,173 @@
 #!/usr/bin/env python3
 import os
 import re
-import requests
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, List, Optional
 
+import tracing
+from llm_backends import LLMRouter
+from skills.base import Scope, scoped
 from skills.todos import TodoSkill
 from skills.summarizer import SummarizerSkill
 from skills.rag import RAGSkill
 from skills.health_triage import HealthTriageSkill
 
+MAX_PER_USER = int(os.getenv("PA_MAX_PER_USER", "2"))    # concurrent requests per user (0 = unlimited)
+MAX_PER_GUILD = int(os.getenv("PA_MAX_PER_GUILD", "8"))  # concurrent requests per guild (0 = unlimited)
+
+# Commands with side effects always run once per caller
+_NO_COALESCE = (
+    "todo add", "todo done", "todo clear", "rag add", "rag index", "rag clear", "rag import", "rag export",
+    "rag watch", "rag unwatch", "rag shards unload", "rag jobs cancel", "rag restore",
+)
+
+
+class _Flight:
+    """One in-flight computation shared by every caller asking the same thing"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class _ConcurrencyLimits:
+    """Non-blocking per-user / per-guild in-flight counters"""
+
+    def __init__(self, per_user: int = MAX_PER_USER, per_guild: int = MAX_PER_GUILD):
+        self.per_user = per_user
+        self.per_guild = per_guild
+        self._active: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _keys(self, user: Optional[str], guild: Optional[str]):
+        keys = []
+        if user and self.per_user > 0:
+            keys.append((f"user:{user}", self.per_user))
+        if guild and self.per_guild > 0:
+            keys.append((f"guild:{guild}", self.per_guild))
+        return keys
+
+    def acquire(self, user: Optional[str], guild: Optional[str]) -> Optional[str]:
+        """Take a slot for the caller; returns the exhausted scope instead if one is full"""
+        keys = self._keys(user, guild)
+        with self._lock:
+            for key, limit in keys:
+                if self._active.get(key, 0) >= limit:
+                    return key.split(":", 1)[0]
+            for key, _ in keys:
+                self._active[key] = self._active.get(key, 0) + 1
+        return None
+
+    def release(self, user: Optional[str], guild: Optional[str]):
+        with self._lock:
+            for key, _ in self._keys(user, guild):
+                left = self._active.get(key, 0) - 1
+                if left > 0:
+                    self._active[key] = left
+                else:
+                    self._active.pop(key, None)
+
+
 class Assistant:
     def __init__(self):
+        self.llm = LLMRouter.from_env()
         self.skills = [
             TodoSkill(),
             SummarizerSkill(),
-            RAGSkill(),
+            RAGSkill(llm=self.llm),
             HealthTriageSkill(),
         ]
+        self.limits = _ConcurrencyLimits()
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+
+    def readiness(self) -> Dict[str, Any]:
+        """Warm-up state of skills that load in the background"""
+        skills = {s.name: s.warmup_status() for s in self.skills if hasattr(s, "warmup_status")}
+        return {"ready": all(st["ready"] for st in skills.values()), "skills": skills}
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until background warm-up finished (for one-shot scripts)"""
+        return all(s.wait_ready(timeout) for s in self.skills if hasattr(s, "wait_ready"))
 
-    def handle(self, query: str) -> Dict[str, Any]:
+    def handle(self, query: str, user: Optional[str] = None, guild: Optional[str] = None,
+               trace: bool = False, profile: bool = False, channel: Optional[str] = None,
+               namespace: Optional[str] = None, operator: bool = False) -> Dict[str, Any]:
+        """Answer one query; trace=True attaches the request's timing spans.
+
+        Skills see the caller as skills.base.current_scope() (user, guild,
+        channel, namespace) and partition their data by it. Concurrent
+        identical (normalized) read-only queries within one partition share a
+        single computation. New work is refused with a "busy" answer while the
+        caller's user or guild is at its concurrency limit. operator=True lets
+        the caller read every tenant's data; only trusted entry points set it.
+        """
         q = (query or "").strip()
-        for s in self.skills:
-            if s.can_handle(q):
-                result = s.handle(q)
-                return {"answer": result, "skill": s.name}
+        ids = [None if v is None else str(v) for v in (user, guild, channel)]
+        scope = Scope(*ids, namespace=namespace or None, operator=operator)
+        with scoped(scope), tracing.request("ask", profile=profile) as tr:
+            out = self._single_flight(q, scope.user, scope.guild)
+        if trace:
+            out["trace"] = tr.to_dict()
+        return out
+
+    def _flight_key(self, q: str) -> Optional[str]:
+        key = " ".join(q.lower().split())
+        if not key or key.startswith(_NO_COALESCE):
+            return None
+        # Never hand one tenant's answer to another
+        skill = next((s for s in self.skills if s.can_handle(q)), None)
+        partition = getattr(skill, "partition_key", None)
+        return f"{partition(q)}|{key}" if partition else key
+
+    def _single_flight(self, q: str, user: Optional[str], guild: Optional[str]) -> Dict[str, Any]:
+        key = self._flight_key(q)
+        with self._flights_lock:
+            flight = self._flights.get(key) if key else None
+            if flight is not None:
+                flight.followers += 1
+            else:
+                full = self.limits.acquire(user, guild)
+                if full:
+                    return {"answer": f"⏳ Busy: too many requests in flight for this {full}, try again shortly.",
+                            "skill": "busy"}
+                leader = _Flight()
+                if key:
+                    self._flights[key] = leader
+        if flight is not None:
+            with tracing.span("coalesced"):
+                flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return dict(flight.result, coalesced=True)
+        try:
+            leader.result = self._dispatch(q)
+            return dict(leader.result)
+        except BaseException as e:
+            leader.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                if key and self._flights.get(key) is leader:
+                    del self._flights[key]
+            self.limits.release(user, guild)
+            leader.done.set()
+
+    def _dispatch(self, q: str) -> Dict[str, Any]:
+        if q.lower() == "llm status":
+            return {"answer": self.llm.status_text(), "skill": "llm"}
+        with tracing.span("dispatch"):
+            skill = next((s for s in self.skills if s.can_handle(q)), None)
+        if skill is not None:
+            with tracing.span(f"skill.{skill.name}"):
+                result = skill.handle(q)
+            return {"answer": result, "skill": skill.name}
         # fallback to LLM if configured
         llm_answer = self._llm_answer(q)
         return {"answer": llm_answer, "skill": "llm"}
 
     def _llm_answer(self, prompt: str) -> str:
-        # Try Ollama first
-        base = os.getenv("OLLAMA_BASE_URL")
-        model = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
-        if base:
-            try:
-                r = requests.post(
-                    f"{base.rstrip('/')}/api/generate",
-                    json={"model": model, "prompt": prompt, "stream": False},
-                    timeout=30,
-                )
-                if r.ok:
-                    return (r.json() or {}).get("response", "")
-            except Exception:
-                pass
-        # Then OpenAI-compatible
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key:
-            base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com")
-            model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-            try:
-                r = requests.post(
-                    f"{base_url.rstrip('/')}/v1/chat/completions",
-                    headers={"Authorization": f"Bearer {api_key}"},
-                    json={
-                        "model": model,
-                        "messages": [
-                            {"role": "system", "content": "You are a concise personal assistant."},
-                            {"role": "user", "content": prompt},
-                        ],
-                        "temperature": 0.2,
-                    },
-                    timeout=30,
-                )
-                if r.ok:
-                    data = r.json()
-                    return (data.get("choices", [{}])[0]
-                                .get("message", {})
-                                .get("content", ""))
-            except Exception:
-                pass
-        # Final fallback
-        return "(LLM not configured)"
+        with tracing.span("llm"):
+            return self.llm.generate(prompt)
@@ -1,14 +1,32 @@
 #!/usr/bin/env python3
+from typing import Optional
+
 import typer
 from assistant import Assistant
 
 app = typer.Typer()
 assistant = Assistant()
+namespace: Optional[str] = None
+operator = False
+
+def _handle(query: str):
+    return assistant.handle(query, namespace=namespace, operator=operator)
+
+@app.callback()
+def main(ns: Optional[str] = typer.Option(None, "--namespace", "-n", envvar="PA_NAMESPACE",
+                                          help="RAG index partition to work in"),
+         op: bool = typer.Option(False, "--operator", envvar="PA_OPERATOR",
+                                 help="Read every tenant's shards (rag ask --all, rag jobs, rag shards)")):
+    global namespace, operator
+    namespace = ns
+    operator = op
+    # One-shot commands should see the loaded index, not a "warming" reply
+    assistant.wait_ready()
 
 @app.command()
 def ask(query: str):
     """Ask the personal assistant a question."""
-    result = assistant.handle(query)
+    result = _handle(query)
     typer.echo(result["answer"]) 
 
 @app.command()
@@ -24,34 +42,71 @@ def shell():
             break
         if not line:
             continue
-        res = assistant.handle(line)
+        res = _handle(line)
         typer.echo(res.get("answer", ""))
 
 @app.command()
 def watch(cmd: str = typer.Argument(..., help="Command to run repeatedly"), every: int = typer.Option(60, help="Seconds between runs")):
     """Run a command repeatedly at an interval."""
-    import time
+    import asyncio
+    from scheduler import Job, Scheduler
     typer.echo(f"Watching: {cmd} (every {every}s)")
-    while True:
-        res = assistant.handle(cmd)
-        typer.echo(res.get("answer", ""))
-        time.sleep(every)
+    try:
+        scheduler = Scheduler(assistant, [Job("watch", cmd, every)], echo=typer.echo,
+                              namespace=namespace, operator=operator)
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        pass
+
+@app.command()
+def schedule(config: str = typer.Argument(..., help="JSON file listing jobs"),
+             iterations: int = typer.Option(0, help="Stop after N runs per job (0 = forever)")):
+    """Run many scheduled commands concurrently from a config file."""
+    import asyncio
+    from scheduler import Scheduler, load_jobs
+    try:
+        jobs = load_jobs(config)
+    except (OSError, ValueError) as e:
+        typer.echo(f"Invalid schedule: {e}")
+        raise typer.Exit(1)
+    for job in jobs:
+        typer.echo(f"Scheduled: {job.name} -> {job.cmd} (every {job.every:g}s, output {job.output})")
+    try:
+        scheduler = Scheduler(assistant, jobs, echo=typer.echo, namespace=namespace, operator=operator)
+        asyncio.run(scheduler.run(iterations or None))
+    except KeyboardInterrupt:
+        pass
 
 rag_app = typer.Typer(help="RAG commands")
 
 @rag_app.command("add")
 def rag_add(path: str):
-    res = assistant.handle(f"rag add {path}")
+    res = _handle(f"rag add --wait {path}")
     typer.echo(res.get("answer", ""))
 
 @rag_app.command("ask")
 def rag_ask(question: str):
-    res = assistant.handle(f"rag ask {question}")
+    res = _handle(f"rag ask {question}")
+    typer.echo(res.get("answer", ""))
+
+@rag_app.command("answer")
+def rag_answer(question: str):
+    res = _handle(f"rag answer {question}")
     typer.echo(res.get("answer", ""))
 
 @rag_app.command("status")
 def rag_status():
-    res = assistant.handle("rag status")
+    res = _handle("rag status")
+    typer.echo(res.get("answer", ""))
+
+@rag_app.command("export")
+def rag_export(path: str = typer.Argument("", help="Target directory (default: rag_storage/exports/...)")):
+    res = _handle(f"rag export {path}".strip())
+    typer.echo(res.get("answer", ""))
+
+@rag_app.command("import")
+def rag_import(path: str):
+    res = _handle(f"rag import {path}")
     typer.echo(res.get("answer", ""))
 
 app.add_typer(rag_app, name="rag")
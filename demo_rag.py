@@ -26,7 +26,7 @@ def demo_rag():
     
     # Add some sample documents
     print("\n📄 Adding test document...")
-    result = rag.handle("rag add test_doc.md")
+    result = rag.handle("rag add --wait test_doc.md")
     print(result)
     
     # Create another test document
@@ -56,7 +56,7 @@ Applications:
 """)
     
     print(f"\n📄 Adding sample knowledge document...")
-    result = rag.handle(f"rag add {sample_doc}")
+    result = rag.handle(f"rag add --wait {sample_doc}")
     print(result)
     
     # Show updated status
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 import os
+import asyncio
+import functools
 import discord
 from discord.ext import commands
 from discord import app_commands
@@ -37,9 +39,44 @@ _dlogger.propagate = False
 
 MAX_REPLY = 1800
 
+async def _handle(query: str, user_id=None, guild_id=None, channel_id=None):
+    """Run Assistant.handle on a worker thread so slow LLM calls never stall the gateway"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(assistant.handle, query,
+                             user=str(user_id) if user_id else None, guild=str(guild_id) if guild_id else None,
+                             channel=str(channel_id) if channel_id else None)
+    return await loop.run_in_executor(None, call)
+
+async def _index_attachments(attachments, user_id, guild_id, channel_id, suffix: str = ""):
+    """Index .txt/.md/.json attachments; returns (indexed count, ["name (reason)", ...] skipped)"""
+    count = 0
+    skipped = []
+    for a in attachments:
+        fname = a.filename or "attachment"
+        low = fname.lower()
+        if not (low.endswith(".txt") or low.endswith(".md") or low.endswith(".json")):
+            skipped.append(f"{fname} (unsupported type)")
+            continue
+        try:
+            data = await a.read()
+            text = data.decode("utf-8", errors="ignore")
+            doc_id = f"discord:{fname}{suffix}"
+            res = await _handle(f"rag add_text {doc_id} :: {text}", user_id, guild_id, channel_id)
+        except Exception as e:
+            skipped.append(f"{fname} (error: {e})")
+            continue
+        # Warming up, busy and queue-full replies come back as answers, not exceptions
+        answer = (res.get("answer") or "").strip()
+        if res.get("skill") == "rag" and answer.startswith("Added"):
+            count += 1
+        else:
+            skipped.append(f"{fname} ({answer or 'no reply'})")
+    return count, skipped
+
 @bot.event
 async def on_ready():
-    msg = f"Assistant bot online as {bot.user}"
+    warm = "ready" if assistant.readiness()["ready"] else "index still warming up"
+    msg = f"Assistant bot online as {bot.user} ({warm})"
     print(msg)
     logger.info(msg)
     # Sync application (slash) commands
@@ -63,7 +100,7 @@ async def on_ready():
 
 @bot.command(name="ask")
 async def ask(ctx: commands.Context, *, question: str):
-    res = assistant.handle(question)
+    res = await _handle(question, ctx.author.id, getattr(ctx.guild, "id", None), ctx.channel.id)
     text = res.get("answer", "").strip() or "(no answer)"
     if len(text) > MAX_REPLY:
         text = text[:MAX_REPLY] + "..."
@@ -71,7 +108,7 @@ async def ask(ctx: commands.Context, *, question: str):
 
 @bot.command(name="rag_add")
 async def rag_add(ctx: commands.Context, *, path: str):
-    res = assistant.handle(f"rag add {path}")
+    res = await _handle(f"rag add {path}", ctx.author.id, getattr(ctx.guild, "id", None), ctx.channel.id)
     text = res.get("answer", "") or "(done)"
     if len(text) > MAX_REPLY:
         text = text[:MAX_REPLY] + "..."
@@ -80,13 +117,14 @@ async def rag_add(ctx: commands.Context, *, path: str):
 @bot.tree.command(name="rag_add", description="Index files from a server path (.txt/.md/.json)")
 @app_commands.describe(path="Absolute or relative path on the bot host")
 async def rag_add_slash(interaction: discord.Interaction, path: str):
-    res = assistant.handle(f"rag add {path}")
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    res = await _handle(f"rag add {path}", interaction.user.id, interaction.guild_id, interaction.channel_id)
     text = res.get("answer", "") or "(done)"
-    await interaction.response.send_message(text, ephemeral=True)
+    await interaction.followup.send(text, ephemeral=True)
 
 @bot.command(name="rag_ask")
 async def rag_ask(ctx: commands.Context, *, question: str):
-    res = assistant.handle(f"rag ask {question}")
+    res = await _handle(f"rag ask {question}", ctx.author.id, getattr(ctx.guild, "id", None), ctx.channel.id)
     text = res.get("answer", "") or "(no results)"
     if len(text) > MAX_REPLY:
         text = text[:MAX_REPLY] + "..."
@@ -95,13 +133,33 @@ async def rag_ask(ctx: commands.Context, *, question: str):
 @bot.tree.command(name="rag_ask", description="Ask a question grounded in indexed documents")
 @app_commands.describe(question="Your question")
 async def rag_ask_slash(interaction: discord.Interaction, question: str):
-    res = assistant.handle(f"rag ask {question}")
+    await interaction.response.defer(thinking=True)
+    res = await _handle(f"rag ask {question}", interaction.user.id, interaction.guild_id, interaction.channel_id)
     text = res.get("answer", "") or "(no results)"
-    await interaction.response.send_message(text, ephemeral=False)
+    await interaction.followup.send(text)
+
+@bot.command(name="rag_answer")
+async def rag_answer(ctx: commands.Context, *, question: str):
+    res = await _handle(f"rag answer {question}", ctx.author.id, getattr(ctx.guild, "id", None), ctx.channel.id)
+    text = res.get("answer", "") or "(no answer)"
+    if len(text) > MAX_REPLY:
+        text = text[:MAX_REPLY] + "..."
+    await ctx.reply(text)
+
+@bot.tree.command(name="rag_answer", description="LLM answer written from the best matching indexed passages")
+@app_commands.describe(question="Your question")
+async def rag_answer_slash(interaction: discord.Interaction, question: str):
+    # Generation can outlast the 3 s interaction deadline
+    await interaction.response.defer(thinking=True)
+    res = await _handle(f"rag answer {question}", interaction.user.id, interaction.guild_id, interaction.channel_id)
+    text = res.get("answer", "") or "(no answer)"
+    if len(text) > MAX_REPLY:
+        text = text[:MAX_REPLY] + "..."
+    await interaction.followup.send(text)
 
 @bot.command(name="rag_status")
 async def rag_status(ctx: commands.Context):
-    res = assistant.handle("rag status")
+    res = await _handle("rag status", ctx.author.id, getattr(ctx.guild, "id", None), ctx.channel.id)
     text = res.get("answer", "") or "(no status)"
     if len(text) > MAX_REPLY:
         text = text[:MAX_REPLY] + "..."
@@ -110,9 +168,10 @@ async def rag_status(ctx: commands.Context):
 # Slash commands equivalents
 @bot.tree.command(name="rag_status", description="Show RAG backend and document count")
 async def rag_status_slash(interaction: discord.Interaction):
-    res = assistant.handle("rag status")
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    res = await _handle("rag status", interaction.user.id, interaction.guild_id, interaction.channel_id)
     text = res.get("answer", "") or "(no status)"
-    await interaction.response.send_message(text, ephemeral=True)
+    await interaction.followup.send(text, ephemeral=True)
 
 @bot.command(name="rag_add_attachments")
 async def rag_add_attachments(ctx: commands.Context):
@@ -120,26 +179,11 @@ async def rag_add_attachments(ctx: commands.Context):
     if not attachments:
         await ctx.reply("No attachments on this message. Attach .txt/.md/.json files and try again.")
         return
-    count = 0
-    skipped = []
-    for a in attachments:
-        fname = a.filename or "attachment"
-        low = fname.lower()
-        if not (low.endswith(".txt") or low.endswith(".md") or low.endswith(".json")):
-            skipped.append(fname)
-            continue
-        try:
-            data = await a.read()
-            text = data.decode("utf-8", errors="ignore")
-            doc_id = f"discord:{fname}"
-            _ = assistant.handle(f"rag add_text {doc_id} :: {text}")
-            count += 1
-        except Exception:
-            skipped.append(fname)
+    count, skipped = await _index_attachments(attachments, ctx.author.id, getattr(ctx.guild, "id", None), ctx.channel.id)
     msg = f"Indexed {count} attachment(s)."
     if skipped:
         msg += " Skipped: " + ", ".join(skipped)
-    await ctx.reply(msg)
+    await ctx.reply(msg[:MAX_REPLY])
 
 # Slash: accept up to 5 attachments
 @bot.tree.command(name="rag_add_attachments", description="Index up to 5 attachments (.txt/.md/.json)")
@@ -156,30 +200,34 @@ async def rag_add_attachments_slash(
     if not files:
         await interaction.response.send_message("Attach .txt/.md/.json files in command options.", ephemeral=True)
         return
-    count = 0
-    skipped = []
-    for a in files:
-        fname = a.filename or "attachment"
-        low = fname.lower()
-        if not (low.endswith(".txt") or low.endswith(".md") or low.endswith(".json")):
-            skipped.append(fname)
-            continue
-        try:
-            data = await a.read()
-            text = data.decode("utf-8", errors="ignore")
-            doc_id = f"discord:{fname}"
-            _ = assistant.handle(f"rag add_text {doc_id} :: {text}")
-            count += 1
-        except Exception:
-            skipped.append(fname)
+    # Reading and indexing several files can outlast the 3 s interaction deadline
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    count, skipped = await _index_attachments(files, interaction.user.id, interaction.guild_id, interaction.channel_id)
     msg = f"Indexed {count} attachment(s)."
     if skipped:
         msg += " Skipped: " + ", ".join(skipped)
-    await interaction.response.send_message(msg, ephemeral=True)
+    await interaction.followup.send(msg[:MAX_REPLY], ephemeral=True)
+
+@bot.command(name="rag_jobs")
+async def rag_jobs(ctx: commands.Context, *, args: str = ""):
+    res = await _handle(f"rag jobs {args}".strip(), ctx.author.id, getattr(ctx.guild, "id", None), ctx.channel.id)
+    text = res.get("answer", "") or "(no jobs)"
+    if len(text) > MAX_REPLY:
+        text = text[:MAX_REPLY] + "..."
+    await ctx.reply(text)
+
+@bot.tree.command(name="rag_jobs", description="Show ingestion job progress, or cancel a job")
+@app_commands.describe(job_id="Job id (optional)", cancel="Cancel this job")
+async def rag_jobs_slash(interaction: discord.Interaction, job_id: str = "", cancel: bool = False):
+    query = f"rag jobs cancel {job_id}" if cancel and job_id else f"rag jobs {job_id}".strip()
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    res = await _handle(query, interaction.user.id, interaction.guild_id, interaction.channel_id)
+    text = res.get("answer", "") or "(no jobs)"
+    await interaction.followup.send(text[:MAX_REPLY], ephemeral=True)
 
 @bot.command(name="triage")
 async def triage_cmd(ctx: commands.Context, *, symptoms: str):
-    res = assistant.handle(f"triage {symptoms}")
+    res = await _handle(f"triage {symptoms}", ctx.author.id, getattr(ctx.guild, "id", None), ctx.channel.id)
     text = res.get("answer", "") or "(no answer)"
     if len(text) > MAX_REPLY:
         text = text[:MAX_REPLY] + "..."
@@ -188,9 +236,10 @@ async def triage_cmd(ctx: commands.Context, *, symptoms: str):
 @bot.tree.command(name="triage", description="Create a pre-visit summary (not medical advice)")
 @app_commands.describe(symptoms="comma-separated symptoms, e.g., 'chest pain, sweating'")
 async def triage_slash(interaction: discord.Interaction, symptoms: str):
-    res = assistant.handle(f"triage {symptoms}")
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    res = await _handle(f"triage {symptoms}", interaction.user.id, interaction.guild_id, interaction.channel_id)
     text = res.get("answer", "") or "(no answer)"
-    await interaction.response.send_message(text, ephemeral=True)
+    await interaction.followup.send(text, ephemeral=True)
 
 @bot.tree.command(name="rag_help", description="Show RAG usage")
 async def rag_help_slash(interaction: discord.Interaction):
@@ -198,9 +247,11 @@ async def rag_help_slash(interaction: discord.Interaction):
         "RAG commands:\n"
         "- /rag_add path:<server-path>\n"
         "- /rag_add_attachments file1..file5 (txt/md/json)\n"
-        "- /rag_ask question:<text>\n"
+        "- /rag_ask question:<text> (searches this server's index; start with --all to include your DMs and shared docs)\n"
+        "- /rag_answer question:<text> (LLM answer citing the passages it used; --all works here too)\n"
         "- /rag_status\n"
-        "Prefix commands also available: !pa rag_add, !pa rag_add_attachments, !pa rag_ask, !pa rag_status."
+        "- /rag_jobs [job_id] [cancel] (progress of background indexing started by /rag_add)\n"
+        "Prefix commands also available: !pa rag_add, !pa rag_add_attachments, !pa rag_ask, !pa rag_answer, !pa rag_status, !pa rag_jobs."
     )
     await interaction.response.send_message(text, ephemeral=True)
 
@@ -238,24 +289,11 @@ async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
     attachments = message.attachments
     if not attachments:
         return
-    count = 0
-    skipped = []
-    for a in attachments:
-        fname = a.filename or "attachment"
-        low = fname.lower()
-        if not (low.endswith(".txt") or low.endswith(".md") or low.endswith(".json")):
-            skipped.append(fname)
-            continue
-        try:
-            data = await a.read()
-            text = data.decode("utf-8", errors="ignore")
-            doc_id = f"discord:{fname}#m{message.id}"
-            _ = assistant.handle(f"rag add_text {doc_id} :: {text}")
-            count += 1
-        except Exception:
-            skipped.append(fname)
+    count, skipped = await _index_attachments(attachments, payload.user_id, payload.guild_id, payload.channel_id,
+                                              suffix=f"#m{message.id}")
     try:
-        await channel.send(f"Indexed {count} attachment(s) from a pinned message. Skipped: {', '.join(skipped) if skipped else 'none'}")
+        msg = f"Indexed {count} attachment(s) from a pinned message. Skipped: {', '.join(skipped) if skipped else 'none'}"
+        await channel.send(msg[:MAX_REPLY])
     except Exception:
         pass
 
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+LLM backend chain: circuit breakers, health probes, latency ordering and
+hedged requests over the configured Ollama / OpenAI-compatible endpoints.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import requests
+
+import tracing
+
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1").strip().lower() in {"1", "true", "yes"}
+LLM_HEDGE_MIN_S = float(os.getenv("LLM_HEDGE_MIN_S", "0.5"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+LLM_PROBE_INTERVAL_S = float(os.getenv("LLM_PROBE_INTERVAL_S", "15"))
+# How long Ollama keeps the model loaded after a request ("" = server default)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m").strip()
+
+SYSTEM_PROMPT = "You are a concise personal assistant."
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; allows one trial call once reset_s has passed"""
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, reset_s: float = LLM_BREAKER_RESET_S):
+        self.threshold = max(1, failures)
+        self.reset_s = reset_s
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False  # half-open: the single admitted call has not finished yet
+        self._lock = threading.Lock()
+
+    def _tick(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_s:
+            self.state = HALF_OPEN
+
+    def available(self) -> bool:
+        """Whether allow() would admit a call now (does not take the half-open trial)"""
+        with self._lock:
+            self._tick()
+            return self.state == CLOSED or (self.state == HALF_OPEN and not self.trial_in_flight)
+
+    def allow(self) -> bool:
+        """Admit a call; when half-open only one caller gets through until it records its outcome"""
+        with self._lock:
+            self._tick()
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def half_open(self):
+        with self._lock:
+            if self.state == OPEN:
+                self.state = HALF_OPEN
+
+
+class LatencyStats:
+    def __init__(self, window: int = 100):
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Completion(NamedTuple):
+    text: str
+    backend: str = ""
+    context: Optional[List[int]] = None  # Ollama conversation state; pass back to continue it
+
+
+class Backend:
+    """Options understood by complete() (others are ignored):
+
+    system       system prompt (OpenAI default: SYSTEM_PROMPT)
+    temperature  sampling temperature
+    num_ctx      context window (Ollama)
+    keep_alive   how long the model stays loaded (Ollama)
+    context      conversation state from a previous Completion (Ollama)
+    followup     prompt to send instead when context is resumed (Ollama)
+    """
+    name = "backend"
+
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyStats()
+        self.last_error = ""
+
+    def complete(self, prompt: str, timeout: float, options: Optional[Dict[str, Any]] = None) -> Completion:
+        raise NotImplementedError
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        return self.complete(prompt, timeout).text
+
+    def probe(self) -> bool:
+        raise NotImplementedError
+
+
+class OllamaBackend(Backend):
+    name = "ollama"
+
+    def __init__(self, base_url: str, model: str):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+
+    def complete(self, prompt: str, timeout: float, options: Optional[Dict[str, Any]] = None) -> Completion:
+        options = options or {}
+        payload: Dict[str, Any] = {"model": self.model, "prompt": prompt, "stream": False}
+        if "system" in options:
+            payload["system"] = options["system"]
+        if options.get("context"):
+            # The earlier prompt is already in the model's state: send only the new turn
+            payload["context"] = options["context"]
+            payload["prompt"] = options.get("followup", prompt)
+        keep_alive = options.get("keep_alive", OLLAMA_KEEP_ALIVE)
+        if keep_alive:
+            payload["keep_alive"] = keep_alive
+        model_opts = {k: options[k] for k in ("temperature", "num_ctx") if k in options}
+        if model_opts:
+            payload["options"] = model_opts
+        r = requests.post(f"{self.base_url}/api/generate", json=payload, timeout=timeout)
+        r.raise_for_status()
+        data = r.json() or {}
+        return Completion(data.get("response", ""), self.name, data.get("context"))
+
+    def probe(self) -> bool:
+        return requests.get(f"{self.base_url}/api/tags", timeout=3).ok
+
+
+class OpenAIBackend(Backend):
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: str, model: str):
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+
+    def complete(self, prompt: str, timeout: float, options: Optional[Dict[str, Any]] = None) -> Completion:
+        options = options or {}
+        r = requests.post(
+            f"{self.base_url}/v1/chat/completions",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": options.get("system", SYSTEM_PROMPT)},
+                    {"role": "user", "content": prompt},
+                ],
+                "temperature": options.get("temperature", 0.2),
+            },
+            timeout=timeout,
+        )
+        r.raise_for_status()
+        data = r.json()
+        text = (data.get("choices", [{}])[0]
+                    .get("message", {})
+                    .get("content", ""))
+        return Completion(text, self.name)
+
+    def probe(self) -> bool:
+        r = requests.get(f"{self.base_url}/v1/models",
+                         headers={"Authorization": f"Bearer {self.api_key}"}, timeout=3)
+        return r.ok
+
+
+class LLMRouter:
+    """Routes prompts across backends, fastest healthy backend first.
+
+    With hedging on, a second backend is started if the first has not answered
+    within its own p95 latency; whichever succeeds first wins.
+    """
+
+    def __init__(self, backends: List[Backend], timeout: float = LLM_TIMEOUT_S, hedge: bool = LLM_HEDGE,
+                 probe_interval: float = LLM_PROBE_INTERVAL_S):
+        self.backends = backends
+        self.timeout = timeout
+        self.hedge = hedge
+        self._pool = ThreadPoolExecutor(max_workers=max(2, 2 * len(backends)), thread_name_prefix="llm")
+        if backends and probe_interval > 0:
+            threading.Thread(target=self._probe_loop, args=(probe_interval,), daemon=True,
+                             name="llm-probe").start()
+
+    @classmethod
+    def from_env(cls) -> "LLMRouter":
+        backends: List[Backend] = []
+        base = os.getenv("OLLAMA_BASE_URL")
+        if base:
+            backends.append(OllamaBackend(base, os.getenv("OLLAMA_MODEL", "llama3.2:3b")))
+        api_key = os.getenv("OPENAI_API_KEY")
+        if api_key:
+            backends.append(OpenAIBackend(os.getenv("OPENAI_BASE_URL", "https://api.openai.com"), api_key,
+                                          os.getenv("OPENAI_MODEL", "gpt-4o-mini")))
+        return cls(backends)
+
+    def _ordered(self) -> List[Backend]:
+        """Healthy backends: recently failing last, then lowest median latency (untried keep config order)"""
+        live = [b for b in self.backends if b.breaker.available()]
+        return sorted(live, key=lambda b: (b.breaker.failures > 0, b.latency.percentile(0.5) or 0.0))
+
+    def _call(self, backend: Backend, prompt: str, options: Dict[str, Any]) -> Completion:
+        if not backend.breaker.allow():
+            # Another caller holds the half-open trial (or the breaker just opened)
+            raise RuntimeError(f"{backend.name} circuit open")
+        start = time.monotonic()
+        try:
+            with tracing.span(f"llm.{backend.name}"):
+                out = backend.complete(prompt, self.timeout, options)
+        except Exception as e:
+            backend.last_error = str(e)[:200]
+            backend.breaker.record_failure()
+            raise
+        backend.latency.add(time.monotonic() - start)
+        backend.breaker.record_success()
+        return out
+
+    def _hedge_delay(self, backend: Backend) -> Optional[float]:
+        if not self.hedge:
+            return None
+        p95 = backend.latency.percentile(0.95)
+        return max(LLM_HEDGE_MIN_S, p95) if p95 is not None else self.timeout / 4
+
+    def generate(self, prompt: str) -> str:
+        return self.complete(prompt).text
+
+    def complete(self, prompt: str, **options) -> Completion:
+        """Like generate, passing options through to the backend (see Backend)"""
+        queue = self._ordered()
+        if not queue:
+            reason = "(LLM not configured)" if not self.backends else "(LLM unavailable: all backends tripped)"
+            return Completion(reason)
+        pending = {}
+        while queue or pending:
+            if queue and (not pending or self.hedge):
+                backend = queue.pop(0)
+                pending[self._pool.submit(tracing.bind(self._call), backend, prompt, options)] = backend
+            # Wait for a result, or until it is time to fire the next (hedged) backend
+            delay = self._hedge_delay(backend) if queue and pending else None
+            done, _ = wait(list(pending), timeout=delay, return_when=FIRST_COMPLETED)
+            for fut in done:
+                pending.pop(fut)
+                if fut.exception() is None:
+                    return fut.result()
+        return Completion("(LLM unavailable: all backends failed)")
+
+    def _probe_loop(self, interval: float):
+        while True:
+            time.sleep(interval)
+            for b in self.backends:
+                if b.breaker.state != OPEN:
+                    continue
+                try:
+                    if b.probe():
+                        b.breaker.half_open()
+                except Exception:
+                    pass
+
+    def status(self) -> List[Dict[str, Any]]:
+        out = []
+        for b in self.backends:
+            p50, p95 = b.latency.percentile(0.5), b.latency.percentile(0.95)
+            out.append({
+                "backend": b.name,
+                "state": b.breaker.state,
+                "failures": b.breaker.failures,
+                "p50_ms": round(p50 * 1000) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000) if p95 is not None else None,
+                "last_error": b.last_error,
+            })
+        return out
+
+    def status_text(self) -> str:
+        if not self.backends:
+            return "🧠 LLM: no backends configured (set OLLAMA_BASE_URL or OPENAI_API_KEY)"
+        lines = [f"🧠 LLM Backends (hedging {'on' if self.hedge else 'off'}):"]
+        icons = {CLOSED: "✅", HALF_OPEN: "🟡", OPEN: "❌"}
+        for s in self.status():
+            lat = f"p50 {s['p50_ms']}ms / p95 {s['p95_ms']}ms" if s["p50_ms"] is not None else "no samples"
+            line = f"{icons[s['state']]} {s['backend']}: {s['state']}, {lat}"
+            if s["state"] != CLOSED and s["last_error"]:
+                line += f" (last error: {s['last_error']})"
+            lines.append(line)
+        return "\n".join(lines)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Replays a JSONL workload against the API server (server.py) at a target QPS
+(open loop) or concurrency (closed loop) and reports latency percentiles and
+throughput per skill.
+
+Workload lines: {"query": "todo list"} with optional "weight" (default 1).
+
+Usage: python loadtest.py [--url http://127.0.0.1:8000] [--workload loadtest_workload.jsonl]
+                          [--qps 20 | --concurrency 8] [--duration 30] [--seed 0] [--spawn]
+Start server.py against stub_llm.py for an offline, reproducible run. With
+--spawn the server is started here on --url's port with TODO_DB in a
+temporary directory, so the workload's 'todo add' lines never touch real todos.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+_ROOT = Path(__file__).parent
+
+
+def load_workload(path: Path) -> List[Dict[str, Any]]:
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                item = json.loads(line)
+                if item.get("query"):
+                    items.append(item)
+    if not items:
+        raise ValueError(f"no queries in {path}")
+    return items
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Results:
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, skill: str, seconds: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.latency[skill].append(seconds)
+            else:
+                self.errors[skill] += 1
+
+    def report(self, elapsed: float) -> str:
+        rows = []
+        skills = sorted(set(self.latency) | set(self.errors))
+        everything = sorted(x for s in skills for x in self.latency[s])
+        for name, samples, errors in [(s, sorted(self.latency[s]), self.errors[s]) for s in skills] + \
+                [("ALL", everything, sum(self.errors.values()))]:
+            rows.append(
+                f"{name:<10} {len(samples):>7} {errors:>6} {len(samples) / elapsed:>8.1f} "
+                f"{percentile(samples, 0.50) * 1000:>8.1f} {percentile(samples, 0.95) * 1000:>8.1f} "
+                f"{percentile(samples, 0.99) * 1000:>8.1f}"
+            )
+        header = f"{'skill':<10} {'ok':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        return "\n".join([f"⏱️ {elapsed:.1f}s", header] + rows)
+
+
+class LoadTest:
+    def __init__(self, url: str, workload: List[Dict[str, Any]], seed: int = 0, timeout: float = 60.0):
+        self.url = url.rstrip("/") + "/ask"
+        self.workload = workload
+        self.weights = [float(item.get("weight", 1)) for item in workload]
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.results = Results()
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _next(self, rng: Optional[random.Random] = None) -> Dict[str, Any]:
+        return (rng or self.rng).choices(self.workload, weights=self.weights)[0]
+
+    def _fire(self, item: Dict[str, Any], scheduled: float):
+        # Latency runs from the scheduled send time, so a backed-up client
+        # does not hide server queueing (coordinated omission)
+        skill = item.get("skill", "?")
+        try:
+            r = self._session().post(self.url, json={"query": item["query"]}, timeout=self.timeout)
+            ok = r.ok
+            if ok:
+                skill = (r.json() or {}).get("skill", skill)
+        except Exception:
+            ok = False
+        self.results.add(skill, time.monotonic() - scheduled, ok)
+
+    def run_qps(self, qps: float, duration: float, max_workers: int = 256) -> float:
+        interval = 1.0 / qps
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="load") as pool:
+            i = 0
+            while True:
+                scheduled = start + i * interval
+                if scheduled - start >= duration:
+                    break
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._fire, self._next(), scheduled)
+                i += 1
+        return time.monotonic() - start
+
+    def run_concurrency(self, workers: int, duration: float) -> float:
+        start = time.monotonic()
+        deadline = start + duration
+
+        def loop(rng: random.Random):
+            # random.Random is not thread-safe: one seeded generator per client
+            while time.monotonic() < deadline:
+                self._fire(self._next(rng), time.monotonic())
+
+        threads = [threading.Thread(target=loop, args=(random.Random(self.seed + i),), name=f"load-{i}")
+                   for i in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.monotonic() - start
+
+
+def spawn_server(url: str, todo_db: str) -> subprocess.Popen:
+    """Run server.py under uvicorn on url's port with its todos in todo_db"""
+    parsed = urlparse(url)
+    env = dict(os.environ, TODO_DB=todo_db)
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", parsed.hostname or "127.0.0.1",
+         "--port", str(parsed.port or 8000), "--log-level", "warning"],
+        cwd=str(_ROOT), env=env,
+    )
+
+
+def wait_healthy(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            requests.get(url.rstrip("/") + "/health", timeout=5).raise_for_status()
+            return
+        except Exception:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.5)
+
+
+def _run(test: LoadTest, args: argparse.Namespace, startup: float = 0.0) -> int:
+    try:
+        wait_healthy(args.url, startup)
+    except Exception as e:
+        print(f"❌ Server not reachable at {args.url}: {e}")
+        return 1
+    if args.qps:
+        print(f"🚀 {args.qps:g} req/s for {args.duration:g}s against {args.url}")
+        elapsed = test.run_qps(args.qps, args.duration)
+    else:
+        workers = args.concurrency or 8
+        print(f"🚀 {workers} concurrent clients for {args.duration:g}s against {args.url}")
+        elapsed = test.run_concurrency(workers, args.duration)
+    print(test.results.report(elapsed))
+    if args.json:
+        print(json.dumps({"latency": test.results.latency, "errors": test.results.errors}))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--workload", default=str(_ROOT / "loadtest_workload.jsonl"))
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--qps", type=float, help="open-loop target request rate")
+    mode.add_argument("--concurrency", type=int, help="closed-loop concurrent clients")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds")
+    ap.add_argument("--timeout", type=float, default=60.0, help="per-request timeout (s)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", action="store_true", help="print raw per-skill latencies as JSON too")
+    ap.add_argument("--spawn", action="store_true", help="start server.py here with a throwaway TODO_DB")
+    args = ap.parse_args(argv)
+
+    test = LoadTest(args.url, load_workload(Path(args.workload)), args.seed, args.timeout)
+    if not args.spawn:
+        return _run(test, args)
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+        server = spawn_server(args.url, str(Path(tmp) / "todos.db"))
+        try:
+            return _run(test, args, startup=60.0)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
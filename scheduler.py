@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Asyncio job scheduler for the CLI ``watch`` and ``schedule`` commands.
+
+All jobs share one event loop and one Assistant; each run executes on a
+worker thread so a slow command never delays the others.
+"""
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+
+class Job:
+    def __init__(self, name: str, cmd: str, every: float, timeout: Optional[float] = None,
+                 jitter: float = 0.0, output: str = "stdout"):
+        if every <= 0:
+            raise ValueError(f"job {name!r}: 'every' must be positive")
+        self.name = name
+        self.cmd = cmd
+        self.every = float(every)
+        self.timeout = float(timeout) if timeout else None
+        self.jitter = max(0.0, float(jitter))
+        self.output = output
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.running = False
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], index: int = 0) -> "Job":
+        if "cmd" not in data or "every" not in data:
+            raise ValueError(f"job #{index + 1} needs 'cmd' and 'every'")
+        return cls(
+            name=data.get("name") or f"job{index + 1}",
+            cmd=data["cmd"],
+            every=data["every"],
+            timeout=data.get("timeout"),
+            jitter=data.get("jitter", 0.0),
+            output=data.get("output", "stdout"),
+        )
+
+
+def load_jobs(path: str) -> List[Job]:
+    """Read a JSON schedule: {"jobs": [{"name", "cmd", "every", "timeout", "jitter", "output"}]}"""
+    data = json.loads(Path(path).expanduser().read_text(encoding="utf-8"))
+    entries = data.get("jobs", []) if isinstance(data, dict) else data
+    jobs = [Job.from_dict(d, i) for i, d in enumerate(entries)]
+    if not jobs:
+        raise ValueError(f"no jobs defined in {path}")
+    return jobs
+
+
+def _emit(job: Job, text: str, echo: Callable[[str], None]):
+    """Deliver a result to stdout, file:<path> or webhook:<url>"""
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    target = job.output
+    if target.startswith("file:"):
+        path = Path(target[len("file:"):]).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"[{stamp}] {job.name}\n{text}\n\n")
+    elif target.startswith("webhook:"):
+        requests.post(
+            target[len("webhook:"):],
+            json={"job": job.name, "cmd": job.cmd, "time": stamp, "answer": text},
+            timeout=10,
+        )
+    else:
+        echo(f"[{stamp}] {job.name}: {text}")
+
+
+class Scheduler:
+    def __init__(self, assistant, jobs: List[Job], echo: Callable[[str], None] = print,
+                 max_workers: Optional[int] = None, namespace: Optional[str] = None, operator: bool = False):
+        self.assistant = assistant
+        self.jobs = jobs
+        self.echo = echo
+        # Every run acts as the CLI caller: same index partition and operator rights
+        self.namespace = namespace
+        self.operator = operator
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or max(2, 2 * len(jobs)),
+                                           thread_name_prefix="schedule")
+
+    def _run_blocking(self, job: Job) -> None:
+        try:
+            res = self.assistant.handle(job.cmd, namespace=self.namespace, operator=self.operator)
+            _emit(job, res.get("answer", ""), self.echo)
+        finally:
+            job.running = False
+
+    async def _run_once(self, job: Job):
+        loop = asyncio.get_running_loop()
+        job.running = True
+        job.runs += 1
+        fut = loop.run_in_executor(self.executor, self._run_blocking, job)
+        try:
+            # shield: on timeout the thread keeps running, and `running` stays set
+            # until it finishes so the next tick is skipped rather than stacked
+            await asyncio.wait_for(asyncio.shield(fut), job.timeout)
+        except asyncio.TimeoutError:
+            job.failures += 1
+            self.echo(f"⏱️ {job.name}: timed out after {job.timeout:g}s")
+        except Exception as e:
+            job.failures += 1
+            self.echo(f"❌ {job.name}: {e}")
+
+    async def _loop(self, job: Job, iterations: Optional[int]):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tick = 0
+        started = 0  # iterations counts runs, not skipped ticks
+        tasks = set()
+        while iterations is None or started < iterations:
+            # Ticks are anchored to the start time, so slow runs never shift the schedule
+            due = start + tick * job.every + random.uniform(0, job.jitter)
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            tick += 1
+            if job.running:
+                job.skipped += 1
+                self.echo(f"⏭️ {job.name}: previous run still active, skipping")
+                continue
+            started += 1
+            task = asyncio.ensure_future(self._run_once(job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def run(self, iterations: Optional[int] = None):
+        try:
+            await asyncio.gather(*(self._loop(job, iterations) for job in self.jobs))
+        finally:
+            self.executor.shutdown(wait=False)
@@ -1,18 +1,108 @@
 #!/usr/bin/env python3
-from fastapi import FastAPI
+import hmac
+import os
+from pathlib import Path
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from assistant import Assistant
+from skills.base import Scope
+from skills.rag import STORAGE_DIR, visible_to
+
+# Callers sending this in X-Operator-Token may read every tenant's data ("" disables operator access)
+OPERATOR_TOKEN = os.getenv("PA_OPERATOR_TOKEN", "")
+# /rag/export and /rag/import only read and write below this directory; relative paths: from the repo root
+EXPORT_DIR = (Path(__file__).parent / (os.getenv("PA_EXPORT_DIR") or str(STORAGE_DIR / "exports"))).resolve()
 
 app = FastAPI()
 assistant = Assistant()
+rag = next(s for s in assistant.skills if s.name == "rag")
 
 class AskRequest(BaseModel):
     query: str
+    trace: bool = False  # include per-stage timing spans in the response
+    user: Optional[str] = None   # caller identity for per-user concurrency limits
+    guild: Optional[str] = None  # tenant / team for per-guild limits
+    namespace: Optional[str] = None  # RAG index partition for this caller
+
+class SnapshotRequest(BaseModel):
+    path: str = ""
+    namespace: Optional[str] = None
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    # The server answers while the RAG index still loads in the background
+    state = assistant.readiness()
+    return {"status": "ok" if state["ready"] else "warming", **state}
+
+@app.get("/llm/status")
+def llm_status():
+    return {"backends": assistant.llm.status()}
+
+def _flag(value: Optional[str]) -> bool:
+    return (value or "").strip().lower() in {"1", "true", "yes"}
+
+def _operator(token: Optional[str]) -> bool:
+    return bool(OPERATOR_TOKEN and token) and hmac.compare_digest(token.encode(), OPERATOR_TOKEN.encode())
 
 @app.post("/ask")
-def ask(req: AskRequest):
-    return assistant.handle(req.query)
+def ask(req: AskRequest, x_trace: Optional[str] = Header(None), x_profile: Optional[str] = Header(None),
+        x_operator_token: Optional[str] = Header(None)):
+    # X-Profile forces a cProfile dump to logs/profiles for this request
+    res = assistant.handle(req.query, user=req.user, guild=req.guild, namespace=req.namespace,
+                           trace=req.trace or _flag(x_trace), profile=_flag(x_profile),
+                           operator=_operator(x_operator_token))
+    if res.get("skill") == "busy":
+        return JSONResponse(res, status_code=429, headers={"Retry-After": "1"})
+    return res
+
+def _caller(user: Optional[str], guild: Optional[str], namespace: Optional[str], token: Optional[str]) -> Scope:
+    return Scope(user, guild, namespace=namespace or None, operator=_operator(token))
+
+def _export_path(path: str) -> str:
+    """Resolve a client-supplied snapshot directory, refusing anything outside EXPORT_DIR"""
+    target = (EXPORT_DIR / path).resolve()
+    try:
+        target.relative_to(EXPORT_DIR)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Snapshot paths must stay inside {EXPORT_DIR}")
+    return str(target)
+
+@app.post("/rag/export")
+def rag_export(req: SnapshotRequest):
+    # No path: the skill picks a fresh directory under the shard's own storage
+    target = _export_path(req.path) if req.path.strip() else ""
+    return assistant.handle(f"rag export {target}".strip(), namespace=req.namespace)
+
+@app.post("/rag/import")
+def rag_import(req: SnapshotRequest):
+    if not req.path.strip():
+        raise HTTPException(status_code=400, detail="path is required")
+    return assistant.handle(f"rag import {_export_path(req.path)}", namespace=req.namespace)
+
+# Jobs are listed like 'rag jobs': only those writing into shards the caller may read
+def _visible_job(job_id: str, scope: Scope):
+    job = rag.jobs.get(job_id)
+    if job is None or not visible_to(scope, job.shard):
+        raise HTTPException(status_code=404, detail=f"No such job: {job_id}")
+    return job
+
+@app.get("/rag/jobs")
+def rag_jobs(user: Optional[str] = None, guild: Optional[str] = None, namespace: Optional[str] = None,
+             x_operator_token: Optional[str] = Header(None)):
+    scope = _caller(user, guild, namespace, x_operator_token)
+    return {"jobs": [job.to_dict() for job in rag.jobs.list() if visible_to(scope, job.shard)],
+            "queued": rag.jobs.pending()}
+
+@app.get("/rag/jobs/{job_id}")
+def rag_job(job_id: str, user: Optional[str] = None, guild: Optional[str] = None, namespace: Optional[str] = None,
+            x_operator_token: Optional[str] = Header(None)):
+    return _visible_job(job_id, _caller(user, guild, namespace, x_operator_token)).to_dict()
+
+@app.delete("/rag/jobs/{job_id}")
+def rag_job_cancel(job_id: str, user: Optional[str] = None, guild: Optional[str] = None,
+                   namespace: Optional[str] = None, x_operator_token: Optional[str] = Header(None)):
+    job = _visible_job(job_id, _caller(user, guild, namespace, x_operator_token))
+    return rag.jobs.cancel(job.id).to_dict()
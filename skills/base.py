@@ -1,6 +1,37 @@
-from typing import Protocol
+import contextvars
+from contextlib import contextmanager
+from typing import NamedTuple, Optional, Protocol
 
 class Skill(Protocol):
     name: str
     def can_handle(self, text: str) -> bool: ...
     def handle(self, text: str) -> str: ...
+    # Optional: def partition_key(self, text: str) -> str
+    #   Data partition the current caller's query (text) reads; identical
+    #   queries are only coalesced within one partition.
+
+
+class Scope(NamedTuple):
+    """Who is asking: Discord ids, or a namespace for CLI/API callers"""
+    user: Optional[str] = None
+    guild: Optional[str] = None
+    channel: Optional[str] = None
+    namespace: Optional[str] = None
+    operator: bool = False  # may read every tenant's data; only set by trusted entry points
+
+
+_scope: "contextvars.ContextVar[Scope]" = contextvars.ContextVar("skill_scope", default=Scope())
+
+
+def current_scope() -> Scope:
+    return _scope.get()
+
+
+@contextmanager
+def scoped(scope: Scope):
+    """Run skills on behalf of scope (copied into pool threads via tracing.bind)"""
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
@@ -1,6 +1,125 @@
 #!/usr/bin/env python3
 import re
-from typing import Dict
+from typing import Dict, List, NamedTuple, Tuple
+
+# Severity tiers, most severe first
+EMERGENCY = "emergency"
+URGENT = "urgent"
+ROUTINE = "routine"
+
+# canonical symptom -> (tier, synonyms)
+SYMPTOM_LEXICON: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "chest pain": (EMERGENCY, ("chest pain", "chest pressure", "chest tightness", "pain in chest",
+                               "crushing chest", "angina")),
+    "shortness of breath": (EMERGENCY, ("shortness of breath", "short of breath",
+                                        "difficulty breathing", "trouble breathing", "can't breathe",
+                                        "cannot breathe", "breathless", "dyspnea", "dyspnoea")),
+    "severe bleeding": (EMERGENCY, ("severe bleeding", "heavy bleeding", "uncontrolled bleeding",
+                                    "bleeding heavily", "hemorrhage", "haemorrhage", "vomiting blood",
+                                    "coughing up blood")),
+    "unconscious": (EMERGENCY, ("unconscious", "unresponsive", "passed out", "fainted", "fainting",
+                                "loss of consciousness", "syncope")),
+    "stroke": (EMERGENCY, ("stroke", "face drooping", "facial droop", "slurred speech",
+                           "one-sided weakness", "sudden numbness", "arm weakness")),
+    "seizure": (EMERGENCY, ("seizure", "seizures", "convulsion", "convulsions")),
+    "anaphylaxis": (EMERGENCY, ("anaphylaxis", "throat swelling", "swollen throat", "tongue swelling")),
+    "suicidal thoughts": (EMERGENCY, ("suicidal", "suicidal thoughts", "want to die", "self-harm",
+                                      "self harm")),
+    "confusion": (URGENT, ("confusion", "confused", "disoriented", "altered mental status")),
+    "severe headache": (URGENT, ("severe headache", "worst headache", "thunderclap headache")),
+    "high fever": (URGENT, ("high fever", "fever over 39", "fever above 39", "fever of 40")),
+    "stiff neck": (URGENT, ("stiff neck", "neck stiffness")),
+    "severe abdominal pain": (URGENT, ("severe abdominal pain", "severe stomach pain",
+                                       "severe belly pain", "rigid abdomen")),
+    "sweating": (URGENT, ("sweating", "sweaty", "diaphoresis", "cold sweat", "clammy")),
+    "palpitations": (URGENT, ("palpitations", "racing heart", "heart racing", "irregular heartbeat")),
+    "blood in stool": (URGENT, ("blood in stool", "bloody stool", "black stool", "melena")),
+    "dehydration": (URGENT, ("dehydration", "dehydrated", "very little urine")),
+    # A bare "temperature" is often normal ("temperature normal"): only raised ones count
+    "fever": (ROUTINE, ("fever", "febrile", "chills", "high temperature", "raised temperature",
+                        "elevated temperature", "running a temperature")),
+    "headache": (ROUTINE, ("headache", "head ache", "migraine")),
+    "cough": (ROUTINE, ("cough", "coughing")),
+    "sore throat": (ROUTINE, ("sore throat", "throat pain")),
+    "nausea": (ROUTINE, ("nausea", "nauseous", "vomiting", "throwing up")),
+    "diarrhea": (ROUTINE, ("diarrhea", "diarrhoea", "loose stools")),
+    "dizziness": (ROUTINE, ("dizziness", "dizzy", "lightheaded", "light-headed", "vertigo")),
+    "fatigue": (ROUTINE, ("fatigue", "tired", "exhausted", "lethargic", "weakness")),
+    "rash": (ROUTINE, ("rash", "hives", "itchy skin")),
+    "abdominal pain": (ROUTINE, ("abdominal pain", "stomach pain", "belly pain", "stomach ache",
+                                 "stomachache", "cramps")),
+    "back pain": (ROUTINE, ("back pain", "backache")),
+}
+
+NEGATION_CUES = ("no", "not", "denies", "denied", "deny", "without", "negative for", "free of",
+                 "never had", "absence of", "ruled out")
+NEGATION_WINDOW = 4  # words between a cue and a symptom for the cue to apply
+# Words that start a new clause and so end a negation's scope ("no known allergies presenting with chest pain")
+SCOPE_BREAKS = ("and", "but", "however", "although", "though", "except", "yet", "with", "presenting",
+                "presents", "presented", "who", "reports", "reporting", "complains", "complaining",
+                "since", "because", "now")
+# A negated symptom followed by one of these carries the negation on ("denies fever or chills")
+LIST_JOINERS = ("or", "nor")
+
+_TIER_ORDER = {EMERGENCY: 0, URGENT: 1, ROUTINE: 2}
+
+
+def _alternation(phrases) -> str:
+    # Longest first so "severe headache" wins over "headache"; spaces match any whitespace
+    ordered = sorted(set(phrases), key=len, reverse=True)
+    return "|".join(r"\s+".join(re.escape(w) for w in p.split()) for p in ordered)
+
+
+_SYNONYMS: Dict[str, str] = {
+    " ".join(syn.split()): canon for canon, (_, syns) in SYMPTOM_LEXICON.items() for syn in syns
+}
+# One combined pattern: negation cues, clause boundaries and every symptom synonym
+_SCANNER = re.compile(
+    r"(?P<neg>\b(?:" + _alternation(NEGATION_CUES) + r")\b)"
+    r"|(?P<stop>[.;:,!?\n]|\b(?:" + _alternation(SCOPE_BREAKS) + r")\b)"
+    r"|(?P<sym>(?<![\w-])(?:" + _alternation(_SYNONYMS) + r")(?![\w-]))",
+    re.IGNORECASE,
+)
+_WORDS = re.compile(r"\S+")
+
+
+class SymptomMatch(NamedTuple):
+    symptom: str      # canonical name
+    tier: str
+    text: str         # matched span as written
+    start: int
+    end: int
+    negated: bool
+
+
+def scan_symptoms(text: str) -> List[SymptomMatch]:
+    """Find lexicon symptoms in free text in a single pass, marking negated mentions.
+
+    A negation cue covers the next symptom within NEGATION_WINDOW words of the
+    same clause, and further symptoms only while they are joined by "or"/"nor".
+    Punctuation and SCOPE_BREAKS words end it early, so a red flag in a later
+    clause is never suppressed.
+    """
+    matches: List[SymptomMatch] = []
+    neg_end = -1  # end of the negation cue in scope, if any
+    chain_end = -1  # end of the last negated symptom, for "no X or Y"
+    for m in _SCANNER.finditer(text or ""):
+        kind = m.lastgroup
+        if kind == "neg":
+            neg_end, chain_end = m.end(), -1
+        elif kind == "stop":
+            neg_end = chain_end = -1
+        else:
+            if neg_end >= 0:
+                negated = len(_WORDS.findall(text, neg_end, m.start())) <= NEGATION_WINDOW
+            else:
+                negated = chain_end >= 0 and text[chain_end:m.start()].strip().lower() in LIST_JOINERS
+            neg_end = -1  # the cue is used up by the first symptom it reaches
+            chain_end = m.end() if negated else -1
+            canon = _SYNONYMS[" ".join(m.group().lower().split())]
+            matches.append(SymptomMatch(canon, SYMPTOM_LEXICON[canon][0], m.group(), m.start(), m.end(), negated))
+    return matches
+
 
 class HealthTriageSkill:
     name = "triage"
@@ -14,27 +133,50 @@ class HealthTriageSkill:
         if low == "triage help":
             return (
                 "Provide symptoms like: triage chest pain, sweating, shortness of breath.\n"
+                "Free text works too: triage woke up dizzy, no chest pain but short of breath.\n"
                 "I will format a pre-visit summary for a clinician. This is not medical advice."
             )
-        # Extract simple symptom list
-        content = text[len("triage "):].strip()
-        # Simple parsing: split by commas
+        content = text.strip()[len("triage "):].strip()
+        # Reported list keeps the user's own wording: split by commas
         symptoms = [s.strip() for s in content.split(",") if s.strip()]
-        flags = []
-        critical = {"chest pain", "shortness of breath", "severe bleeding", "unconscious", "stroke"}
-        for s in symptoms:
-            if s.lower() in critical:
-                flags.append(s)
+        found = scan_symptoms(content)
+        present: Dict[str, SymptomMatch] = {}
+        negated: Dict[str, SymptomMatch] = {}
+        for m in found:
+            if m.negated:
+                negated.setdefault(m.symptom, m)
+            else:
+                present.setdefault(m.symptom, m)
+        flags = [m for m in present.values() if m.tier == EMERGENCY]
+        urgent = [m for m in present.values() if m.tier == URGENT]
+
         lines = ["Pre-Visit Summary (Not a Diagnosis)", "", "Reported Symptoms:"]
         for s in symptoms:
             lines.append(f"- {s}")
         lines.append("")
+        if present:
+            lines.append("Recognized Symptoms:")
+            for m in sorted(present.values(), key=lambda m: (_TIER_ORDER[m.tier], m.start)):
+                lines.append(f"- {m.symptom} [{m.tier}]")
+            lines.append("")
+        denied = [s for s in negated if s not in present]
+        if denied:
+            lines.append("Denied / Negated:")
+            for s in denied:
+                lines.append(f"- {s}")
+            lines.append("")
         if flags:
             lines.append("Potential Red Flags Detected:")
             for f in flags:
-                lines.append(f"- {f}")
+                lines.append(f"- {f.text}")
             lines.append("")
             lines.append("If you are experiencing severe or life-threatening symptoms, call local emergency services immediately.")
+        elif urgent:
+            lines.append("Symptoms Worth Prompt Attention:")
+            for u in urgent:
+                lines.append(f"- {u.text}")
+            lines.append("")
+            lines.append("Consider contacting a clinician or urgent care today.")
         lines.append("")
         lines.append("Suggested Next Steps:")
         lines.append("- Share this summary with a qualified clinician.")
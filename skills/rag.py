@@ -1,27 +1,48 @@
 #!/usr/bin/env python3
+import contextvars
 import os
 import re
 import sys
 import json
 import time
+import hashlib
+import itertools
+import queue
+import shutil
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
 import logging
 
 import numpy as np
 
+import tracing
+from skills.base import Scope, current_scope
+from skills.snippets import best_passage, render
+from skills.summarizer import summarize
+from skills.file_walker import FileWalker
+from skills.rag_answer import ANSWER_K, ANSWER_TOKENS, PASSAGE_CHARS, build_prompt, followup_prompt, pack_context
+from skills.rag_budget import ROW_OVERHEAD, MemoryBudget, SpillFile
+from skills.rag_filters import MetaColumns, SearchFilter, parse_filters
+from skills.rag_query_cache import QueryCache, querying
+from skills.rag_jobs import RUNNING, IngestJob, JobCancelled, JobQueue
+from skills.rag_watch import DirectoryWatcher
+from skills.rag_snapshot import (
+    Snapshot, WriterLock, current_generation, export_to, load_snapshot, publish, publish_from, snapshot_root,
+    writer_lock,
+)
+
 # Enhanced RAG system detection with multiple paths
 HAVE_RAG = False
 RAGSystem = None
 OLLAMA_AVAILABLE = False
 
-# Try to import Ollama first
-try:
-    import ollama
-    OLLAMA_AVAILABLE = True
-except ImportError:
-    OLLAMA_AVAILABLE = False
-
 # Try multiple paths for RAG system
 RAG_PATHS = [
     os.getenv("RAG_SRC_PATH", "/media/nike/backup-hdd/Modular Deepdive/RAG"),
@@ -30,16 +51,34 @@ RAG_PATHS = [
     "/home/nike/ollama-ocr-integration-fixed/modular-rag-system"
 ]
 
-for rag_path in RAG_PATHS:
-    if os.path.isdir(rag_path):
+_discovery_lock = threading.Lock()
+_discovered = False
+
+
+def _discover_backends():
+    """Import the optional Ollama client and primary RAG system (slow; runs during warm-up)"""
+    global HAVE_RAG, RAGSystem, OLLAMA_AVAILABLE, _discovered
+    with _discovery_lock:
+        if _discovered:
+            return
+        _discovered = True
+        # Try to import Ollama first
         try:
-            sys.path.insert(0, rag_path)
-            from ollama_rag_system import RAGSystem as _RAGSystem  # type: ignore
-            RAGSystem = _RAGSystem
-            HAVE_RAG = True
-            break
-        except Exception:
-            continue
+            import ollama  # noqa: F401
+            OLLAMA_AVAILABLE = True
+        except ImportError:
+            OLLAMA_AVAILABLE = False
+
+        for rag_path in RAG_PATHS:
+            if os.path.isdir(rag_path):
+                try:
+                    sys.path.insert(0, rag_path)
+                    from ollama_rag_system import RAGSystem as _RAGSystem  # type: ignore
+                    RAGSystem = _RAGSystem
+                    HAVE_RAG = True
+                    break
+                except Exception:
+                    continue
 
 # Enhanced file support
 SUPPORTED_EXTS = {
@@ -50,35 +89,165 @@ SUPPORTED_EXTS = {
 }
 
 
+CODE_EXTS = {".py", ".js", ".ts", ".go", ".rs", ".java", ".c", ".cpp"}
+# Documents larger than this are indexed as several chunks ("<path>#<n>")
+CHUNK_CHARS = int(os.getenv("RAG_CHUNK_CHARS", "100000"))
+CSV_PREVIEW_LINES = 10
+_READ_BLOCK = 1 << 16
+_JSON_SCALAR = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+_JSON_STRING_BODY = re.compile(r'(?:[^"\\]|\\.)*', re.S)
+_JSON_MAX_TOKEN = 1 << 20  # longer strings are skipped (not buffered); longer scalars are malformed
+
+
+def _head_lines(path: Path, n: int) -> List[str]:
+    """First n lines without reading the rest of the file"""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return [line.rstrip("\n") for line in itertools.islice(f, n)]
+
+
+def _iter_json_records(path: Path) -> Iterator[Tuple[str, Any]]:
+    """Incrementally flatten a JSON (or JSON Lines) file into (path, value) records.
+
+    Only the current nesting path and a read block (plus a token of at most
+    _JSON_MAX_TOKEN characters) are held in memory; longer strings are
+    replaced by a placeholder. Raises ValueError on malformed input.
+    """
+    stack: List[list] = []  # [container, key-or-index]
+    buf, pos, eof = "", 0, False
+
+    def _where() -> str:
+        out = ""
+        for kind, key in stack:
+            out += f"[{key}]" if kind == "[" else f".{key}"
+        return out.lstrip(".") or "$"
+
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        def _fill():
+            nonlocal buf, pos, eof
+            data = f.read(_READ_BLOCK)
+            eof = not data
+            buf, pos = buf[pos:] + data, 0
+
+        def _skip_string() -> int:
+            """Consume the string starting at pos without buffering it; its length in characters"""
+            nonlocal buf, pos
+            skipped, i = 0, pos + 1
+            while True:
+                end = _JSON_STRING_BODY.match(buf, i).end()
+                if end < len(buf) and buf[end] == '"':
+                    pos = end + 1
+                    return skipped + end - i
+                if eof:
+                    raise ValueError("unterminated string")
+                # Keep a trailing backslash: it escapes the first character of the next block
+                keep = 1 if end < len(buf) else 0
+                skipped += len(buf) - keep - i
+                buf, pos = buf[len(buf) - keep:], 0
+                _fill()
+                i = keep
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    break
+                _fill()
+                continue
+            c = buf[pos]
+            if c in "{[":
+                stack.append([c, None if c == "{" else 0])
+                pos += 1
+            elif c in "}]":
+                if not stack:
+                    raise ValueError(f"unbalanced {c!r}")
+                stack.pop()
+                pos += 1
+            elif c == ",":
+                if stack:
+                    stack[-1][1] = stack[-1][1] + 1 if stack[-1][0] == "[" else None
+                pos += 1
+            elif c == ":":
+                pos += 1
+            elif c == '"':
+                try:
+                    value, end = json.decoder.scanstring(buf, pos + 1)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise ValueError("unterminated string")
+                    if len(buf) - pos <= _JSON_MAX_TOKEN:
+                        _fill()
+                        continue
+                    value, end = f"<{_skip_string()} characters skipped>", pos
+                pos = end
+                if stack and stack[-1][0] == "{" and stack[-1][1] is None:
+                    stack[-1][1] = value
+                else:
+                    yield _where(), value
+            else:
+                m = _JSON_SCALAR.match(buf, pos)
+                if m is None or (m.end() == len(buf) and not eof):
+                    # Only a token cut off by the end of the block (e.g. "tru") may need more input
+                    if eof or (m is None and len(buf) - pos > 5) or len(buf) - pos > _JSON_MAX_TOKEN:
+                        raise ValueError(f"unexpected {c!r}")
+                    _fill()
+                    continue
+                pos = m.end()
+                yield _where(), json.loads(m.group())
+
+
+def _iter_lines_chunked(lines: Iterable[str], header: str = "", size: int = CHUNK_CHARS) -> Iterator[str]:
+    """Group lines into chunks of roughly `size` characters; longer lines are split"""
+    parts, used = [header] if header else [], len(header)
+    for line in lines:
+        for start in range(0, len(line), size):
+            parts.append(line[start:start + size])
+            used += len(parts[-1])
+            if used >= size:
+                yield "".join(parts)
+                parts, used = [], 0
+    if parts:
+        yield "".join(parts)
+
+
+def _iter_text_chunks(path: Path, size: int = CHUNK_CHARS) -> Iterator[str]:
+    """Stream a file as indexable text chunks in bounded memory"""
+    ext = path.suffix.lower()
+    if ext == ".csv":
+        lines = _head_lines(path, CSV_PREVIEW_LINES)
+        yield f"# CSV File: {path}\n# Preview (first {CSV_PREVIEW_LINES} lines):\n\n" + "\n".join(lines)
+        return
+    if ext == ".json":
+        emitted = False
+        records = (f"{key}: {json.dumps(value, ensure_ascii=False)}\n" for key, value in _iter_json_records(path))
+        try:
+            for chunk in _iter_lines_chunked(records, size=size):
+                emitted = True
+                yield chunk
+            return
+        except ValueError:
+            if emitted:
+                return
+        # Not valid JSON: index it as plain text below
+    header = f"# File: {path}\n# Type: {ext[1:]} code\n\n" if ext in CODE_EXTS else ""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        # readline(size) bounds memory on files without line breaks
+        yield from _iter_lines_chunked(iter(lambda: f.readline(size), ""), header=header, size=size)
+
+
 def _read_text(path: Path) -> str:
-    """Enhanced text reading with format-specific handling"""
+    """Enhanced text reading with format-specific handling (first chunk only)"""
     try:
-        content = path.read_text(encoding="utf-8", errors="ignore")
-        
-        # Format-specific processing
-        if path.suffix.lower() == ".json":
-            try:
-                data = json.loads(content)
-                return json.dumps(data, indent=2)
-            except Exception:
-                return content
-        
-        elif path.suffix.lower() in {".py", ".js", ".ts", ".go", ".rs", ".java", ".c", ".cpp"}:
-            # Add metadata for code files
-            return f"# File: {path}\n# Type: {path.suffix[1:]} code\n\n{content}"
-        
-        elif path.suffix.lower() == ".csv":
-            # Basic CSV preview
-            lines = content.split('\n')[:10]  # First 10 lines
-            return f"# CSV File: {path}\n# Preview (first 10 lines):\n\n" + '\n'.join(lines)
-        
-        else:
-            return content
-            
+        with tracing.span("read"):
+            return next(_iter_text_chunks(path), "")
     except Exception as e:
         return f"Error reading {path}: {e}"
 
 
+def _is_supported(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in SUPPORTED_EXTS
+
+
 def _simple_embed(text: str) -> np.ndarray:
     """Enhanced lightweight embedding with more features"""
     text = (text or "").lower()
@@ -106,8 +275,9 @@ def _simple_embed(text: str) -> np.ndarray:
     vec[50] = text.count('(') / max(len(text), 1)   # parentheses density
     vec[51] = text.count('{') / max(len(text), 1)   # brace density
     
-    # Hash-based features (remaining dims)
-    h = hash(text)
+    # Hash-based features (remaining dims); stable across processes so
+    # snapshots embedded by one worker match queries embedded by another
+    h = int.from_bytes(hashlib.blake2b(text.encode("utf-8", "ignore"), digest_size=8).digest(), "little")
     for i in range(52, 256):
         vec[i] = ((h >> (i % 64)) & 1) * 0.05  # Reduced weight
     
@@ -118,80 +288,1273 @@ def _simple_embed(text: str) -> np.ndarray:
     return vec
 
 
+EMBED_DIM = 256
+# Fallback index, shards and snapshots (relative paths: from the repo root)
+STORAGE_DIR = Path(__file__).parents[1] / (os.getenv("RAG_STORAGE_DIR") or "rag_storage")
+# Storage precision for fallback embeddings: float32, float16 or int8 (per-vector scale)
+EMBED_DTYPE = os.getenv("RAG_EMBED_DTYPE", "float16").strip().lower()
+# Exact float32 rescoring of the top k * factor candidates (0 disables); the float32
+# copies are kept on disk next to the index and memory-mapped, not held in RAM
+RESCORE_FACTOR = int(os.getenv("RAG_RESCORE_FACTOR", "4"))
+_QUANT_MODES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+_SCORE_BLOCK = 4096  # rows dequantized at a time during the search scan
+# Share one memory-mapped index between processes (e.g. uvicorn workers)
+SHARED_INDEX = os.getenv("RAG_SHARED_INDEX", "0").strip().lower() in {"1", "true", "yes"}
+SNAPSHOT_POLL_S = float(os.getenv("RAG_SNAPSHOT_POLL_S", "1.0"))
+# Writes within this window share one published generation (a publish rewrites the whole shard)
+PUBLISH_DELAY_S = float(os.getenv("RAG_PUBLISH_DELAY_S", "1.0"))
+# Retrieval: every backend is queried in parallel and must answer within the deadline
+SEARCH_DEADLINE_S = float(os.getenv("RAG_SEARCH_DEADLINE_MS", "800")) / 1000.0
+RRF_K = 60
+SEARCH_LANE_WORKERS = {"primary": 4, "vector": 8, "lexical": 8}  # threads per search backend
+PRIMARY_FETCH_MAX = 256  # cap on primary results fetched to find k in the caller's shards
+# Primary backend health: failures before going offline, seconds between recovery probes
+PRIMARY_FAILURES = int(os.getenv("RAG_PRIMARY_FAILURES", "1"))
+PRIMARY_PROBE_S = float(os.getenv("RAG_PRIMARY_PROBE_S", "10"))
+PRIMARY_TIMEOUT_S = float(os.getenv("RAG_PRIMARY_TIMEOUT_S", "30"))  # a call hanging longer counts as a failure
+INGEST_BATCH = 64  # fallback docs written (and visible to this process's readers) per batch during 'rag add'
+# How long a request waits for warm-up before getting a "warming" reply
+WARMUP_WAIT_S = float(os.getenv("RAG_WARMUP_WAIT_S", "5"))
+CACHE_MAX = 256  # cached summaries and answers kept
+RESUME_MAX = 64  # LLM conversation states kept for follow-up answers
+# Fallback index partitioning: guild, channel, user, or none (one global index).
+# CLI/API callers that pass a namespace always get a shard of their own.
+SHARD_BY = os.getenv("RAG_SHARD_BY", "guild").strip().lower()
+SHARD_IDLE_S = float(os.getenv("RAG_SHARD_IDLE_S", "1800"))  # unload shards unused this long
+MAX_LOADED_SHARDS = int(os.getenv("RAG_MAX_LOADED_SHARDS", "32"))
+DEFAULT_SHARD = "default"
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+_TOKEN = re.compile(r"[a-z0-9_]{2,}")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN.findall((text or "").lower())
+
+
+# Query embeddings and tokens, shared by every shard's vector and lexical search
+_query_cache = QueryCache()
+
+
+class _LexicalIndex:
+    """BM25 inverted index over store rows.
+
+    Postings are append-only; readers copy them out and ignore rows at or
+    beyond the row count of the view they are searching.
+    """
+    K1 = 1.2
+    B = 0.75
+    TERM_BYTES = 200  # approximate dict slot, key and array objects per term
+
+    def __init__(self):
+        self.postings: Dict[str, Tuple[array, array]] = {}  # term -> (rows, term freqs)
+        self.doc_lens = array("f")
+        self.nbytes = 0
+
+    def add(self, row: int, text: str):
+        counts: Dict[str, int] = {}
+        for tok in _tokenize(text):
+            counts[tok] = counts.get(tok, 0) + 1
+        for tok, tf in counts.items():
+            hit = self.postings.get(tok)
+            if hit is None:
+                hit = self.postings[tok] = (array("i"), array("f"))
+                self.nbytes += self.TERM_BYTES + len(tok)
+            hit[0].append(row)
+            hit[1].append(tf)
+        self.doc_lens.append(sum(counts.values()))
+        self.nbytes += 8 * len(counts) + 4
+
+    def search(self, tokens: List[str], k: int, n: int,
+               mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        # tobytes() snapshots each array; frombuffer on the live array would
+        # block concurrent appends ("cannot resize an array that is exporting buffers")
+        lens = np.frombuffer(self.doc_lens.tobytes(), dtype=np.float32)[:n]
+        n = lens.shape[0]
+        if not n:
+            return []
+        norm = self.K1 * (1 - self.B + self.B * lens / max(float(lens.mean()), 1.0))
+        scores = np.zeros(n, dtype=np.float32)
+        for tok in set(tokens):
+            hit = self.postings.get(tok)
+            if hit is None:
+                continue
+            rows = np.frombuffer(hit[0].tobytes(), dtype=np.int32)
+            tfs = np.frombuffer(hit[1].tobytes(), dtype=np.float32)
+            m = min(rows.shape[0], tfs.shape[0])  # a writer may be between the two appends
+            live = rows[:m] < n
+            rows, tfs = rows[:m][live], tfs[:m][live]
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            scores[rows] += idf * tfs * (self.K1 + 1) / (tfs + norm[rows])
+        if mask is not None:
+            scores[~mask[:n]] = 0.0
+        nz = np.flatnonzero(scores)
+        if not nz.size:
+            return []
+        top = nz[np.argsort(-scores[nz], kind="stable")[:k]]
+        return [(int(i), float(scores[i])) for i in top]
+
+
+def _quantize(vec: np.ndarray, mode: str) -> Tuple[np.ndarray, float]:
+    """Quantize a normalized embedding, returning (stored vector, scale)"""
+    if mode == "int8":
+        peak = float(np.max(np.abs(vec))) if vec.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        q = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+        return q, scale
+    return vec.astype(_QUANT_MODES[mode]), 1.0
+
+
+_CHUNK_SUFFIX = re.compile(r"#\d+$")
+COMPACT_MIN = 1024  # tombstones tolerated before compacting
+
+
+def _source_of(doc_id: str) -> str:
+    """Source path of a chunk id ("<path>#3" -> "<path>")"""
+    return _CHUNK_SUFFIX.sub("", doc_id)
+
+
+class _ContentColumn(Sequence):
+    """Snapshot blobs (decoded on demand from the mapping) followed by rows appended in memory"""
+
+    def __init__(self, base: Sequence[str]):
+        self._base = base
+        self._tail: List[str] = []
+        self.nbytes = getattr(base, "nbytes", 0)
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._tail)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        nb = len(self._base)
+        if i < 0:
+            i += nb + len(self._tail)
+        return self._base[i] if i < nb else self._tail[i - nb]
+
+    def append(self, text: str):
+        self._tail.append(text)
+        self.nbytes += len(text.encode("utf-8"))
+
+
+class _ExactVectors:
+    """float32 copies of quantized embeddings, kept on disk for rescoring.
+
+    Rows mapped from a snapshot read its exact.npy; rows written since are
+    appended to an unlinked temporary file in the storage directory. Both are
+    memory-mapped, so only the rows a search rescores are paged in. Rows are
+    addressed by reference: below len(base) in the snapshot, then the file;
+    -1 means no exact vector (stores mapped from a v2 snapshot).
+    """
+
+    def __init__(self, directory: Path, base: Optional[np.ndarray] = None):
+        self.directory = directory
+        self.base = base
+        self._nb = 0 if base is None else base.shape[0]
+        self._rows = 0  # rows appended to the file
+        self._cap = 0  # rows the file and its mapping are sized for
+        self._map: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """On-disk size (not charged against the memory budget)"""
+        return (self._nb + self._rows) * EMBED_DIM * 4
+
+    def append(self, vectors: np.ndarray) -> np.ndarray:
+        """Store float32 rows; returns their references"""
+        with self._lock:
+            need = self._rows + vectors.shape[0]
+            if need > self._cap:
+                # A fresh file of double the capacity: readers still holding the old mapping
+                # keep a valid one, and a mapped file is never resized (Windows refuses that)
+                self.directory.mkdir(parents=True, exist_ok=True)
+                cap = max(need, 2 * self._cap, 1024)
+                with tempfile.TemporaryFile(dir=self.directory, prefix="exact-") as f:
+                    f.truncate(cap * EMBED_DIM * 4)
+                    grown = np.memmap(f, dtype=np.float32, mode="r+", shape=(cap, EMBED_DIM))
+                if self._rows:
+                    grown[:self._rows] = self._map[:self._rows]
+                self._map, self._cap = grown, cap
+            # Copied through the mapping: no syscall (and no GIL hand-off) per write
+            self._map[self._rows:need] = vectors
+            start = self._nb + self._rows
+            self._rows = need
+        return np.arange(start, start + vectors.shape[0], dtype=np.int64)
+
+    def take(self, refs: np.ndarray) -> Optional[np.ndarray]:
+        """float32 rows for refs, or None if any of them has no exact vector"""
+        if refs.size and refs.min() < 0:
+            return None
+        out = np.empty((refs.shape[0], EMBED_DIM), dtype=np.float32)
+        in_base = refs < self._nb
+        if in_base.any():
+            out[in_base] = self.base[refs[in_base]]
+        if not in_base.all():
+            tail = refs[~in_base] - self._nb
+            out[~in_base] = self._map[tail]
+        return out
+
+    def blocks(self, refs: np.ndarray) -> Optional[Iterator[np.ndarray]]:
+        """The rows for refs in snapshot-sized blocks, or None if any is missing"""
+        if refs.size and refs.min() < 0:
+            return None
+        return (self.take(refs[i:i + _SCORE_BLOCK]) for i in range(0, refs.shape[0], _SCORE_BLOCK))
+
+    def compacted(self, refs: np.ndarray) -> Tuple["_ExactVectors", np.ndarray]:
+        """A fresh file holding only refs (dead rows dropped); returns it and the new references"""
+        out = _ExactVectors(self.directory)
+        new = np.full(refs.shape[0], -1, dtype=np.int64)
+        have = np.flatnonzero(refs >= 0)
+        for i in range(0, have.shape[0], _SCORE_BLOCK):
+            rows = have[i:i + _SCORE_BLOCK]
+            new[rows] = out.append(self.take(refs[rows]))
+        return out, new
+
+
+class _StoreView(NamedTuple):
+    """Immutable generation of the store; readers only touch rows < n"""
+    n: int
+    ids: Sequence[str]
+    contents: Sequence[str]
+    emb: np.ndarray
+    scales: np.ndarray
+    lexical: Optional[_LexicalIndex]
+    alive: np.ndarray  # False for tombstoned (replaced or removed) rows
+    live: int
+    meta: MetaColumns
+    exact: Optional[_ExactVectors] = None  # float32 copies for rescoring
+    exact_ref: Optional[np.ndarray] = None  # row -> reference into exact
+
+
 class _FallbackStore:
-    def __init__(self, storage_dir: Path):
+    """Fallback vector store with lock-free reads.
+
+    Writers serialize on one lock, append past the published row count and
+    then publish a new _StoreView. Readers grab the current view once and never
+    block on ingestion; arrays are only ever appended to or replaced, so a view
+    stays valid while newer generations are written. Updates and removals
+    tombstone old rows in a copied alive mask; rows are compacted once
+    tombstones outnumber live rows. Writes that push the store past its
+    memory budget evict rows to a spill file.
+    """
+
+    def __init__(self, storage_dir: Path, dtype: str = EMBED_DTYPE, rescore: int = RESCORE_FACTOR):
         self.storage_dir = storage_dir
-        self.docs: List[Tuple[str, str, np.ndarray]] = []  # (id, content, emb)
+        self.dtype = dtype if dtype in _QUANT_MODES else "float32"
+        self.rescore = max(0, rescore)
+        self.budget = MemoryBudget()
+        self.spill = SpillFile(storage_dir / "spill.jsonl")
+        # Writer-owned buffers; the embedding matrix is preallocated past n
+        self._ids: List[str] = []
+        self._contents: Sequence[str] = []
+        self._emb = np.zeros((0, EMBED_DIM), dtype=_QUANT_MODES[self.dtype])
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._lexical: Optional[_LexicalIndex] = None  # built on first lexical query
+        self._alive = np.zeros(0, dtype=bool)
+        self._dead = 0
+        self._rows_by_source: Optional[Dict[str, List[int]]] = None  # built on first update/remove/path filter
+        self._meta = MetaColumns()
+        # Quantized stores keep float32 copies on disk for rescoring
+        self._exact = _ExactVectors(storage_dir) if self.dtype != "float32" and self.rescore else None
+        self._exact_ref = np.zeros(0, dtype=np.int64)
+        self._view = _StoreView(0, self._ids, self._contents, self._emb, self._scales, None, self._alive, 0,
+                                self._meta, self._exact, self._exact_ref)
+        self._selections: Tuple[Optional[_StoreView], Dict[SearchFilter, Any]] = (None, {})
+        self._write_lock = threading.Lock()
+        self.generation = 0  # snapshot generation this store was mapped from
+        self.mutations = 0
 
-    def add_doc(self, content: str, doc_id: str = ""):
-        if not content.strip():
+    @classmethod
+    def from_snapshot(cls, storage_dir: Path, snap) -> "_FallbackStore":
+        """Read-only view over a mapped snapshot; copied on first write"""
+        store = cls(storage_dir, dtype=snap.dtype)
+        store._ids = [m["id"] for m in snap.metas]
+        store._contents = _ContentColumn(snap.contents)
+        store._emb = snap.embeddings
+        store._scales = snap.scales
+        store._alive = np.ones(len(store._ids), dtype=bool)
+        # Without exact.npy (v2 snapshots) these rows are ranked on their quantized scores only
+        store._exact_ref = np.full(len(store._ids), -1, dtype=np.int64)
+        if store._exact is not None and snap.exact is not None:
+            store._exact = _ExactVectors(storage_dir, snap.exact)
+            store._exact_ref = np.arange(len(store._ids), dtype=np.int64)
+        store._meta = store._meta.reserve(len(store._ids), 0)
+        sizes = snap.contents.sizes()
+        for row, m in enumerate(snap.metas):
+            store._meta.set(row, _source_of(m["id"]), m.get("source", ""), m.get("added", 0.0), int(sizes[row]))
+        store._publish_view()
+        store.generation = snap.generation
+        return store
+
+    def _live_columns(self, v: _StoreView):
+        """(embeddings, scales, contents, metas, exact blocks or None) of the live rows, for snapshot writers"""
+        if v.live == v.n:
+            rows: Sequence[int] = range(v.n)
+            emb, scales = v.emb[:v.n], v.scales[:v.n]
+        else:
+            rows = np.flatnonzero(v.alive[:v.n])
+            emb, scales = v.emb[rows], v.scales[rows]
+        metas = (dict(v.meta.record(i), id=v.ids[i]) for i in rows)
+        exact = v.exact.blocks(v.exact_ref[np.asarray(rows, dtype=np.int64)]) if v.exact is not None else None
+        return emb, scales, (v.contents[i] for i in rows), metas, exact
+
+    def publish(self, root: Path) -> str:
+        return publish(root, self.dtype, *self._live_columns(self._view))
+
+    def export(self, directory: Path) -> int:
+        v = self._view
+        export_to(directory, self.dtype, *self._live_columns(v))
+        return v.live
+
+    def view(self) -> _StoreView:
+        return self._view
+
+    def _publish_view(self):
+        n = len(self._ids)
+        self._view = _StoreView(n, self._ids, self._contents, self._emb, self._scales, self._lexical,
+                                self._alive, n - self._dead, self._meta, self._exact, self._exact_ref)
+
+    def _ensure_writable(self):
+        # Contents stay mapped (new rows go to their in-memory tail); only the vectors are copied
+        if not self._emb.flags.writeable:
+            n = len(self._ids)
+            self._emb = np.array(self._emb[:n])
+            self._scales = np.array(self._scales[:n])
+
+    def __len__(self) -> int:
+        return self._view.live
+
+    def _reserve(self, n: int):
+        if n <= self._emb.shape[0]:
+            return
+        # Fresh arrays: views published earlier keep pointing at the old ones
+        cap = max(n, 2 * self._emb.shape[0], 64)
+        rows = len(self._ids)
+        emb = np.zeros((cap, EMBED_DIM), dtype=self._emb.dtype)
+        emb[:rows] = self._emb[:rows]
+        scales = np.ones(cap, dtype=np.float32)
+        scales[:rows] = self._scales[:rows]
+        alive = np.zeros(cap, dtype=bool)
+        alive[:rows] = self._alive[:rows]
+        exact_ref = np.full(cap, -1, dtype=np.int64)
+        exact_ref[:rows] = self._exact_ref[:rows]
+        self._emb, self._scales, self._alive, self._exact_ref = emb, scales, alive, exact_ref
+        self._meta = self._meta.reserve(cap, rows)
+
+    def add_docs(self, docs: Iterable[Tuple[str, ...]], replace: Iterable[str] = ()) -> int:
+        """Add (content, doc_id[, source[, added]]) tuples, first dropping every chunk of the sources in replace.
+
+        added (a timestamp) defaults to now; restored documents keep their original one.
+
+        Readers see the removal and the whole batch at once.
+        """
+        batch = []
+        with tracing.span("embed"):
+            for content, doc_id, *extra in docs:
+                if content.strip():
+                    # Embedding is the expensive part and needs no lock
+                    vec = _simple_embed(content)
+                    q, scale = _quantize(vec, self.dtype)
+                    size = len(content.encode("utf-8"))
+                    source = extra[0] if extra else "text"
+                    added = extra[1] if len(extra) > 1 and extra[1] else None
+                    batch.append((content, doc_id, source, q, scale, size, added, vec))
+        replace = list(replace)
+        if not batch and not replace:
+            return 0
+        with tracing.span("store.append", docs=len(batch)), self._write_lock:
+            self._ensure_writable()
+            removed = self._tombstone(replace, prefix=False) if replace else 0
+            row = len(self._ids)
+            self._reserve(row + len(batch))
+            if self._exact is not None and batch:
+                self._exact_ref[row:row + len(batch)] = self._exact.append(np.stack([b[-1] for b in batch]))
+            now = time.time()
+            for content, doc_id, source, q, scale, size, added, _ in batch:
+                doc_id = doc_id or f"doc_{row + 1}"
+                self._emb[row] = q
+                self._scales[row] = scale
+                self._alive[row] = True
+                self._meta.set(row, _source_of(doc_id), source, now if added is None else added, size)
+                self._ids.append(doc_id)
+                self._contents.append(content)
+                if self._lexical is not None:
+                    self._lexical.add(row, content)
+                if self._rows_by_source is not None:
+                    self._rows_by_source.setdefault(_source_of(doc_id), []).append(row)
+                row += 1
+            if batch or removed:
+                self.mutations += 1
+                evicted = self._enforce_budget() if batch else 0
+                self._maybe_compact(force=evicted > 0)
+                self._publish_view()
+        return len(batch)
+
+    def remove(self, sources: Iterable[str]) -> int:
+        """Drop every chunk of the given sources (and of anything below them, for directories)"""
+        sources = list(sources)
+        if not sources:
+            return 0
+        with self._write_lock:
+            self._ensure_writable()
+            removed = self._tombstone(sources, prefix=True)
+            if removed:
+                self.mutations += 1
+                self._maybe_compact()
+                self._publish_view()
+        return removed
+
+    def _tombstone(self, sources: List[str], prefix: bool) -> int:
+        """Mark rows dead in a fresh alive mask (published views keep theirs). Call under the lock."""
+        self._source_index()
+        rows: List[int] = []
+        for src in sources:
+            rows.extend(self._rows_by_source.pop(src, ()))
+            if prefix:
+                below = src.rstrip(os.sep) + os.sep
+                for key in [key for key in self._rows_by_source if key.startswith(below)]:
+                    rows.extend(self._rows_by_source.pop(key))
+        if not rows:
+            return 0
+        self._alive = self._alive.copy()
+        self._alive[rows] = False
+        self._dead += len(rows)
+        return len(rows)
+
+    def _source_index(self) -> Dict[str, List[int]]:
+        """Live rows per source path. Call under the lock."""
+        if self._rows_by_source is None:
+            index: Dict[str, List[int]] = {}
+            for row, doc_id in enumerate(self._ids):
+                if self._alive[row]:
+                    index.setdefault(_source_of(doc_id), []).append(row)
+            self._rows_by_source = index
+        return self._rows_by_source
+
+    def _maybe_compact(self, force: bool = False):
+        """Rewrite the columns without tombstoned rows once they dominate. Call under the lock."""
+        n = len(self._ids)
+        if not self._dead or (not force and (self._dead < COMPACT_MIN or self._dead * 2 < n)):
             return
-        emb = _simple_embed(content)
-        if not doc_id:
-            doc_id = f"doc_{len(self.docs)+1}"
-        self.docs.append((doc_id, content, emb))
+        keep = np.flatnonzero(self._alive[:n])
+        self._ids = [self._ids[i] for i in keep]
+        self._contents = [self._contents[i] for i in keep]
+        self._emb = self._emb[keep]
+        self._scales = self._scales[keep]
+        self._alive = np.ones(len(keep), dtype=bool)
+        if self._exact is not None:
+            self._exact, self._exact_ref = self._exact.compacted(self._exact_ref[keep])
+        else:
+            self._exact_ref = self._exact_ref[keep]
+        self._meta = self._meta.compacted(keep)
+        self._dead = 0
+        self._lexical = None  # row numbers changed
+        self._rows_by_source = None
+
+    def _per_vec(self) -> int:
+        return self._emb.dtype.itemsize * EMBED_DIM + 4  # embedding row plus its scale
+
+    def _lexical_bytes(self, v: Optional[_StoreView] = None) -> int:
+        lexical = (v or self._view).lexical
+        return lexical.nbytes if lexical is not None else 0
+
+    def _enforce_budget(self) -> int:
+        """Evict rows to the spill file until the store fits its budget. Call under the lock.
+
+        The caller compacts afterwards, which is what actually frees the memory.
+        """
+        if not self.budget:
+            return 0
+        m = self._meta
+        rows = np.flatnonzero(self._alive[:len(self._ids)])
+        charge = m.size[rows] + (self._per_vec() + ROW_OVERHEAD)
+        victims = self.budget.victims(rows, charge, m.source[rows], m.added[rows], m.last_hit[rows],
+                                      m.sources.codes, self._lexical_bytes())
+        if not victims.size:
+            return 0
+        with tracing.span("store.evict", rows=int(victims.size)):
+            self.spill.write({"id": self._ids[r], "source": m.sources.names[m.source[r]],
+                              "added": float(m.added[r]), "content": self._contents[r]} for r in victims)
+            self._alive = self._alive.copy()
+            self._alive[victims] = False
+            self._dead += int(victims.size)
+            self._rows_by_source = None
+        return int(victims.size)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes charged against the budget, by kind (live rows only, as _enforce_budget counts them)"""
+        v = self._view
+        return {
+            "embeddings": self._per_vec() * v.live,
+            "content": int(v.meta.size[:v.n][v.alive[:v.n]].sum()),
+            "metadata": ROW_OVERHEAD * v.live,
+            "lexical": self._lexical_bytes(v),
+        }
+
+    def add_doc(self, content: str, doc_id: str = "", source: str = "text"):
+        self.add_docs([(content, doc_id, source)])
 
-    def search(self, query: str, k: int = 3) -> List[Tuple[str, float, str]]:
-        if not self.docs:
+    def clear(self):
+        with self._write_lock:
+            self._ids = []
+            self._contents = []
+            self._emb = self._emb[:0]
+            self._scales = self._scales[:0]
+            self._alive = np.zeros(0, dtype=bool)
+            self._meta = MetaColumns()
+            if self._exact is not None:
+                self._exact = _ExactVectors(self.storage_dir)
+            self._exact_ref = np.zeros(0, dtype=np.int64)
+            self._dead = 0
+            self._rows_by_source = None
+            self._lexical = None
+            self.mutations += 1
+            self._publish_view()
+
+    def iter_docs(self):
+        v = self._view
+        return ((v.ids[i], v.contents[i]) for i in range(v.n) if v.alive[i])
+
+    def _select(self, v: _StoreView, flt: Optional[SearchFilter]):
+        """(rows, mask) a search may touch, or (None, None) for every row of v.
+
+        Combines tombstones with the metadata filter; cached per view.
+        """
+        flt = flt or SearchFilter()
+        if not flt and v.live == v.n:
+            return None, None
+        cached_view, cache = self._selections
+        if cached_view is not v:
+            cache = {}
+            self._selections = (v, cache)
+        hit = cache.get(flt)
+        if hit is None:
+            mask = v.alive[:v.n].copy()
+            if flt:
+                # Read from the view only: searches never wait for a writer
+                mask &= v.meta.mask(flt, v.n, lambda row: _source_of(v.ids[row]))
+            hit = cache[flt] = (np.flatnonzero(mask), mask)
+        return hit
+
+    def _scan(self, v: _StoreView, qv: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Score every row (or only the selected rows) against the query, dequantizing block by block"""
+        total = v.n if rows is None else rows.shape[0]
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, _SCORE_BLOCK):
+            end = min(start + _SCORE_BLOCK, total)
+            block = v.emb[start:end] if rows is None else v.emb[rows[start:end]]
+            scores[start:end] = block.astype(np.float32) @ qv
+        if self.dtype == "int8":
+            scores *= v.scales[:v.n] if rows is None else v.scales[rows]
+        return scores
+
+    def search(self, query: str, k: int = 3, flt: Optional[SearchFilter] = None) -> List[Tuple[str, float, str]]:
+        v = self._view
+        if not v.live:
             return []
-        qv = _simple_embed(query)
-        sims = []
-        for doc_id, content, emb in self.docs:
-            score = float(np.dot(qv, emb))
-            sims.append((doc_id, score, content))
-        sims.sort(key=lambda x: x[1], reverse=True)
-        return sims[:k]
+        rows, _ = self._select(v, flt)
+        if rows is not None and not rows.size:
+            return []
+        with tracing.span("embed"):
+            qv = _query_cache.get("vector", query, _simple_embed, key=str.lower)
+        with tracing.span("search.scan", rows=v.n if rows is None else rows.size):
+            scores = self._scan(v, qv, rows)
+        n = scores.shape[0]
+        width = min(n, k * self.rescore if v.exact is not None else k)
+        top = np.argpartition(-scores, width - 1)[:width] if width < n else np.arange(n)
+        row_of = (lambda i: i) if rows is None else (lambda i: rows[i])
+        if v.exact is not None:
+            # Exact float32 scores for the shortlist from the on-disk copies
+            with tracing.span("search.rescore", rows=len(top)):
+                exact = v.exact.take(v.exact_ref[top if rows is None else rows[top]])
+                if exact is not None:
+                    scores[top] = exact @ qv
+        top = top[np.argsort(-scores[top], kind="stable")][:k]
+        v.meta.touch([row_of(i) for i in top], time.time())
+        return [(v.ids[row_of(i)], float(scores[i]), v.contents[row_of(i)]) for i in top]
+
+    def lexical_search(self, query: str, k: int = 3,
+                       flt: Optional[SearchFilter] = None) -> List[Tuple[str, float, str]]:
+        v = self._view
+        if v.lexical is None:
+            # Built under the write lock so no concurrent add is missed
+            with self._write_lock:
+                if self._lexical is None:
+                    index = _LexicalIndex()
+                    for row in range(len(self._ids)):
+                        index.add(row, self._contents[row])
+                    self._lexical = index
+                    self._publish_view()
+                v = self._view
+        _, mask = self._select(v, flt)
+        hits = v.lexical.search(_query_cache.get("lexical", query, _tokenize), k, v.n, mask)
+        v.meta.touch([i for i, _ in hits], time.time())
+        return [(v.ids[i], score, v.contents[i]) for i, score in hits]
+
+    def memory_stats(self) -> Dict[str, Any]:
+        v = self._view
+        n = v.n
+        per_vec = v.emb.dtype.itemsize * EMBED_DIM + (4 if self.dtype == "int8" else 0)
+        content_bytes = getattr(v.contents, "nbytes", None)
+        if content_bytes is None:
+            content_bytes = sum(len(v.contents[i].encode("utf-8")) for i in range(n))
+        usage = self.memory_usage()
+        rows = np.flatnonzero(v.alive[:n])
+        charge = v.meta.size[rows] + (self._per_vec() + ROW_OVERHEAD)
+        per_source = np.bincount(v.meta.source[rows], weights=charge, minlength=len(v.meta.sources.names))
+        spill_docs, spill_bytes = self.spill.pending()
+        return {
+            "documents": v.live,
+            "tombstones": n - v.live,
+            "usage": usage,
+            "used_bytes": sum(usage.values()),
+            "by_source": {name: int(b) for name, b in zip(v.meta.sources.names, per_source) if b},
+            "budget_bytes": self.budget.limit,
+            "budget": self.budget.describe(),
+            "evicted_docs": self.budget.evicted,
+            "evicted_bytes": self.budget.evicted_bytes,
+            "eviction_passes": self.budget.passes,
+            "spill_docs": spill_docs,
+            "spill_bytes": spill_bytes,
+            "spill_error": self.spill.last_error,
+            "dtype": self.dtype,
+            "embedding_bytes": per_vec * n,
+            "allocated_bytes": v.emb.nbytes + v.scales.nbytes + v.meta.nbytes(),
+            "content_bytes": content_bytes,
+            "bytes_per_doc": (per_vec * n + content_bytes) / n if n else 0.0,
+            "embedding_bytes_per_doc": per_vec,
+            "float32_bytes_per_doc": 4 * EMBED_DIM,
+            "exact_disk_bytes": v.exact.nbytes if v.exact is not None else 0,
+        }
+
+
+class _WriteJournal:
+    """Append-only JSONL log of primary writes made while the backend was offline"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.pending = sum(1 for line in f if line.strip())
+        except FileNotFoundError:
+            self.pending = 0
+
+    def append(self, entry: Dict[str, Any], unless=None) -> bool:
+        """Log entry, unless unless() turns true under the journal lock (then nothing is written)"""
+        with self._lock:
+            if unless is not None and unless():
+                return False
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.pending += 1
+            return True
+
+    def replay(self, apply, then=None) -> Tuple[List[Dict[str, Any]], Optional[Exception]]:
+        """Apply entries in order, stopping at the first failure (the unapplied tail is kept).
+
+        then() runs under the journal lock once every entry was applied, so no
+        append can land between the replay and whatever then() switches over.
+        Returns (applied entries, error).
+        """
+        with self._lock:
+            entries: List[Dict[str, Any]] = []
+            if self.pending:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    entries = [json.loads(line) for line in f if line.strip()]
+            done = 0
+            error: Optional[Exception] = None
+            try:
+                for entry in entries:
+                    apply(entry)
+                    done += 1
+            except Exception as e:
+                error = e
+            if entries:
+                rest = entries[done:]
+                tmp = self.path.with_suffix(".tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for entry in rest:
+                        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                os.replace(tmp, self.path)
+                self.pending = len(rest)
+            if error is None and then is not None:
+                then()
+            return entries[:done], error
+
+
+def _with_timeout(fn, timeout: float, *args, **kwargs):
+    """fn(*args, **kwargs), or TimeoutError once timeout passes (the call is abandoned, not killed)"""
+    if timeout <= 0:
+        return fn(*args, **kwargs)
+    box: Dict[str, Any] = {}
+    ctx = contextvars.copy_context()  # keeps the caller's scope, span and query-cache flag
+
+    def run():
+        try:
+            box["value"] = ctx.run(fn, *args, **kwargs)
+        except BaseException as e:
+            box["error"] = e
+
+    worker = threading.Thread(target=run, daemon=True, name="rag-primary-call")
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"no answer within {timeout:.0f}s")
+    if "error" in box:
+        raise box["error"]
+    return box.get("value")
+
+
+class _PrimaryHealth:
+    """Online/offline state of the primary backend.
+
+    Requests only read `online`, so a degraded backend costs nothing per call.
+    Failures trip it offline and start a background probe; once the probe
+    succeeds, the outage journal is replayed and the backend comes back online.
+    replayed(entries) is called with each batch of entries the primary took.
+    """
+
+    def __init__(self, probe, journal: _WriteJournal, replay, interval: float = PRIMARY_PROBE_S,
+                 threshold: int = PRIMARY_FAILURES, replayed=None):
+        self.online = True
+        self.failures = 0
+        self.last_error = ""
+        self.changed_at = time.time()
+        self.journal = journal
+        self._probe = probe
+        self._replay = replay
+        self._replayed = replayed
+        self._interval = interval
+        self._threshold = max(1, threshold)
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self, exc: Exception):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(exc)[:200]
+            if self.online and self.failures >= self._threshold:
+                self.online = False
+                self.changed_at = time.time()
+                print(f"⚠️ Primary RAG offline: {self.last_error}")
+            if not self.online:
+                self._start_probe()
+
+    def recover(self):
+        """Take the backend offline until pending journal entries are replayed"""
+        with self._lock:
+            if self.journal.pending:
+                self.online = False
+                self._start_probe()
+
+    def _start_probe(self):
+        if not self._probing:
+            self._probing = True
+            threading.Thread(target=self._probe_loop, daemon=True, name="rag-primary-probe").start()
+
+    def _back_online(self):
+        with self._lock:
+            self.online = True
+            self.failures = 0
+            self.changed_at = time.time()
+            self._probing = False
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self._interval)
+            try:
+                self._probe()
+            except Exception as e:
+                self.last_error = str(e)[:200]
+                continue
+            # Goes online under the journal lock, right after the last queued write
+            applied, error = self.journal.replay(self._replay, then=self._back_online)
+            if applied and self._replayed is not None:
+                try:
+                    self._replayed(applied)
+                except Exception as e:
+                    print(f"⚠️ Replayed writes could not be dropped from the fallback: {e}")
+            if error is not None:
+                self.last_error = str(error)[:200]
+                continue
+            print(f"✅ Primary RAG back online (replayed {len(applied)} queued writes)")
+            return
+
+
+def _safe(value: str) -> str:
+    return _UNSAFE.sub("_", str(value))[:64]
+
+
+def shard_for(scope: Scope) -> str:
+    """Shard a caller's documents live in"""
+    if SHARD_BY == "none":
+        return DEFAULT_SHARD
+    if scope.namespace:
+        return f"ns-{_safe(scope.namespace)}"
+    if scope.guild and SHARD_BY != "user":
+        if SHARD_BY == "channel" and scope.channel:
+            return f"guild-{_safe(scope.guild)}-channel-{_safe(scope.channel)}"
+        return f"guild-{_safe(scope.guild)}"
+    if scope.user:
+        return f"user-{_safe(scope.user)}"  # DMs
+    return DEFAULT_SHARD
+
+
+def visible_to(scope: Scope, shard: str) -> bool:
+    """Shards a cross-shard query of scope may read: its own, its guild's channels and the default corpus"""
+    if scope.operator:
+        return True
+    if shard in (DEFAULT_SHARD, shard_for(scope)):
+        return True
+    if scope.user and shard == f"user-{_safe(scope.user)}":
+        return True
+    guild = f"guild-{_safe(scope.guild)}" if scope.guild else None
+    return bool(guild) and (shard == guild or shard.startswith(guild + "-channel-"))
+
+
+class _PublishBatch:
+    """Shared-index writes collected under one hold of the cross-process writer lock"""
+
+    def __init__(self, lock: WriterLock, mutations: int):
+        self.lock = lock
+        self.mutations = mutations  # store.mutations when the batch opened
+        self.writers = 0
+        self.closing = False  # due: no new writers join, publish once the last one leaves
+
+
+class _Shard:
+    """One partition of the fallback index, with its own storage directory.
+
+    Shared-index shards map their own snapshot generations; private shards
+    write a snapshot of themselves when unloaded and map it back on next use.
+    """
+
+    def __init__(self, name: str, storage: Path, shared: bool):
+        self.name = name
+        self.storage = storage
+        self.storage.mkdir(parents=True, exist_ok=True)
+        self.snapshot_root = snapshot_root(storage) if shared else None
+        self.snapshot_name: Optional[str] = None
+        self.snapshot_checked = 0.0
+        self.writer_mutex = threading.Lock()  # serializes this process's writers on the store
+        self.batch: Optional[_PublishBatch] = None  # shared index: writes not yet published
+        self.batch_cond = threading.Condition()
+        self.store = self._load()
+        self.saved_mutations = self.store.mutations
+        self.last_used = time.monotonic()
+        self.pins = 0  # writes in progress; pinned shards stay loaded
+
+    @property
+    def resident_dir(self) -> Path:
+        return self.storage / "resident"
+
+    def _load(self) -> "_FallbackStore":
+        if self.snapshot_root is None and (self.resident_dir / "manifest.json").exists():
+            try:
+                return _FallbackStore.from_snapshot(self.storage, Snapshot(self.resident_dir))
+            except Exception as e:
+                print(f"⚠️ Shard {self.name} could not be reloaded: {e}")
+        return _FallbackStore(self.storage)
+
+    def save(self):
+        """Persist a private shard before it is dropped from memory"""
+        if self.snapshot_root is not None or self.store.mutations == self.saved_mutations:
+            return
+        tmp = self.storage / f"resident.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        self.store.export(tmp)
+        shutil.rmtree(self.resident_dir, ignore_errors=True)
+        os.replace(tmp, self.resident_dir)
+        self.saved_mutations = self.store.mutations
+
+
+class SearchTimeout(Exception):
+    """No backend answered a search in time"""
+
+
+class _SearchLane:
+    """Executor for one search backend.
+
+    A backend that hangs only ties up its own threads. Once every thread is
+    held by a call its caller gave up on, further searches skip the backend
+    instead of queueing behind it.
+    """
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"rag-{name}")
+        self._abandoned: Set[Future] = set()
+        self._lock = threading.Lock()
+        self.skipped = 0
+
+    def submit(self, fn, *args) -> Optional[Future]:
+        with self._lock:
+            if len(self._abandoned) >= self.workers:
+                self.skipped += 1
+                return None
+        return self._pool.submit(fn, *args)
+
+    def abandon(self, fut: Future):
+        """The caller stopped waiting for fut; it holds a thread until it returns"""
+        with self._lock:
+            self._abandoned.add(fut)
+        fut.add_done_callback(self._finished)
+
+    def _finished(self, fut: Future):
+        with self._lock:
+            self._abandoned.discard(fut)
 
 
 class RAGSkill:
     name = "rag"
 
-    def __init__(self):
+    def __init__(self, llm=None):
         self.root = Path(__file__).parents[1]
-        self.storage = self.root / "rag_storage"
+        self.storage = STORAGE_DIR
         self.storage.mkdir(parents=True, exist_ok=True)
         
         # Enhanced initialization
         self.use_rag = False
         self.rag = None
         self.ollama_client = None
+        self.embed_hook: Optional[str] = None  # primary embedding method wrapped by the query cache
         self.last_query_time = 0
         self.cache = {}  # Simple query cache
-        
-        # Try Ollama client initialization
-        if OLLAMA_AVAILABLE:
-            try:
-                import ollama
-                self.ollama_client = ollama.Client()
-            except Exception:
-                pass
+        self._cache_lock = threading.Lock()
+        self.llm = llm  # LLMRouter for 'rag answer'
+        # (partition, user, packed-context hash) -> LLM state; a conversation is only resumed by its owner
+        self._resume: "OrderedDict[Tuple[str, str, str], List[int]]" = OrderedDict()
+        self._lanes = {name: _SearchLane(name, n) for name, n in SEARCH_LANE_WORKERS.items()}
+
+        # Primary health: outages flip it offline; writes queue up in the journal
+        self.primary_health = _PrimaryHealth(
+            probe=lambda: _with_timeout(self.rag.get_system_stats, PRIMARY_TIMEOUT_S),
+            journal=_WriteJournal(self.storage / "primary_journal.jsonl"),
+            replay=lambda e: _with_timeout(self.rag.add_document, PRIMARY_TIMEOUT_S, e["content"],
+                                           metadata=e["metadata"], source=e["source"]),
+            replayed=self._drop_replayed,
+        )
+
+        # Shared index: map the newest published snapshot instead of a private copy
+        self.shared_index = SHARED_INDEX
+
+        # Background ingestion: `rag add` returns a job id instead of blocking
+        self.jobs = JobQueue(self._run_ingest)
+        self.watchers: Dict[Tuple[str, str], DirectoryWatcher] = {}  # (owner shard, path) -> watcher
+
+        # Fallback index, one shard per guild/channel/user/namespace; loaded on first use
+        self._shards: Dict[str, _Shard] = {}
+        self._shards_lock = threading.Lock()
+        if SHARD_IDLE_S > 0:
+            threading.Thread(target=self._janitor_loop, daemon=True, name="rag-shard-janitor").start()
+
+        # Backend discovery and index loading happen off the startup path
+        self._ready = threading.Event()
+        self.warm_started = time.monotonic()
+        self.warm_seconds: Optional[float] = None
+        self.warm_error = ""
+        threading.Thread(target=self._warm_up, daemon=True, name="rag-warmup").start()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def fallback(self) -> "_FallbackStore":
+        """The current caller's shard"""
+        return self._shard().store
+
+    @fallback.setter
+    def fallback(self, store: "_FallbackStore"):
+        self._shard().store = store
+
+    def partition_key(self, text: str = "") -> str:
+        """The caller's shard; for --all queries and the jobs/shards listings, every shard the caller may read"""
+        scope = current_scope()
+        shard = shard_for(scope)
+        words = (text or "").lower().split()
+        if words[2:3] == ["--all"] or words[1:2] in (["jobs"], ["shards"]):
+            # visible_to() also admits the caller's DM shard and guild
+            return f"{shard}+all:{_safe(scope.user or '')}:{_safe(scope.guild or '')}{':op' if scope.operator else ''}"
+        return shard
+
+    @staticmethod
+    def _shard_name() -> str:
+        return shard_for(current_scope())
+
+    def _shard(self, name: Optional[str] = None, pin: bool = False) -> _Shard:
+        """Load a shard on first use; pin=True keeps it loaded until the caller unpins it"""
+        name = name or self._shard_name()
+        with self._shards_lock:
+            shard = self._shards.get(name)
+            created = shard is None
+            if created:
+                storage = self.storage if name == DEFAULT_SHARD else self.storage / "shards" / name
+                shard = self._shards[name] = _Shard(name, storage, self.shared_index)
+            if pin:
+                shard.pins += 1
+            if created:
+                self._unload_cold()
+            shard.last_used = time.monotonic()
+        if created and self.shared_index and self.ready:
+            self._refresh_snapshot(shard, force=True)
+        return shard
+
+    def _known_shards(self) -> List[str]:
+        names = set(self._shards)
+        try:
+            names.update(d.name for d in (self.storage / "shards").iterdir() if d.is_dir())
+        except OSError:
+            pass
+        return sorted(names)
 
-        # Try RAG system initialization with better error handling
-        if HAVE_RAG and RAGSystem is not None:
+    def _unload_cold(self) -> List[str]:
+        """Drop idle shards (and the least recently used beyond the cap). Call under the shards lock."""
+        watched = {w.owner for w in list(self.watchers.values())}
+        now = time.monotonic()
+        cold = [s for s in self._shards.values()
+                if s.name != DEFAULT_SHARD and not s.pins and s.batch is None and s.name not in watched]
+        cold.sort(key=lambda s: s.last_used)
+        excess = len(self._shards) - MAX_LOADED_SHARDS
+        unloaded = []
+        for shard in cold:
+            if now - shard.last_used < SHARD_IDLE_S and excess <= 0:
+                break
+            self._unload(shard)
+            unloaded.append(shard.name)
+            excess -= 1
+        return unloaded
+
+    def _janitor_loop(self):
+        """Apply RAG_SHARD_IDLE_S even when no new shard is being loaded"""
+        while True:
+            time.sleep(min(60.0, max(1.0, SHARD_IDLE_S / 4)))
             try:
-                self.rag = RAGSystem(self.storage)
-                self.use_rag = True
-                print(f"✅ RAG system initialized with storage: {self.storage}")
+                with self._shards_lock:
+                    self._unload_cold()
             except Exception as e:
-                print(f"⚠️ RAG system init failed: {e}")
-                self.use_rag = False
+                print(f"⚠️ Shard unload failed: {e}")
 
-        # Always initialize fallback
-        self.fallback = _FallbackStore(self.storage)
-        
-        if not self.use_rag:
-            print(f"🔄 Using fallback RAG storage: {self.storage}")
+    def _unload(self, shard: _Shard):
+        """Call under the shards lock"""
+        try:
+            shard.save()
+        except Exception as e:
+            print(f"⚠️ Shard {shard.name} could not be saved, keeping it loaded: {e}")
+            return
+        self._shards.pop(shard.name, None)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _warm_up(self):
+        try:
+            _discover_backends()
+
+            # Try Ollama client initialization
+            if OLLAMA_AVAILABLE:
+                try:
+                    import ollama
+                    self.ollama_client = ollama.Client()
+                except Exception:
+                    pass
+
+            # Try RAG system initialization with better error handling
+            if HAVE_RAG and RAGSystem is not None:
+                try:
+                    self.rag = RAGSystem(self.storage)
+                    self.use_rag = True
+                    self.embed_hook = _query_cache.wrap_embedder(self.rag)
+                    print(f"✅ RAG system initialized with storage: {self.storage}")
+                except Exception as e:
+                    print(f"⚠️ RAG system init failed: {e}")
+                    self.use_rag = False
+            if self.use_rag:
+                self.primary_health.recover()
+
+            self._refresh_snapshot(self._shard(DEFAULT_SHARD), force=True)
+            if not self.use_rag:
+                print(f"🔄 Using fallback RAG storage: {self.storage}")
+        except Exception as e:
+            # Serve from whatever came up rather than staying unavailable
+            self.warm_error = str(e)[:200]
+            print(f"⚠️ RAG warm-up failed: {e}")
+        finally:
+            self.warm_seconds = time.monotonic() - self.warm_started
+            self._ready.set()
+
+    def warmup_status(self) -> Dict[str, Any]:
+        elapsed = self.warm_seconds if self.ready else time.monotonic() - self.warm_started
+        return {"ready": self.ready, "seconds": round(elapsed, 2), "error": self.warm_error}
+
+    def _primary_ok(self) -> bool:
+        return self.use_rag and self.rag is not None and self.primary_health.online
+
+    def _primary_write(self, content: str, metadata: Dict[str, Any], source: str) -> bool:
+        """Write to the primary, or journal the write for replay. True if written now.
+
+        On False the caller keeps the document in the fallback; journaled
+        copies are tagged so they are dropped from it once replayed.
+        """
+        metadata.setdefault("shard", self._shard_name())
+        entry = {"content": content, "metadata": metadata, "source": source, "fallback": True}
+        while True:
+            if self._primary_ok():
+                try:
+                    _with_timeout(self.rag.add_document, PRIMARY_TIMEOUT_S, content, metadata=metadata,
+                                  source=source)
+                    self.primary_health.record_success()
+                    return True
+                except Exception as e:
+                    self.primary_health.record_failure(e)
+            if not (self.use_rag and self.rag is not None):
+                return False
+            # Not journaled if the primary came back meanwhile: write to it directly instead
+            if self.primary_health.journal.append(entry, unless=self._primary_ok):
+                return False
+
+    def _drop_replayed(self, entries: List[Dict[str, Any]]):
+        """Remove fallback copies of journaled writes the primary now holds"""
+        by_shard: Dict[str, Set[str]] = {}
+        for e in entries:
+            if e.get("fallback"):
+                meta = e.get("metadata") or {}
+                by_shard.setdefault(meta.get("shard", DEFAULT_SHARD), set()).add(str(meta.get("path", "")))
+        for shard, sources in by_shard.items():
+            with self._fallback_writer(shard) as store:
+                store.remove(s for s in sources if s)
+
+    def _refresh_snapshot(self, shard: Optional[_Shard] = None, force: bool = False):
+        """Swap a shard's store to its newest published generation"""
+        if not self.shared_index:
+            return
+        shard = shard or self._shard()
+        if shard.batch is not None:
+            return  # this process is the writer: its store is newer than any generation
+        now = time.monotonic()
+        if not force and now - shard.snapshot_checked < SNAPSHOT_POLL_S:
+            return
+        shard.snapshot_checked = now
+        name = current_generation(shard.snapshot_root)
+        if not name or name == shard.snapshot_name:
+            return
+        try:
+            snap = load_snapshot(shard.snapshot_root, name)
+        except Exception as e:
+            print(f"⚠️ Snapshot {name} could not be loaded: {e}")
+            return
+        shard.store = _FallbackStore.from_snapshot(shard.storage, snap)
+        shard.snapshot_name = name
+
+    @contextmanager
+    def _fallback_writer(self, shard_name: Optional[str] = None):
+        """Yield a shard's store for writing; in shared mode, publish the result.
+
+        Writers serialize on a cross-process lock and apply their changes on
+        top of the newest generation. Publishing rewrites the whole shard, so
+        writes within PUBLISH_DELAY_S are batched under one hold of the lock
+        and published together as one generation that all readers swap to.
+        """
+        shard = self._shard(shard_name, pin=True)
+        try:
+            if not self.shared_index:
+                yield shard.store
+                return
+            self._join_batch(shard)
+            try:
+                with shard.writer_mutex:
+                    yield shard.store
+            finally:
+                self._leave_batch(shard)
+        finally:
+            with self._shards_lock:
+                shard.pins -= 1
+
+    def _join_batch(self, shard: _Shard):
+        with shard.batch_cond:
+            while shard.batch is not None and shard.batch.closing:
+                shard.batch_cond.wait()
+            if shard.batch is None:
+                lock = WriterLock(shard.snapshot_root)
+                lock.acquire()
+                try:
+                    self._refresh_snapshot(shard, force=True)
+                except BaseException:
+                    lock.release()
+                    raise
+                batch = shard.batch = _PublishBatch(lock, shard.store.mutations)
+                timer = threading.Timer(PUBLISH_DELAY_S, self._batch_due, args=(shard, batch))
+                timer.daemon = True
+                timer.start()
+            shard.batch.writers += 1
+
+    def _leave_batch(self, shard: _Shard):
+        with shard.batch_cond:
+            shard.batch.writers -= 1
+            if shard.batch.closing and not shard.batch.writers:
+                self._close_batch(shard)
+
+    def _batch_due(self, shard: _Shard, batch: _PublishBatch):
+        with shard.batch_cond:
+            if shard.batch is batch:
+                batch.closing = True
+                if not batch.writers:
+                    self._close_batch(shard)
+
+    def _close_batch(self, shard: _Shard):
+        """Publish the batch and release the writer lock. Call under batch_cond with no writers left."""
+        batch, shard.batch = shard.batch, None
+        try:
+            if shard.store.mutations != batch.mutations:
+                try:
+                    with tracing.span("store.publish", docs=len(shard.store)):
+                        shard.store.publish(shard.snapshot_root)
+                except Exception as e:
+                    print(f"⚠️ Shard {shard.name} could not be published, dropping its unpublished writes: {e}")
+                # Remap the published (or, after a failure, the last good) generation
+                shard.snapshot_name = None
+                if current_generation(shard.snapshot_root) is None:
+                    shard.store = _FallbackStore(shard.storage)
+                self._refresh_snapshot(shard, force=True)
+        finally:
+            batch.lock.release()
+            shard.batch_cond.notify_all()
+
+    def _publish_now(self, shard: _Shard):
+        """Publish a shard's pending writes without waiting for the batch window (not from inside a writer)"""
+        with shard.batch_cond:
+            while shard.batch is not None:
+                shard.batch.closing = True
+                if not shard.batch.writers:
+                    self._close_batch(shard)
+                else:
+                    shard.batch_cond.wait()
 
     def can_handle(self, text: str) -> bool:
         t = (text or "").strip().lower()
         return any(t.startswith(cmd) for cmd in [
-            "rag add ", "rag ask ", "rag add_text ", "rag search ", "rag clear", "rag list",
-            "rag index ", "rag summary ", "rag export "
-        ]) or t in ["rag status", "rag help", "rag stats"]
+            "rag add ", "rag ask ", "rag answer ", "rag add_text ", "rag search ", "rag clear", "rag list",
+            "rag index ", "rag summary ", "rag export", "rag import ", "rag jobs", "rag watch", "rag unwatch ",
+            "rag shards"
+        ]) or t in ["rag status", "rag help", "rag stats", "rag restore"]
 
     def handle(self, text: str) -> str:
         t = (text or "").strip()
         low = t.lower()
+        if not self._ready.is_set() and low not in ("rag help", "rag status"):
+            if not self._ready.wait(WARMUP_WAIT_S):
+                elapsed = time.monotonic() - self.warm_started
+                return f"⏳ RAG index is warming up ({elapsed:.0f}s so far), try again shortly"
+        if self._ready.is_set():
+            self._refresh_snapshot()
         
         # Enhanced command routing
         if low.startswith("rag add_text "):
@@ -203,12 +1566,27 @@ class RAGSkill:
         
         elif low.startswith("rag add ") or low.startswith("rag index "):
             path = t.split(None, 2)[2] if len(t.split()) > 2 else ""
-            return self._cmd_add(path)
+            wait = path.startswith("--wait")
+            if wait:
+                path = path[len("--wait"):].strip()
+            return self._cmd_add(path, wait=wait)
+        
+        elif low == "rag jobs" or low.startswith("rag jobs "):
+            return self._cmd_jobs(t.split()[2:])
+        
+        elif low == "rag watch" or low.startswith("rag watch "):
+            return self._cmd_watch(t[len("rag watch"):].strip())
+        
+        elif low.startswith("rag unwatch "):
+            return self._cmd_unwatch(t[len("rag unwatch "):].strip())
         
         elif low.startswith("rag ask ") or low.startswith("rag search "):
             q = " ".join(t.split()[2:])
             return self._cmd_ask(q)
         
+        elif low.startswith("rag answer "):
+            return self._cmd_answer(" ".join(t.split()[2:]))
+        
         elif low.startswith("rag summary "):
             topic = " ".join(t.split()[2:])
             return self._cmd_summary(topic)
@@ -219,105 +1597,398 @@ class RAGSkill:
         elif low == "rag list":
             return self._cmd_list()
         
-        elif low == "rag export":
-            return self._cmd_export()
+        elif low == "rag export" or low.startswith("rag export "):
+            return self._cmd_export(t[len("rag export"):].strip())
+        
+        elif low.startswith("rag import "):
+            return self._cmd_import(t[len("rag import "):].strip())
+        
+        elif low == "rag restore":
+            return self._cmd_restore()
+        
+        elif low == "rag shards" or low.startswith("rag shards "):
+            return self._cmd_shards(t.split()[2:])
         
-        elif low in ["rag status", "rag stats"]:
+        elif low == "rag status":
             return self._cmd_status()
         
+        elif low == "rag stats":
+            return self._cmd_stats()
+        
         elif low == "rag help":
             return self._cmd_help()
         
         return self._cmd_help()
 
-    def _iter_files(self, p: Path):
-        if p.is_file() and p.suffix.lower() in SUPPORTED_EXTS:
-            yield p
-        elif p.is_dir():
-            for fp in p.rglob("*"):
-                if fp.is_file() and fp.suffix.lower() in SUPPORTED_EXTS:
-                    yield fp
+    @staticmethod
+    def _walker() -> FileWalker:
+        return FileWalker(accept=_is_supported)
 
-    def _cmd_add(self, path_str: str) -> str:
+    def _cmd_add(self, path_str: str, wait: bool = False) -> str:
         p = Path(path_str).expanduser().resolve()
         if not p.exists():
             return f"Path not found: {p}"
+        if wait:
+            job = IngestJob(str(p), shard=self._shard_name())
+            job.started_at = time.time()
+            self._run_ingest(job)
+            return f"Indexed {job.indexed} documents from {p}"
+        try:
+            job = self.jobs.submit(str(p), shard=self._shard_name())
+        except queue.Full:
+            return f"⏳ Ingestion queue is full ({self.jobs.pending()} jobs waiting), try again later"
+        return f"📥 Job {job.id} queued: indexing {p} (check with 'rag jobs {job.id}')"
+
+    def _run_ingest(self, job: IngestJob):
+        """Walk job.path and index every supported file, reporting progress on the job"""
+        self._ready.wait()
+        p = Path(job.path)
+        files = []
+        walker = self._walker()
+        with tracing.span("walk"):
+            for fp, size in walker.walk(p):
+                job.check()
+                files.append((fp, size))
+                job.files_total += 1
+                job.bytes_total += size
+        job.ignored = walker.stats.skipped()
+        job.state = RUNNING
+        # Files are read outside the writer lock; each batch is written (and,
+        # in shared mode, published) on its own, so readers and other writers
+        # get a turn between batches
+        batch: List[Tuple[str, str]] = []
+        replaced: List[str] = []
+        try:
+            for fp, size in files:
+                try:
+                    job.check()
+                except JobCancelled:
+                    # Cancelling keeps what was already indexed
+                    self._write_batch(job.shard, batch, replaced)
+                    raise
+                ok = self._read_file_docs(fp, batch, job.shard)
+                if ok:
+                    replaced.append(str(fp))
+                job.file_done(size, ok)
+                if len(batch) >= INGEST_BATCH:
+                    self._write_batch(job.shard, batch, replaced)
+                    batch, replaced = [], []
+            self._write_batch(job.shard, batch, replaced)
+        finally:
+            if self.shared_index:
+                self._publish_now(self._shard(job.shard))  # other processes see the job's result now
+
+    def _write_batch(self, shard: str, batch: List[Tuple[str, str]], replaced: List[str]):
+        """Add one batch of file chunks to a shard, replacing older chunks of the same files"""
+        if batch or replaced:
+            with self._fallback_writer(shard) as store:
+                store.add_docs(batch, replace=replaced)
+
+    def _read_file_docs(self, fp: Path, batch: List[Tuple[str, str]], shard: str) -> bool:
+        """Chunk one file into the primary, or into batch for the fallback store"""
+        start = len(batch)
+        try:
+            chunks = _iter_text_chunks(fp)
+            for i in itertools.count():
+                with tracing.span("read"):
+                    content = next(chunks, None)
+                if content is None:
+                    break
+                doc_id = str(fp) if i == 0 else f"{fp}#{i + 1}"
+                meta = {"path": str(fp), "chunk": i, "shard": shard}
+                with tracing.span("primary.write"):
+                    written = self._primary_write(content, meta, "file")
+                if not written:
+                    batch.append((content, doc_id, "file"))
+            return True
+        except Exception:
+            del batch[start:]  # never index half a file
+            return False
+
+    def _apply_changes(self, changed: List[Path], removed: List[Path], shard: str = DEFAULT_SHARD) -> int:
+        """Re-index changed files and drop removed ones (watcher callback)"""
         count = 0
-        for fp in self._iter_files(p):
-            try:
-                content = _read_text(fp)
-                if self.use_rag and self.rag is not None:
-                    self.rag.add_document(content, metadata={"path": str(fp)}, source="file")
-                else:
-                    self.fallback.add_doc(content, doc_id=str(fp))
+        walker = self._walker()
+        roots = [w.root for w in list(self.watchers.values()) if w.owner == shard]
+        # Same ignore rules and size/binary limits as the initial walk
+        changed = [fp for fp in changed
+                   if walker.allowed(fp, next((r for r in roots if r in fp.parents), None))]
+        if removed:
+            with self._fallback_writer(shard) as store:
+                store.remove(str(p) for p in removed)
+        # As in _run_ingest, files are read and chunked outside the writer lock
+        batch: List[Tuple[str, str]] = []
+        replaced: List[str] = []
+        for fp in changed:
+            if self._read_file_docs(fp, batch, shard):
+                replaced.append(str(fp))
                 count += 1
-            except Exception:
-                continue
-        return f"Indexed {count} documents from {p}"
+            if len(batch) >= INGEST_BATCH:
+                self._write_batch(shard, batch, replaced)
+                batch, replaced = [], []
+        self._write_batch(shard, batch, replaced)
+        return count
+
+    def _visible_watchers(self) -> List[DirectoryWatcher]:
+        scope = current_scope()
+        return [w for w in list(self.watchers.values()) if visible_to(scope, w.owner)]
+
+    def _cmd_watch(self, path_str: str) -> str:
+        if not path_str:
+            watchers = self._visible_watchers()
+            if not watchers:
+                return "Not watching any directories (rag watch <dir>)"
+            return "👀 Watching:\n" + "\n".join(self._watch_line(w) for w in watchers)
+        p = Path(path_str).expanduser().resolve()
+        if not p.is_dir():
+            return f"Not a directory: {p}"
+        shard = self._shard_name()
+        if (shard, str(p)) in self.watchers:
+            return f"Already watching {p}"
+        watcher = DirectoryWatcher(p, partial(self._apply_changes, shard=shard), accept=_is_supported,
+                                   owner=shard, walker=self._walker())
+        self.watchers[(shard, str(p))] = watcher
+        # Initial sync; chunks are replaced per file, so already-indexed files are not duplicated
+        try:
+            job = self.jobs.submit(str(p), shard=shard)
+            initial = f"initial indexing job {job.id}"
+        except queue.Full:
+            initial = "initial indexing skipped (job queue full; run 'rag add' later)"
+        return f"👀 Watching {p} via {watcher.backend}; {initial}"
+
+    def _cmd_unwatch(self, path_str: str) -> str:
+        key = str(Path(path_str).expanduser().resolve())
+        # The caller's own watcher first, else one in a shard it may read (e.g. its guild's)
+        owners = [w.owner for w in self._visible_watchers() if str(w.root) == key]
+        owner = self._shard_name() if self._shard_name() in owners else next(iter(owners), None)
+        watcher = self.watchers.pop((owner, key), None) if owner else None
+        if watcher is None:
+            return f"Not watching {key}"
+        watcher.stop()
+        return f"🛑 Stopped watching {key}"
+
+    @staticmethod
+    def _watch_line(watcher: DirectoryWatcher) -> str:
+        st = watcher.status()
+        line = (f"{st['root']} ({st['backend']}, shard {st['owner']}): lag {st['lag_s']}s, {st['pending']} pending, "
+                f"last batch lag {st['last_lag_s']}s, {st['reindexed']} files re-indexed")
+        if st["last_error"]:
+            line += f" ⚠️ {st['last_error']}"
+        return line
+
+    def _cmd_jobs(self, args: List[str]) -> str:
+        scope = current_scope()
+        mine = lambda job: job is not None and visible_to(scope, job.shard)
+        if args and args[0].lower() == "cancel":
+            if len(args) < 2:
+                return "Usage: rag jobs cancel <id>"
+            if not mine(self.jobs.get(args[1])):
+                return f"❌ No such job: {args[1]}"
+            job = self.jobs.cancel(args[1])
+            return f"🛑 Cancelling job {job.id}" if job else f"❌ No such job: {args[1]}"
+        if args:
+            job = self.jobs.get(args[0])
+            return job.summary() if mine(job) else f"❌ No such job: {args[0]}"
+        jobs = [job for job in self.jobs.list() if mine(job)]
+        if not jobs:
+            return "No ingestion jobs"
+        return "📥 Ingestion jobs:\n" + "\n".join(job.summary() for job in reversed(jobs[-20:]))
 
     def _cmd_add_text(self, doc_id: str, content: str) -> str:
         if not content.strip():
             return "No content provided"
-        if self.use_rag and self.rag is not None:
-            try:
-                self.rag.add_document(content, metadata={"path": doc_id}, source="discord_attachment")
-                return f"Added: {doc_id}"
-            except Exception:
-                # fallback transparently
-                pass
-        self.fallback.add_doc(content, doc_id=doc_id)
+        if self._primary_write(content, {"path": doc_id}, "discord_attachment"):
+            return f"Added: {doc_id}"
+        with self._fallback_writer() as store:
+            store.add_doc(content, doc_id=doc_id, source="discord_attachment")
         return f"Added (fallback): {doc_id}"
 
+    def _cross_shards(self, q: str) -> Tuple[Optional[List[str]], str]:
+        """A leading --all searches every shard this caller may read: (shards, rest of q)"""
+        if not q.lower().startswith("--all"):
+            return None, q
+        scope = current_scope()
+        return [name for name in self._known_shards() if visible_to(scope, name)], q[len("--all"):].strip()
+
+    def _cache_put(self, key: str, value: str):
+        with self._cache_lock:
+            self.cache.pop(key, None)
+            self.cache[key] = (time.time(), value)
+            while len(self.cache) > CACHE_MAX:
+                self.cache.pop(next(iter(self.cache)))
+
+    def _cmd_answer(self, q: str) -> str:
+        """Retrieve, pack the best passages into a token budget and ask the LLM once"""
+        if self.llm is None or not self.llm.backends:
+            return "❌ 'rag answer' needs an LLM backend (set OLLAMA_BASE_URL or OPENAI_API_KEY); try 'rag ask'"
+        owner = (self.partition_key(f"rag answer {q}"), current_scope().user or "")
+        shards, q = self._cross_shards(q)
+        try:
+            flt, q = parse_filters(q)
+        except ValueError as e:
+            return f"❌ Bad filter: {e} (since: takes 30m, 12h, 7d, 2w or an ISO date)"
+        if not q:
+            return "Provide a question after 'rag answer'"
+        try:
+            hits = self._retrieve(q, k=ANSWER_K, flt=flt, shards=shards)
+        except SearchTimeout as e:
+            return f"⏳ Search timed out ({e}), try again shortly"
+        if not hits:
+            return f"No relevant documents found{' matching ' + flt.describe() if flt else ''}."
+        with tracing.span("pack"):
+            packed = pack_context([(src, best_passage(content, q, width=PASSAGE_CHARS).text)
+                                   for src, _, content, _ in hits])
+
+        # Same passages, same question, same conversation: same answer
+        cache_key = f"answer:{':'.join(owner)}:{packed.digest}:{' '.join(q.lower().split())}"
+        with self._cache_lock:
+            cached = self.cache.get(cache_key)
+            resume = self._resume.get(owner + (packed.digest,))
+        if cached is not None and time.time() - cached[0] < 300:
+            return cached[1] + " (cached)"
+
+        options: Dict[str, Any] = {"temperature": 0.2}
+        if resume:
+            # Follow-up over the same context: the backend already processed the passages
+            options.update(context=resume, followup=followup_prompt(q))
+        with tracing.span("rag.generate", tokens=packed.tokens, resumed=bool(resume)):
+            out = self.llm.complete(build_prompt(packed, q), **options)
+        if not out.backend:
+            return f"❌ {out.text}"
+        with self._cache_lock:
+            self._resume.pop(owner + (packed.digest,), None)
+            if out.context and len(out.context) <= 4 * ANSWER_TOKENS:
+                self._resume[owner + (packed.digest,)] = out.context
+                while len(self._resume) > RESUME_MAX:
+                    self._resume.popitem(last=False)
+
+        sources = ", ".join(f"[{i}] {src}" for i, src in enumerate(packed.sources, 1))
+        notes = [f"~{packed.tokens} context tokens from {len(packed.sources)} passages"]
+        if packed.dropped:
+            notes.append(f"{packed.dropped} dropped for budget")
+        if resume and out.backend == "ollama":
+            notes.append("context reused")
+        notes.append(f"via {out.backend}")
+        answer = f"🧠 {out.text.strip()}\n\n📎 Sources: {sources}\n({', '.join(notes)})"
+        self._cache_put(cache_key, answer)
+        return answer
+
     def _cmd_ask(self, q: str) -> str:
+        shards, q = self._cross_shards(q)
+        try:
+            flt, q = parse_filters(q)
+        except ValueError as e:
+            return f"❌ Bad filter: {e} (since: takes 30m, 12h, 7d, 2w or an ISO date)"
         if not q:
             return "Provide a question after 'rag ask'"
-        if self.use_rag and self.rag is not None:
-            try:
-                res = self.rag.query(q, max_results=3)
-                if not res.documents:
-                    return "No relevant documents found."
-                lines = ["Results:"]
-                for i, doc in enumerate(res.documents[:3], 1):
-                    snippet = (doc.content or "")[:200].replace("\n", " ")
-                    src = doc.metadata.get("path", doc.source)
-                    lines.append(f"{i}. {snippet} ... [src: {src}]")
-                return "\n".join(lines)
-            except Exception as e:
-                # fallback transparently
-                pass
-        hits = self.fallback.search(q, k=3)
+        try:
+            hits = self._retrieve(q, k=3, flt=flt, shards=shards)
+        except SearchTimeout as e:
+            return f"⏳ Search timed out ({e}), try again shortly"
         if not hits:
-            return "No relevant documents found."
-        lines = ["Results (fallback):"]
-        for i, (doc_id, score, content) in enumerate(hits, 1):
-            snippet = content[:200].replace("\n", " ")
-            lines.append(f"{i}. {snippet} ... [score: {score:.2f}] [src: {doc_id}]")
+            return f"No relevant documents found{' matching ' + flt.describe() if flt else ''}."
+        scope_note = [flt.describe()] if flt else []
+        if shards is not None:
+            scope_note.append(f"{len(shards)} shards")
+        lines = [f"Results ({', '.join(scope_note)}):" if scope_note else "Results:"]
+        with tracing.span("snippets"):
+            for i, (src, score, content, via) in enumerate(hits, 1):
+                passage = best_passage(content, q)
+                where = f" [at: {passage.start}]" if passage.matches else ""
+                lines.append(f"{i}. {render(passage, content)} [score: {score:.3f}] [src: {src}]{where} "
+                             f"[via: {'+'.join(via)}]")
         return "\n".join(lines)
 
     def _cmd_status(self) -> str:
         """Get RAG system status"""
         lines = ["🤖 RAG System Status:"]
+        if not self.ready:
+            lines.append(f"⏳ Warming up: {self.warmup_status()['seconds']:.0f}s, index not loaded yet")
+        elif self.warm_error:
+            lines.append(f"⚠️ Warm-up error: {self.warm_error}")
         
-        if self.use_rag and self.rag is not None:
+        health = self.primary_health
+        if self._primary_ok():
             try:
                 stats = self.rag.get_system_stats()
                 total = stats.get("vector_store", {}).get("total_documents", 0)
                 backend = stats.get("vector_store", {}).get("backend", "unknown")
                 lines.append(f"✅ Primary RAG: {backend} backend, {total} documents")
             except Exception as e:
+                health.record_failure(e)
                 lines.append(f"⚠️ Primary RAG error: {e}")
+        elif self.use_rag and self.rag is not None:
+            since = time.strftime("%H:%M:%S", time.localtime(health.changed_at))
+            lines.append(f"⚠️ Primary RAG: offline since {since}, probing ({health.last_error})")
+            lines.append(f"📝 Queued writes: {health.journal.pending}")
         else:
             lines.append("❌ Primary RAG: Not available")
         
-        fb_docs = len(getattr(self.fallback, 'docs', []))
-        lines.append(f"🔄 Fallback: {fb_docs} documents")
+        shard = self._shard()
+        lines.append(f"🔄 Fallback: {len(shard.store)} documents ({shard.store.dtype} embeddings)")
+        if SHARD_BY != "none":
+            lines.append(f"🧩 Shard: {shard.name} ({len(self._shards)} loaded, by {SHARD_BY})")
+        used = sum(self.fallback.memory_usage().values())
+        budget = self.fallback.budget
+        cap = f" of {budget.limit / 2**20:.4g} MiB" if budget.limit else ""
+        lines.append(f"🧠 Memory: {used / 2**20:.1f} MiB{cap} ({budget.policy}, {budget.evicted} evicted)")
         
         if self.ollama_client:
             lines.append("✅ Ollama: Connected")
         else:
             lines.append("❌ Ollama: Not connected")
         
-        lines.append(f"💾 Storage: {self.storage}")
+        if self.shared_index:
+            lines.append(f"🗂️ Shared index: {shard.snapshot_name or 'no snapshot yet'}")
+        for watcher in list(self.watchers.values()):
+            if watcher.owner == shard.name:
+                lines.append(f"👀 Watch: {self._watch_line(watcher)}")
+        lines.append(f"💾 Storage: {shard.storage}")
+        return "\n".join(lines)
+    
+    def _cmd_stats(self) -> str:
+        """Status plus fallback memory usage per document"""
+        mem = self.fallback.memory_stats()
+        lines = [self._cmd_status(), "", "📊 Fallback Memory:"]
+        store = self.fallback
+        rescore = (f"float32 rescoring x{store.rescore}, {mem['exact_disk_bytes'] / 1024:.1f} KiB on disk"
+                   if mem["exact_disk_bytes"] or store.view().exact is not None else "no rescoring")
+        lines.append(f"  Embedding dtype: {mem['dtype']} ({rescore})")
+        lines.append(
+            f"  Embeddings: {mem['embedding_bytes_per_doc']} B/doc "
+            f"(float32 would be {mem['float32_bytes_per_doc']} B/doc)"
+        )
+        lines.append(f"  Embeddings total: {mem['embedding_bytes'] / 1024:.1f} KiB "
+                     f"({mem['allocated_bytes'] / 1024:.1f} KiB allocated)")
+        lines.append(f"  Content total: {mem['content_bytes'] / 1024:.1f} KiB")
+        lines.append(f"  Memory per document: {mem['bytes_per_doc']:.0f} B")
+
+        usage = mem["usage"]
+        with self._cache_lock:
+            cache_entries = len(self.cache)
+            cache_bytes = sum(len(summary.encode("utf-8")) for _, summary in self.cache.values())
+        lines += ["", f"🧠 Memory Budget: {mem['budget']}"]
+        lines.append(f"  Used: {mem['used_bytes'] / 1024:.1f} KiB"
+                     + (f" ({100 * mem['used_bytes'] / mem['budget_bytes']:.0f}%)" if mem["budget_bytes"] else ""))
+        for label, key in (("Embeddings", "embeddings"), ("Content", "content"),
+                           ("Ids/metadata", "metadata"), ("Lexical index", "lexical")):
+            lines.append(f"  {label}: {usage[key] / 1024:.1f} KiB")
+        lines.append(f"  Summary cache: {cache_entries} entries, {cache_bytes / 1024:.1f} KiB (max {CACHE_MAX})")
+        qc = _query_cache.stats()
+        kinds = ", ".join(f"{kind} {h}/{h + m}" for kind, (h, m) in qc["by_kind"].items())
+        lines.append(f"  Query cache: {qc['entries']}/{qc['max_entries']} entries, "
+                     f"{100 * qc['hit_ratio']:.0f}% hits ({qc['hits']}/{qc['hits'] + qc['misses']})"
+                     + (f"; {kinds}" if kinds else "")
+                     + (f"; wraps primary {self.embed_hook}()" if self.embed_hook else ""))
+        for source, used in sorted(mem["by_source"].items(), key=lambda kv: -kv[1]):
+            lines.append(f"  Source {source}: {used / 1024:.1f} KiB")
+        lines.append(f"  Evicted: {mem['evicted_docs']} docs ({mem['evicted_bytes'] / 1024:.1f} KiB) "
+                     f"in {mem['eviction_passes']} passes")
+        if mem["spill_docs"]:
+            lines.append(f"  Spilled to disk: {mem['spill_docs']} docs ({mem['spill_bytes'] / 1024:.1f} KiB), "
+                         f"'rag restore' re-indexes them")
+        if mem["spill_error"]:
+            lines.append(f"  ⚠️ Spill error: {mem['spill_error']}")
         return "\n".join(lines)
     
     def _cmd_help(self) -> str:
@@ -325,20 +1996,32 @@ class RAGSkill:
         return """🤖 RAG System Commands:
         
 📁 Data Management:
-  rag add <file_or_dir>     - Index files/directories
+  rag add <file_or_dir>     - Index files/directories in the background
+  rag add --wait <path>     - Index and wait for completion
+  rag jobs [id]             - Show ingestion job progress
+  rag jobs cancel <id>      - Cancel an ingestion job
+  rag watch [dir]           - Keep a directory in sync (list watches without dir)
+  rag unwatch <dir>         - Stop watching a directory
   rag add_text <id> :: <content> - Add text directly
   rag clear                 - Clear all documents
   rag list                  - List indexed documents
   
 🔍 Querying:
   rag ask <question>        - Ask questions
+  rag answer <question>     - LLM answer grounded in the best matching passages
+  rag ask --all <question>  - Search every shard you can read, not just this one
+  rag ask ext:py path:<dir> source:file since:7d <question>
+                            - Scope a search by metadata (also for search/summary)
   rag search <query>        - Search documents  
   rag summary <topic>       - Get topic summary
   
 📊 Information:
   rag status               - Show system status
   rag stats                - Show detailed stats
-  rag export               - Export document list
+  rag export [dir]         - Export a binary index snapshot
+  rag import <dir>         - Load an exported snapshot (replaces fallback index)
+  rag restore              - Re-index documents evicted by the memory budget
+  rag shards [unload <name>] - List index shards / unload a cold one
   rag help                 - Show this help
   
 💡 Examples:
@@ -349,15 +2032,17 @@ class RAGSkill:
     def _cmd_clear(self) -> str:
         """Clear all documents"""
         try:
-            if self.use_rag and self.rag is not None:
+            if self._primary_ok():
                 # If RAG system has a clear method
                 if hasattr(self.rag, 'clear_documents'):
                     self.rag.clear_documents()
                     return "✅ Cleared primary RAG system"
             
             # Clear fallback
-            self.fallback.docs.clear()
-            self.cache.clear()
+            with self._fallback_writer() as store:
+                store.clear()
+            with self._cache_lock:
+                self.cache.clear()
             return "✅ Cleared fallback documents"
             
         except Exception as e:
@@ -367,7 +2052,7 @@ class RAGSkill:
         """List indexed documents"""
         lines = ["📚 Indexed Documents:"]
         
-        if self.use_rag and self.rag is not None:
+        if self._primary_ok():
             try:
                 # Try to get document list from RAG system
                 if hasattr(self.rag, 'list_documents'):
@@ -382,96 +2067,252 @@ class RAGSkill:
                 pass
         
         # Fallback listing
-        fb_docs = getattr(self.fallback, 'docs', [])
-        if fb_docs:
-            for i, (doc_id, content, _) in enumerate(fb_docs[:10], 1):
-                preview = content[:50].replace('\n', ' ')
-                lines.append(f"{i}. {doc_id}: {preview}...")
-            if len(fb_docs) > 10:
-                lines.append(f"... and {len(fb_docs)-10} more")
+        if len(self.fallback):
+            for i, (doc_id, content) in enumerate(self.fallback.iter_docs(), 1):
+                if i > 10:
+                    break
+                preview = render(best_passage(content, width=50), content)
+                lines.append(f"{i}. {doc_id}: {preview}")
+            if len(self.fallback) > 10:
+                lines.append(f"... and {len(self.fallback)-10} more")
         else:
             lines.append("No documents indexed")
             
         return "\n".join(lines)
     
-    def _cmd_export(self) -> str:
-        """Export document information"""
+    def _cmd_export(self, target: str = "") -> str:
+        """Export the fallback index as a binary snapshot directory"""
         try:
-            export_path = self.storage / f"rag_export_{int(time.time())}.json"
-            
-            export_data = {
-                "timestamp": time.time(),
-                "system_status": {
-                    "use_rag": self.use_rag,
-                    "have_ollama": self.ollama_client is not None,
-                    "storage_path": str(self.storage)
-                },
-                "documents": []
-            }
-            
-            # Export fallback docs
-            fb_docs = getattr(self.fallback, 'docs', [])
-            for doc_id, content, _ in fb_docs:
-                export_data["documents"].append({
-                    "id": doc_id,
-                    "content_preview": content[:200],
-                    "content_length": len(content),
-                    "source": "fallback"
-                })
-            
-            with open(export_path, 'w') as f:
-                json.dump(export_data, f, indent=2)
-                
-            return f"✅ Exported {len(export_data['documents'])} documents to {export_path}"
-            
+            if target:
+                export_path = Path(target).expanduser().resolve()
+            else:
+                export_path = self._shard().storage / "exports" / f"rag_export_{int(time.time())}"
+            export_path.parent.mkdir(parents=True, exist_ok=True)
+            count = self.fallback.export(export_path)
+            note = " (primary RAG documents live in the primary backend and are not included)" if self.use_rag else ""
+            return f"✅ Exported {count} documents to {export_path}{note}"
+        except FileExistsError:
+            return f"❌ Export error: {target} already exists"
         except Exception as e:
             return f"❌ Export error: {e}"
     
+    def _cmd_import(self, source: str) -> str:
+        """Replace the fallback index with an exported snapshot (memory-mapped, no re-embedding)"""
+        if not source:
+            return "Usage: rag import <export_dir>"
+        src = Path(source).expanduser().resolve()
+        try:
+            snap = Snapshot(src, verify=True)
+            if snap.manifest.get("dim", EMBED_DIM) != EMBED_DIM:
+                return f"❌ Import error: snapshot has {snap.manifest.get('dim')}-dim embeddings, expected {EMBED_DIM}"
+            shard = self._shard()
+            if self.shared_index:
+                # Holding batch_cond keeps new write batches from opening until the import is mapped
+                with shard.batch_cond:
+                    self._publish_now(shard)
+                    with writer_lock(shard.snapshot_root):
+                        publish_from(shard.snapshot_root, src)
+                    self._refresh_snapshot(shard, force=True)
+            else:
+                shard.store = _FallbackStore.from_snapshot(shard.storage, snap)
+            with self._cache_lock:
+                self.cache.clear()
+            return f"✅ Imported {len(self.fallback)} documents from {src} ({snap.dtype} embeddings)"
+        except FileNotFoundError as e:
+            return f"❌ Import error: missing {e.filename}"
+        except Exception as e:
+            return f"❌ Import error: {e}"
+    
+    def _cmd_shards(self, args: List[str]) -> str:
+        scope = current_scope()
+        visible = [name for name in self._known_shards() if visible_to(scope, name)]
+        if args and args[0].lower() == "unload":
+            if len(args) < 2 or args[1] not in visible:
+                return "Usage: rag shards unload <name> (see 'rag shards')"
+            with self._shards_lock:
+                shard = self._shards.get(args[1])
+                if shard is None:
+                    return f"Shard {args[1]} is not loaded"
+                if shard.name == DEFAULT_SHARD or shard.pins or shard.batch is not None:
+                    return f"⏳ Shard {shard.name} is in use and stays loaded"
+                self._unload(shard)
+            return f"💤 Unloaded shard {args[1]}"
+        lines = [f"🧩 Shards (by {SHARD_BY}, {len(self._shards)} loaded, idle unload after {SHARD_IDLE_S:.0f}s):"]
+        now = time.monotonic()
+        current = self._shard_name()
+        for name in visible:
+            shard = self._shards.get(name)
+            mark = " ←" if name == current else ""
+            if shard is None:
+                lines.append(f"  💤 {name}: on disk{mark}")
+                continue
+            used = sum(shard.store.memory_usage().values())
+            lines.append(f"  🟢 {name}: {len(shard.store)} docs, {used / 2**20:.1f} MiB, "
+                         f"idle {now - shard.last_used:.0f}s{mark}")
+        return "\n".join(lines)
+
+    def _cmd_restore(self) -> str:
+        """Re-index documents the memory budget evicted to the spill file"""
+        restored = skipped = 0
+        try:
+            with self._fallback_writer() as store:
+                evicted_before = store.budget.evicted
+                live = {doc_id for doc_id, _ in store.iter_docs()}
+                batch: List[Tuple[str, str, str, Optional[float]]] = []
+                for rec in store.spill.take():
+                    if rec.get("id") in live:
+                        skipped += 1  # re-indexed since it was evicted
+                        continue
+                    batch.append((rec.get("content", ""), rec.get("id", ""), rec.get("source") or "text",
+                                  rec.get("added")))
+                    if len(batch) >= INGEST_BATCH:
+                        restored += store.add_docs(batch)
+                        batch = []
+                restored += store.add_docs(batch)
+                evicted = store.budget.evicted - evicted_before
+        except Exception as e:
+            return f"❌ Restore error: {e}"
+        if not restored and not skipped:
+            return "📭 No evicted documents to restore"
+        with self._cache_lock:
+            self.cache.clear()
+        line = f"✅ Restored {restored} evicted documents"
+        if skipped:
+            line += f", {skipped} already re-indexed"
+        if evicted:
+            line += f" ({evicted} others evicted to stay within budget)"
+        return line
+    
     def _cmd_summary(self, topic: str) -> str:
         """Generate summary for a topic"""
         if not topic:
             return "Usage: rag summary <topic>"
         
         # Use cached result if recent
-        cache_key = f"summary:{topic}"
-        if cache_key in self.cache:
-            cached_time, result = self.cache[cache_key]
+        cache_key = f"summary:{self._shard_name()}:{topic}"
+        with self._cache_lock:
+            cached = self.cache.get(cache_key)
+        if cached is not None:
+            cached_time, result = cached
             if time.time() - cached_time < 300:  # 5 minute cache
                 return f"📋 Summary (cached): {result}"
         
         # Search for relevant documents
-        search_results = self._search_docs(topic, k=5)
+        try:
+            flt, query = parse_filters(topic)
+        except ValueError as e:
+            return f"❌ Bad filter: {e}"
+        try:
+            search_results = self._search_docs(query, k=5, flt=flt) if query else []
+        except SearchTimeout as e:
+            return f"⏳ Search timed out ({e}), try again shortly"
         
         if not search_results:
             return f"❌ No documents found for topic: {topic}"
         
-        # Create summary from top results
-        summary_parts = []
-        for doc_id, score, content in search_results:
-            # Take first 100 chars as snippet
-            snippet = content[:100].replace('\n', ' ').strip()
-            summary_parts.append(f"• {snippet}... (from {doc_id})")
-        
-        summary = f"📋 Summary for '{topic}':\n\n" + "\n".join(summary_parts)
+        # Extractive summary across the top results
+        combined = "\n".join(content for _, _, content in search_results)
+        with tracing.span("summarize"):
+            extract = summarize(combined, max_sentences=5, max_chars=1200).replace('\n', ' ')
+        sources = ", ".join(dict.fromkeys(doc_id for doc_id, _, _ in search_results))
+
+        summary = f"📋 Summary for '{topic}':\n\n{extract}\n\n📎 Sources: {sources}"
         
         # Cache result
-        self.cache[cache_key] = (time.time(), summary)
+        self._cache_put(cache_key, summary)
         
         return summary
     
-    def _search_docs(self, query: str, k: int = 3) -> List[Tuple[str, float, str]]:
+    def _search_docs(self, query: str, k: int = 3,
+                     flt: Optional[SearchFilter] = None) -> List[Tuple[str, float, str]]:
         """Internal method to search documents"""
-        if self.use_rag and self.rag is not None:
+        return [(src, score, content) for src, score, content, _ in self._retrieve(query, k=k, flt=flt)]
+
+    def _primary_search(self, query: str, k: int, flt: Optional[SearchFilter] = None,
+                        shards: Sequence[str] = (DEFAULT_SHARD,)) -> List[Tuple[str, float, str]]:
+        # The primary holds every shard and has no metadata columns: results are
+        # filtered row by row, so over-fetch until k survive or it runs dry
+        fetch = k
+        while True:
             try:
-                res = self.rag.query(query, max_results=k)
-                if res.documents:
-                    results = []
-                    for doc in res.documents:
-                        doc_id = doc.metadata.get("path", doc.source)
-                        results.append((doc_id, 1.0, doc.content or ""))
-                    return results
-            except Exception:
-                pass
-        
-        # Fallback search
-        return self.fallback.search(query, k=k)
+                with querying():
+                    res = _with_timeout(self.rag.query, PRIMARY_TIMEOUT_S, query, max_results=fetch)
+            except Exception as e:
+                self.primary_health.record_failure(e)
+                raise
+            self.primary_health.record_success()
+            hits = []
+            for doc in res.documents:
+                if doc.metadata.get("shard", DEFAULT_SHARD) not in shards:
+                    continue
+                path = doc.metadata.get("path", doc.source)
+                if flt and not flt.matches(path, getattr(doc, "source", "")):
+                    continue
+                hits.append((path, float(getattr(doc, "score", 0.0) or 0.0), doc.content or ""))
+            if len(hits) >= k or len(res.documents) < fetch or fetch >= PRIMARY_FETCH_MAX:
+                return hits[:k]
+            fetch = min(fetch * 4, PRIMARY_FETCH_MAX)
+
+    @staticmethod
+    def _timed(stage: str, fn, *args):
+        with tracing.span(stage):
+            return fn(*args)
+
+    def _retrieve(self, query: str, k: int = 3, flt: Optional[SearchFilter] = None,
+                  shards: Optional[List[str]] = None) -> List[Tuple[str, float, str, List[str]]]:
+        """Query every backend concurrently and fuse their rankings.
+
+        Backends that miss SEARCH_DEADLINE_S or raise are left out; if that
+        leaves nothing because backends timed out, SearchTimeout is raised
+        instead of reporting no matches. Results are
+        merged with reciprocal rank fusion and deduplicated by source path, so
+        chunks of one file and the same file from two backends count once.
+        flt restricts every backend to matching documents. shards (default:
+        the caller's) are searched in parallel; each backend's hits across
+        shards are merged by score before fusion.
+        Returns (source, fused score, content, backends) tuples.
+        """
+        shards = shards if shards is not None else [self._shard_name()]
+        backends = []  # (backend, shard, search fn)
+        if self._primary_ok():
+            backends.append(("primary", "", partial(self._primary_search, shards=shards)))
+        for name in shards:
+            store = self._shard(name).store
+            if len(store):
+                backends.append(("vector", name, store.search))
+                backends.append(("lexical", name, store.lexical_search))
+        if not backends:
+            return []
+        depth = max(k * 3, 10)
+        futures: Dict[Future, str] = {}
+        missed = set()  # backends that were skipped or missed the deadline
+        for name, _, fn in backends:
+            fut = self._lanes[name].submit(tracing.bind(self._timed), f"search.{name}", fn, query, depth, flt)
+            if fut is None:
+                missed.add(name)
+            else:
+                futures[fut] = name
+        with tracing.span("search.wait"):
+            done, late = wait(futures, timeout=SEARCH_DEADLINE_S)
+        for fut in late:
+            self._lanes[futures[fut]].abandon(fut)
+            missed.add(futures[fut])
+
+        ranked_by: Dict[str, list] = {}  # backend -> hits from every shard
+        for fut in done:
+            if fut.exception() is None:
+                ranked_by.setdefault(futures[fut], []).extend(fut.result())
+        fused: Dict[str, list] = {}  # source -> [score, content, backends]
+        for name, hits in ranked_by.items():
+            hits.sort(key=lambda hit: hit[1], reverse=True)
+            for rank, (doc_id, _, content) in enumerate(hits[:depth]):
+                src = _source_of(doc_id)
+                entry = fused.setdefault(src, [0.0, content, []])
+                if name in entry[2]:
+                    continue  # another chunk of the same file from this backend
+                entry[0] += 1.0 / (RRF_K + rank + 1)
+                entry[2].append(name)
+        if not fused and missed:
+            raise SearchTimeout(", ".join(sorted(missed)))
+        ranked = sorted(fused.items(), key=lambda item: item[1][0], reverse=True)[:k]
+        return [(src, score, content, via) for src, (score, content, via) in ranked]
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Context packing for retrieval-augmented answers (``rag answer``).
+
+The best passage of each hit is packed, in rank order, into a fixed token
+budget measured with a cheap approximate tokenizer (word pieces of up to four
+characters plus punctuation, close to what BPE vocabularies produce for
+English and code). The packed context is hashed: a follow-up question over the
+same context can resume the backend's conversation state instead of having the
+passages processed again.
+"""
+import hashlib
+import itertools
+import os
+import re
+from typing import List, NamedTuple, Sequence, Tuple
+
+ANSWER_TOKENS = int(os.getenv("RAG_ANSWER_TOKENS", "1500"))  # context budget
+ANSWER_K = int(os.getenv("RAG_ANSWER_K", "6"))  # hits considered for packing
+PASSAGE_CHARS = 800
+_PIECE = re.compile(r"\w{1,4}|[^\w\s]")
+
+INSTRUCTIONS = (
+    "Answer the question using only the numbered context passages. "
+    "Cite passages like [1]. If the context does not contain the answer, say so."
+)
+
+
+def approx_tokens(text: str) -> int:
+    return len(_PIECE.findall(text or ""))
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """Longest prefix of text within the token count, cut at a word boundary (the ellipsis counts too)"""
+    if tokens <= 0:
+        return ""
+    starts = [m.start() for m in itertools.islice(_PIECE.finditer(text), tokens + 1)]
+    if len(starts) <= tokens:
+        return text
+    end = starts[tokens - 1]  # the last token goes to the ellipsis
+    cut = text.rfind(" ", 0, end)
+    return text[:cut if cut > 0 else end].rstrip() + " …"
+
+
+class PackedContext(NamedTuple):
+    text: str
+    sources: List[str]
+    tokens: int
+    dropped: int  # passages that did not fit
+    digest: str
+
+
+def pack_context(passages: Sequence[Tuple[str, str]], budget: int = ANSWER_TOKENS) -> PackedContext:
+    """Pack (source, passage) pairs, best first, into budget approximate tokens"""
+    blocks: List[str] = []
+    sources: List[str] = []
+    used = 0
+    dropped = 0
+    seen = set()
+    for source, passage in passages:
+        passage = " ".join(passage.split())
+        if not passage or passage in seen:
+            continue
+        seen.add(passage)
+        header = f"[{len(blocks) + 1}] {source}\n"
+        room = budget - used - approx_tokens(header)
+        cost = approx_tokens(passage)
+        if cost > room:
+            if room < 32 or blocks and room < cost // 2:
+                dropped += 1  # a sliver of a passage is not worth its header
+                continue
+            passage = _truncate(passage, room)
+            cost = approx_tokens(passage)
+        blocks.append(header + passage)
+        sources.append(source)
+        used += approx_tokens(header) + cost
+    text = "\n\n".join(blocks)
+    return PackedContext(text, sources, used, dropped, hashlib.sha1(text.encode("utf-8")).hexdigest()[:16])
+
+
+def build_prompt(packed: PackedContext, question: str) -> str:
+    return f"{INSTRUCTIONS}\n\nContext:\n{packed.text}\n\nQuestion: {question}\nAnswer:"
+
+
+def followup_prompt(question: str) -> str:
+    """Prompt for a backend that already holds the context from a previous turn"""
+    return f"Using the same context passages, answer: {question}\nAnswer:"
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Memory budget and eviction for the fallback RAG store.
+
+Every row is charged its content bytes, its embedding and a fixed overhead
+for the id/content string objects and metadata columns; the lexical index is
+charged as a whole. When a write pushes the total past RAG_MEMORY_BUDGET_MB,
+rows are evicted down to EVICT_TO of the budget in policy order:
+
+  lru     least recently returned by a search first (rows never hit by age)
+  oldest  oldest ingestion first
+  quota   sources over their RAG_SOURCE_QUOTAS share first, then oldest
+
+Evicted rows are appended to a JSON-lines spill file so ``rag restore`` can
+bring them back later.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+import numpy as np
+
+POLICIES = ("lru", "oldest", "quota")
+EVICT_TO = 0.9  # headroom left after an eviction pass so the next add does not evict again
+ROW_OVERHEAD = 160  # approximate bytes per row for the id/content str objects and metadata columns
+_MB = 1024 * 1024
+
+
+def parse_quotas(spec: str) -> Dict[str, int]:
+    """'file:256,discord_attachment:64' -> {source: bytes}"""
+    quotas = {}
+    for part in (spec or "").split(","):
+        name, _, mb = part.strip().partition(":")
+        try:
+            if name and mb:
+                quotas[name.strip()] = int(float(mb) * _MB)
+        except ValueError:
+            continue
+    return quotas
+
+
+MEMORY_BUDGET = int(float(os.getenv("RAG_MEMORY_BUDGET_MB", "0")) * _MB)
+EVICTION_POLICY = os.getenv("RAG_EVICTION", "lru").strip().lower()
+SOURCE_QUOTAS = parse_quotas(os.getenv("RAG_SOURCE_QUOTAS", ""))
+
+
+def _prefix(order: np.ndarray, charge: np.ndarray, need: float) -> np.ndarray:
+    """Shortest prefix of order whose charges add up to need"""
+    if need <= 0 or not order.size:
+        return order[:0]
+    cum = np.cumsum(charge[order])
+    return order[:int(np.searchsorted(cum, need)) + 1]
+
+
+class MemoryBudget:
+    def __init__(self, limit: int = MEMORY_BUDGET, policy: str = EVICTION_POLICY,
+                 quotas: Dict[str, int] = None):
+        self.limit = max(0, limit)
+        self.policy = policy if policy in POLICIES else "lru"
+        self.quotas = dict(SOURCE_QUOTAS if quotas is None else quotas) if self.policy == "quota" else {}
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.passes = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.limit or self.quotas)
+
+    def victims(self, rows: np.ndarray, charge: np.ndarray, source: np.ndarray, added: np.ndarray,
+                last_hit: np.ndarray, codes: Dict[str, int], overhead: int) -> np.ndarray:
+        """Rows to evict, given the live rows and per-row columns aligned with them.
+
+        overhead is memory not attributable to rows (the lexical index).
+        """
+        taken = np.zeros(rows.shape[0], dtype=bool)
+        for name, quota in self.quotas.items():
+            if name not in codes:
+                continue
+            mine = np.flatnonzero(source == codes[name])
+            used = float(charge[mine].sum())
+            if used > quota:
+                order = mine[np.argsort(added[mine], kind="stable")]
+                taken[_prefix(order, charge, used - quota * EVICT_TO)] = True
+        if self.limit:
+            total = float(charge[~taken].sum()) + overhead
+            if total > self.limit:
+                rest = np.flatnonzero(~taken)
+                key = last_hit if self.policy == "lru" else added
+                order = rest[np.argsort(key[rest], kind="stable")]
+                taken[_prefix(order, charge, total - self.limit * EVICT_TO)] = True
+        if taken.any():
+            self.passes += 1
+            self.evicted += int(taken.sum())
+            self.evicted_bytes += int(charge[taken].sum())
+        return rows[taken]
+
+    def describe(self) -> str:
+        limit = f"{self.limit / _MB:.4g} MiB" if self.limit else "unlimited"
+        quotas = ", ".join(f"{k} {v / _MB:.4g} MiB" for k, v in self.quotas.items())
+        return f"{limit}, {self.policy}" + (f" ({quotas})" if quotas else "")
+
+
+class SpillFile:
+    """Append-only JSON lines of evicted documents"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.spilled = 0
+        self.last_error = ""
+
+    def write(self, records: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                for rec in records:
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    count += 1
+            self.last_error = ""
+        except OSError as e:
+            # Out of disk too: the rows are still evicted, memory comes first
+            self.last_error = str(e)[:200]
+        self.spilled += count
+        return count
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def take(self) -> Iterator[Dict[str, Any]]:
+        """Yield and then delete everything spilled so far"""
+        taking = self.path.with_suffix(".restoring")
+        if not taking.exists():  # else finish an interrupted restore first
+            try:
+                os.replace(self.path, taking)
+            except FileNotFoundError:
+                return
+        with open(taking, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+        taking.unlink()
+
+    def pending(self) -> Tuple[int, int]:
+        """(documents, bytes) waiting in the spill file"""
+        try:
+            with open(self.path, "rb") as f:
+                return sum(1 for _ in f), self.size()
+        except OSError:
+            return 0, 0
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Metadata filters for scoped RAG searches.
+
+Query syntax: ``rag ask ext:py,md path:/srv/docs source:file since:7d <question>``.
+Repeating a key ORs its values; different keys AND together. ``since`` takes a
+relative age (30m, 12h, 7d, 2w) or an ISO date.
+
+Per-row metadata is kept column-wise next to the embeddings: small integer
+codes for extension, source and parent directory plus an ingestion timestamp.
+A filter becomes a boolean row mask with a few vectorized comparisons against
+those columns; masks are cached per store mutation.
+"""
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+_FILTER = re.compile(r'(?:^|\s)(ext|path|source|since):("[^"]*"|\S+)', re.I)
+_AGE = re.compile(r"^(\d+(?:\.\d+)?)([smhdw])$", re.I)
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+class SearchFilter(NamedTuple):
+    exts: Tuple[str, ...] = ()
+    paths: Tuple[str, ...] = ()
+    sources: Tuple[str, ...] = ()
+    since: Optional[float] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.exts or self.paths or self.sources or self.since is not None)
+
+    def matches(self, path: str, source: str = "", added: Optional[float] = None) -> bool:
+        """Row-at-a-time check, for backends without metadata columns"""
+        if self.exts and _ext_of(path) not in self.exts:
+            return False
+        if self.paths and not any(path == p or path.startswith(p.rstrip(os.sep) + os.sep) for p in self.paths):
+            return False
+        if self.sources and source not in self.sources:
+            return False
+        if self.since is not None and (added is None or added < self.since):
+            return False
+        return True
+
+    def describe(self) -> str:
+        parts = [f"ext:{','.join(self.exts)}" if self.exts else "",
+                 " ".join(f"path:{p}" for p in self.paths),
+                 f"source:{','.join(self.sources)}" if self.sources else "",
+                 f"since:{time.strftime('%Y-%m-%d %H:%M', time.localtime(self.since))}" if self.since else ""]
+        return " ".join(p for p in parts if p)
+
+
+def _ext_of(path: str) -> str:
+    return os.path.splitext(path)[1].lower().lstrip(".")
+
+
+def _parse_since(value: str, now: float) -> float:
+    m = _AGE.match(value)
+    if m:
+        return now - float(m.group(1)) * _UNITS[m.group(2).lower()]
+    return datetime.fromisoformat(value).timestamp()
+
+
+def parse_filters(query: str, now: Optional[float] = None) -> Tuple[SearchFilter, str]:
+    """Split filter tokens out of a query; raises ValueError on a malformed since:"""
+    now = time.time() if now is None else now
+    exts: List[str] = []
+    paths: List[str] = []
+    sources: List[str] = []
+    since = None
+    for key, value in _FILTER.findall(query):
+        value = value.strip('"')
+        key = key.lower()
+        if key == "ext":
+            exts += [v.lower().lstrip(".") for v in value.split(",") if v]
+        elif key == "path":
+            paths.append(os.path.abspath(os.path.expanduser(value)))
+        elif key == "source":
+            sources += [v for v in value.split(",") if v]
+        else:
+            since = _parse_since(value, now)
+    rest = " ".join(_FILTER.sub(" ", query).split())
+    return SearchFilter(tuple(exts), tuple(paths), tuple(sources), since), rest
+
+
+class _Vocab:
+    """Append-only string <-> code table shared by every store generation"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, name: str) -> int:
+        c = self.codes.get(name)
+        if c is None:
+            c = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return c
+
+
+class MetaColumns:
+    """Columnar per-row metadata (extension, source, parent dir, ingestion time,
+    content bytes and last search hit).
+
+    Like the embedding matrix, columns are preallocated past the row count and
+    only written beyond what published views can see; growing or compacting
+    produces new arrays so older views stay consistent.
+    """
+
+    def __init__(self, exts: Optional[_Vocab] = None, sources: Optional[_Vocab] = None,
+                 dirs: Optional[_Vocab] = None):
+        self.exts = exts or _Vocab()
+        self.sources = sources or _Vocab()
+        self.dirs = dirs or _Vocab()
+        self.ext = np.zeros(0, dtype=np.int32)
+        self.source = np.zeros(0, dtype=np.int32)
+        self.dir = np.zeros(0, dtype=np.int32)
+        self.added = np.zeros(0, dtype=np.float64)
+        self.size = np.zeros(0, dtype=np.int64)
+        self.last_hit = np.zeros(0, dtype=np.float64)
+
+    _COLUMNS = ("ext", "source", "dir", "added", "size", "last_hit")
+
+    def reserve(self, cap: int, rows: int) -> "MetaColumns":
+        """Copy with capacity for cap rows (the first rows carried over)"""
+        out = MetaColumns(self.exts, self.sources, self.dirs)
+        for name in self._COLUMNS:
+            old = getattr(self, name)
+            new = np.zeros(cap, dtype=old.dtype)
+            new[:rows] = old[:rows]
+            setattr(out, name, new)
+        return out
+
+    def compacted(self, keep: np.ndarray) -> "MetaColumns":
+        out = MetaColumns(self.exts, self.sources, self.dirs)
+        for name in self._COLUMNS:
+            setattr(out, name, getattr(self, name)[keep])
+        return out
+
+    def set(self, row: int, path: str, source: str, added: float, size: int = 0):
+        self.ext[row] = self.exts.code(_ext_of(path))
+        self.source[row] = self.sources.code(source)
+        self.dir[row] = self.dirs.code(os.path.dirname(path))
+        self.added[row] = added
+        self.size[row] = size
+        self.last_hit[row] = added
+
+    def touch(self, rows: Sequence[int], now: float):
+        """Record a search hit (feeds LRU eviction)"""
+        self.last_hit[list(rows)] = now
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Snapshot fields for one row"""
+        return {"source": self.sources.names[self.source[row]], "added": float(self.added[row])}
+
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self._COLUMNS)
+
+    def _codes(self, vocab: _Vocab, wanted: Sequence[str]) -> np.ndarray:
+        return np.array([vocab.codes[w] for w in wanted if w in vocab.codes], dtype=np.int32)
+
+    def mask(self, flt: SearchFilter, n: int, source_of: Callable[[int], str]) -> np.ndarray:
+        """Boolean mask over the first n rows selecting what flt allows (source_of: row -> source path)"""
+        mask = np.ones(n, dtype=bool)
+        if flt.exts:
+            mask &= np.isin(self.ext[:n], self._codes(self.exts, flt.exts))
+        if flt.sources:
+            mask &= np.isin(self.source[:n], self._codes(self.sources, flt.sources))
+        if flt.since is not None:
+            mask &= self.added[:n] >= flt.since
+        if flt.paths:
+            # Match against the (small) directory vocabulary, then by code
+            dirs = [d for d in self.dirs.names
+                    if any(d == p or d.startswith(p.rstrip(os.sep) + os.sep) for p in flt.paths)]
+            in_path = np.isin(self.dir[:n], self._codes(self.dirs, dirs))
+            for p in flt.paths:  # a single file: its rows share the file's directory code
+                code = self.dirs.codes.get(os.path.dirname(p))
+                if code is not None:
+                    rows = [r for r in np.flatnonzero(self.dir[:n] == code) if source_of(r) == p]
+                    in_path[rows] = True
+            mask &= in_path
+        return mask
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Background ingestion jobs for the RAG skill.
+
+``rag add`` submits a job and returns its id immediately; a small worker pool
+drains a bounded queue. Jobs report progress (files seen/indexed/skipped,
+bytes, rate, ETA) while running and can be cancelled cooperatively. Finished
+jobs are kept for a while so their outcome stays queryable.
+"""
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+JOB_WORKERS = int(os.getenv("RAG_JOB_WORKERS", "1"))
+JOB_QUEUE_DEPTH = int(os.getenv("RAG_JOB_QUEUE", "16"))
+KEEP_FINISHED = 50
+
+QUEUED = "queued"
+SCANNING = "scanning"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = {DONE, FAILED, CANCELLED}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class IngestJob:
+    def __init__(self, path: str, shard: str = ""):
+        self.id = uuid.uuid4().hex[:8]
+        self.path = path
+        self.shard = shard  # index partition the files go into
+        self.state = QUEUED
+        self.files_total = 0
+        self.bytes_total = 0
+        self.files_seen = 0
+        self.indexed = 0
+        self.skipped = 0
+        self.ignored = 0  # left out by the walker (ignore rules, size, binary)
+        self.bytes = 0
+        self.error = ""
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        """Called by the worker between files; raises once cancellation was requested"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def file_done(self, size: int, ok: bool):
+        self.files_seen += 1
+        self.bytes += size
+        if ok:
+            self.indexed += 1
+        else:
+            self.skipped += 1
+
+    def rate(self) -> float:
+        """Bytes per second since the job started"""
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or time.time()
+        return self.bytes / max(end - self.started_at, 1e-6)
+
+    def eta(self) -> Optional[float]:
+        if self.state != RUNNING or not self.bytes:
+            return None
+        return max(0.0, self.bytes_total - self.bytes) / max(self.rate(), 1e-9)
+
+    def to_dict(self) -> Dict[str, Any]:
+        eta = self.eta()
+        return {
+            "id": self.id,
+            "path": self.path,
+            "shard": self.shard,
+            "state": self.state,
+            "files_total": self.files_total,
+            "files_seen": self.files_seen,
+            "indexed": self.indexed,
+            "skipped": self.skipped,
+            "ignored": self.ignored,
+            "bytes": self.bytes,
+            "bytes_total": self.bytes_total,
+            "rate_bytes_s": round(self.rate(), 1),
+            "eta_s": round(eta, 1) if eta is not None else None,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def summary(self) -> str:
+        icons = {QUEUED: "⏳", SCANNING: "🔎", RUNNING: "🔄", DONE: "✅", FAILED: "❌", CANCELLED: "🛑"}
+        line = f"{icons[self.state]} {self.id} {self.state}: {self.path}"
+        if self.state == RUNNING or self.state in FINISHED:
+            total = f"/{self.files_total}" if self.files_total else ""
+            line += (f" - {self.files_seen}{total} files, {self.indexed} indexed, {self.skipped} skipped, "
+                     f"{self.bytes / 1e6:.1f} MB at {self.rate() / 1e6:.2f} MB/s")
+            if self.ignored:
+                line += f", {self.ignored} ignored"
+        eta = self.eta()
+        if eta is not None:
+            line += f", ETA {eta:.0f}s"
+        if self.error:
+            line += f" ({self.error})"
+        return line
+
+
+class JobQueue:
+    """Bounded queue of ingestion jobs run by a fixed pool of daemon workers"""
+
+    def __init__(self, run: Callable[[IngestJob], None], workers: int = JOB_WORKERS,
+                 depth: int = JOB_QUEUE_DEPTH):
+        self._run = run
+        self._queue: "queue.Queue[IngestJob]" = queue.Queue(maxsize=max(1, depth))
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        for i in range(max(1, workers)):
+            threading.Thread(target=self._worker, daemon=True, name=f"rag-ingest-{i}").start()
+
+    def submit(self, path: str, shard: str = "") -> IngestJob:
+        """Queue a job; raises queue.Full when the queue is at capacity"""
+        job = IngestJob(path, shard)
+        self._queue.put_nowait(job)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel()
+        if job.state == QUEUED:
+            # Never started: the worker will skip it
+            self._finish(job, CANCELLED)
+        return job
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if j.state in FINISHED]
+        for job in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self._jobs[job.id]
+
+    @staticmethod
+    def _finish(job: IngestJob, state: str, error: str = ""):
+        job.state = state
+        job.error = error
+        job.finished_at = time.time()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job.cancelled:
+                    if job.state not in FINISHED:
+                        self._finish(job, CANCELLED)
+                    continue
+                job.started_at = time.time()
+                job.state = SCANNING
+                self._run(job)
+                self._finish(job, DONE)
+            except JobCancelled:
+                self._finish(job, CANCELLED)
+            except Exception as e:
+                self._finish(job, FAILED, str(e)[:200])
+            finally:
+                self._queue.task_done()
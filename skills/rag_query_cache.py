@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Bounded LRU of query embeddings and token lists.
+
+Repeated questions (``rag watch``/scheduler loops, retries, several users
+asking the same thing) skip re-embedding: for the fallback embedder that is
+CPU, for an Ollama-backed primary it is a network round trip. Values are
+always computed from the query as given; only the key is normalized, and only
+as far as the cached function itself ignores the difference (lexical tokens
+ignore case and whitespace, the fallback embedder only case, the primary's
+embedder nothing). Vector search, lexical search and the primary's embedding
+hook all go through one cache.
+"""
+import contextvars
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE", "1024"))  # entries, 0 disables
+QUERY_MAX_CHARS = 1024  # longer texts are documents being indexed, not queries
+# Embedding methods looked up on the primary RAG system (and its embedder) to wrap
+EMBED_HOOKS = ("embed_query", "get_embedding", "generate_embedding", "embed")
+
+
+def normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+# Set while a search runs, so a wrapped primary embedder only caches queries
+# and not the chunks it embeds during ingestion
+_querying: "contextvars.ContextVar[bool]" = contextvars.ContextVar("rag_querying", default=False)
+
+
+@contextmanager
+def querying():
+    token = _querying.set(True)
+    try:
+        yield
+    finally:
+        _querying.reset(token)
+
+
+class QueryCache:
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE):
+        self.maxsize = max(0, maxsize)
+        self._entries: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def get(self, kind: str, text: str, compute: Callable[[str], Any],
+            key: Callable[[str], str] = normalize) -> Any:
+        """compute(text), memoized per kind ('vector', 'lexical', 'primary') under key(text).
+
+        key must only merge texts that compute maps to the same value.
+        """
+        if not self.maxsize or len(text) > QUERY_MAX_CHARS:
+            return compute(text)
+        entry = (kind, key(text))
+        with self._lock:
+            value = self._entries.get(entry)
+            if value is not None:
+                self._entries.move_to_end(entry)
+                self.hits[kind] = self.hits.get(kind, 0) + 1
+                return value
+            self.misses[kind] = self.misses.get(kind, 0) + 1
+        # Computed outside the lock: a slow embedding call must not serialize other queries
+        value = compute(text)
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)  # shared between callers
+        elif isinstance(value, list):
+            value = tuple(value)
+        with self._lock:
+            self._entries[entry] = value
+            self._entries.move_to_end(entry)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def wrap(self, kind: str, fn: Callable) -> Callable:
+        """Memoize a one-string-argument embedding function; other calls pass through"""
+        @wraps(fn)
+        def cached(text, *args, **kwargs):
+            if args or kwargs or not isinstance(text, str) or not _querying.get():
+                return fn(text, *args, **kwargs)
+            value = self.get(kind, text, fn, key=str)
+            return list(value) if isinstance(value, tuple) else value
+        cached.__wrapped_by_query_cache__ = True
+        return cached
+
+    def wrap_embedder(self, system: Any) -> Optional[str]:
+        """Cache the first embedding hook found on system or system.embedder; its name, if any"""
+        for owner, prefix in ((system, ""), (getattr(system, "embedder", None), "embedder.")):
+            if owner is None:
+                continue
+            for name in EMBED_HOOKS:
+                fn = getattr(owner, name, None)
+                if callable(fn):
+                    if not getattr(fn, "__wrapped_by_query_cache__", False):
+                        setattr(owner, name, self.wrap("primary", fn))
+                    return prefix + name
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self.hits.values())
+            lookups = hits + sum(self.misses.values())
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.maxsize,
+                "hits": hits,
+                "misses": lookups - hits,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "by_kind": {kind: (self.hits.get(kind, 0), self.misses.get(kind, 0))
+                            for kind in sorted(set(self.hits) | set(self.misses))},
+            }
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Versioned, memory-mapped snapshots of the fallback RAG index.
+
+Layout under <storage>/snapshots:
+  gen-00000042/manifest.json   format version, generation, count, dtype, sha256
+  gen-00000042/embeddings.npy  quantized embedding matrix (n x dim)
+  gen-00000042/scales.npy      per-row dequantization scales
+  gen-00000042/content.bin     length-prefixed UTF-8 blobs (<u4 length + bytes)
+  gen-00000042/offsets.npy     byte offset of each blob in content.bin
+  gen-00000042/meta.jsonl      one {"id": ...} record per row
+  gen-00000042/exact.npy       float32 copies of the embeddings for rescoring (optional)
+  CURRENT                      name of the newest generation, replaced atomically
+  writer.lock                  flock held by the single writer while publishing
+
+Readers map the files read-only, so every worker process shares the same
+page cache instead of holding its own copy of the corpus. The same layout is
+used for ``rag export`` / ``rag import``; the checksum covers the data files
+in DATA_FILES order, then exact.npy if present.
+"""
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+    HAVE_FLOCK = True
+except ImportError:  # Windows: single process only
+    HAVE_FLOCK = False
+
+FORMAT_VERSION = 3
+SUPPORTED_VERSIONS = {1, 2, 3}  # v1 had no checksum, v2 no exact vectors
+KEEP_GENERATIONS = 3
+DATA_FILES = ("content.bin", "meta.jsonl", "embeddings.npy", "scales.npy", "offsets.npy")
+EXACT_FILE = "exact.npy"
+_LEN = struct.Struct("<I")
+
+
+class _HashingWriter:
+    """File wrapper feeding everything written into a shared running hash"""
+
+    def __init__(self, f, digest):
+        self._f = f
+        self._digest = digest
+
+    def write(self, data) -> int:
+        self._digest.update(data)
+        return self._f.write(data)
+
+
+def _data_files(directory: Path) -> Tuple[str, ...]:
+    return DATA_FILES + ((EXACT_FILE,) if (directory / EXACT_FILE).exists() else ())
+
+
+def file_checksum(directory: Path) -> str:
+    digest = hashlib.sha256()
+    for name in _data_files(directory):
+        with open(directory / name, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class BlobColumn(Sequence):
+    """Read-only sequence of strings decoded on demand from a mapped content.bin"""
+
+    def __init__(self, path: Path, offsets: np.ndarray):
+        self._offsets = offsets
+        self._mm = None
+        self.nbytes = path.stat().st_size
+        if self.nbytes:
+            with open(path, "rb") as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def sizes(self) -> np.ndarray:
+        """Encoded byte length of every string"""
+        if not len(self._offsets):
+            return np.zeros(0, dtype=np.int64)
+        ends = np.append(np.asarray(self._offsets[1:], dtype=np.int64), self.nbytes)
+        return ends - np.asarray(self._offsets, dtype=np.int64) - _LEN.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        off = int(self._offsets[i])
+        (n,) = _LEN.unpack_from(self._mm, off)
+        return self._mm[off + _LEN.size:off + _LEN.size + n].decode("utf-8")
+
+
+class Snapshot:
+    def __init__(self, directory: Path, verify: bool = False):
+        self.directory = directory
+        self.manifest: Dict[str, Any] = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+        if self.manifest.get("version") not in SUPPORTED_VERSIONS:
+            raise ValueError(f"unsupported snapshot version {self.manifest.get('version')}")
+        if verify and self.manifest.get("sha256") and file_checksum(directory) != self.manifest["sha256"]:
+            raise ValueError(f"checksum mismatch in {directory}")
+        self.generation: int = self.manifest["generation"]
+        self.dtype: str = self.manifest["dtype"]
+        self.embeddings = np.load(directory / "embeddings.npy", mmap_mode="r")
+        self.scales = np.load(directory / "scales.npy", mmap_mode="r")
+        offsets = np.load(directory / "offsets.npy", mmap_mode="r")
+        self.contents = BlobColumn(directory / "content.bin", offsets)
+        exact = directory / EXACT_FILE
+        self.exact: Optional[np.ndarray] = np.load(exact, mmap_mode="r") if exact.exists() else None
+        with open(directory / "meta.jsonl", "r", encoding="utf-8") as f:
+            self.metas: List[Dict[str, Any]] = [json.loads(line) for line in f if line.strip()]
+        if not (len(self.metas) == len(self.contents) == self.embeddings.shape[0]):
+            raise ValueError(f"inconsistent snapshot {directory}")
+        if self.exact is not None and self.exact.shape != self.embeddings.shape:
+            raise ValueError(f"inconsistent exact vectors in {directory}")
+
+
+def snapshot_root(storage: Path) -> Path:
+    root = storage / "snapshots"
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def current_generation(root: Path) -> Optional[str]:
+    try:
+        return (root / "CURRENT").read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_snapshot(root: Path, name: Optional[str] = None) -> Optional[Snapshot]:
+    name = name or current_generation(root)
+    return Snapshot(root / name) if name else None
+
+
+class WriterLock:
+    """Exclusive cross-process lock so only one writer publishes at a time.
+
+    Unlike a with-block it may be released by another thread than the one
+    that acquired it (e.g. a timer publishing a batch of writes).
+    """
+
+    def __init__(self, root: Path):
+        self.path = root / "writer.lock"
+        self._f = None
+
+    def acquire(self):
+        f = open(self.path, "a+")
+        if HAVE_FLOCK:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                f.close()
+                raise
+        self._f = f
+
+    def release(self):
+        f, self._f = self._f, None
+        if f is not None:
+            if HAVE_FLOCK:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
+
+
+@contextmanager
+def writer_lock(root: Path):
+    lock = WriterLock(root)
+    lock.acquire()
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def write_files(directory: Path, generation: int, dtype: str, embeddings: np.ndarray, scales: np.ndarray,
+                contents: Iterable[str], metas: Iterable[Dict[str, Any]],
+                exact: Optional[Iterable[np.ndarray]] = None) -> None:
+    """Write one snapshot's files into an existing directory.
+
+    exact yields the float32 vectors of every row in blocks, so they are
+    never all held in memory at once.
+    """
+    digest = hashlib.sha256()
+    offsets = []
+    with open(directory / "content.bin", "wb") as raw_f:
+        f = _HashingWriter(raw_f, digest)
+        pos = 0
+        for text in contents:
+            raw = text.encode("utf-8")
+            offsets.append(pos)
+            f.write(_LEN.pack(len(raw)))
+            f.write(raw)
+            pos += _LEN.size + len(raw)
+    with open(directory / "meta.jsonl", "wb") as raw_f:
+        f = _HashingWriter(raw_f, digest)
+        for meta in metas:
+            f.write((json.dumps(meta, ensure_ascii=False) + "\n").encode("utf-8"))
+    arrays = (
+        ("embeddings.npy", np.ascontiguousarray(embeddings)),
+        ("scales.npy", np.ascontiguousarray(scales, dtype=np.float32)),
+        ("offsets.npy", np.asarray(offsets, dtype=np.int64)),
+    )
+    for name, arr in arrays:
+        with open(directory / name, "wb") as raw_f:
+            np.save(_HashingWriter(raw_f, digest), arr)
+    if exact is not None:
+        _write_exact(directory / EXACT_FILE, digest, (len(offsets), embeddings.shape[1]), exact)
+    _write_manifest(directory, {
+        "version": FORMAT_VERSION,
+        "generation": generation,
+        "count": len(offsets),
+        "dtype": dtype,
+        "dim": int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        "sha256": digest.hexdigest(),
+    })
+
+
+def _write_exact(path: Path, digest, shape: Tuple[int, int], blocks: Iterable[np.ndarray]):
+    with open(path, "wb") as raw_f:
+        f = _HashingWriter(raw_f, digest)
+        np.lib.format.write_array_header_1_0(f, {"descr": "<f4", "fortran_order": False, "shape": shape})
+        rows = 0
+        for block in blocks:
+            f.write(np.ascontiguousarray(block, dtype="<f4").tobytes())
+            rows += block.shape[0]
+    if rows != shape[0]:
+        raise ValueError(f"expected {shape[0]} exact vectors, got {rows}")
+
+
+def _write_manifest(directory: Path, manifest: Dict[str, Any]):
+    (directory / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def publish(root: Path, dtype: str, embeddings: np.ndarray, scales: np.ndarray,
+            contents: Iterable[str], metas: Iterable[Dict[str, Any]],
+            exact: Optional[Iterable[np.ndarray]] = None) -> str:
+    """Write a new generation and atomically point CURRENT at it. Call under writer_lock."""
+    generation, name, tmp = _next_generation(root)
+    write_files(tmp, generation, dtype, embeddings, scales, contents, metas, exact)
+    return _activate(root, name, tmp)
+
+
+def publish_from(root: Path, source: Path) -> str:
+    """Publish a verified export directory as the next generation. Call under writer_lock."""
+    snap = Snapshot(source, verify=True)
+    generation, name, tmp = _next_generation(root)
+    for fname in _data_files(source):
+        shutil.copyfile(source / fname, tmp / fname)
+    _write_manifest(tmp, dict(snap.manifest, generation=generation))
+    return _activate(root, name, tmp)
+
+
+def export_to(directory: Path, dtype: str, embeddings: np.ndarray, scales: np.ndarray,
+              contents: Iterable[str], metas: Iterable[Dict[str, Any]],
+              exact: Optional[Iterable[np.ndarray]] = None) -> Path:
+    directory.mkdir(parents=True, exist_ok=False)
+    write_files(directory, 0, dtype, embeddings, scales, contents, metas, exact)
+    return directory
+
+
+def _next_generation(root: Path):
+    cur = current_generation(root)
+    generation = int(cur.split("-")[1]) + 1 if cur else 1
+    name = f"gen-{generation:08d}"
+    tmp = root / f".{name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    return generation, name, tmp
+
+
+def _activate(root: Path, name: str, tmp: Path) -> str:
+    os.replace(tmp, root / name)
+    pointer = root / ".CURRENT.tmp"
+    pointer.write_text(name, encoding="utf-8")
+    os.replace(pointer, root / "CURRENT")
+    _prune(root, keep=KEEP_GENERATIONS)
+    return name
+
+
+def _prune(root: Path, keep: int):
+    # Processes still mapping a pruned generation keep their pages until they swap
+    gens = sorted(p for p in root.glob("gen-*") if p.is_dir())
+    for old in gens[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
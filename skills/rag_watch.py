@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Directory watching for live incremental indexing (``rag watch <dir>``).
+
+Linux uses inotify through ctypes; everywhere else (or if inotify is
+unavailable or out of watches) an mtime/size scan with os.scandir runs every
+RAG_WATCH_POLL_S seconds. Change events are debounced: a batch is handed to
+the indexer once the tree has been quiet for RAG_WATCH_DEBOUNCE_S, or after
+RAG_WATCH_MAX_DELAY_S under constant churn. Only the changed paths are passed
+on, so only those files get re-embedded. Both backends skip the directories
+and files the ingestion walk skips (deny-list and .gitignore rules), so a
+node_modules or .git below the root costs neither watches nor scans.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from skills.file_walker import FileWalker, IgnoreRules
+
+WATCH_DEBOUNCE_S = float(os.getenv("RAG_WATCH_DEBOUNCE_S", "1.0"))
+WATCH_MAX_DELAY_S = float(os.getenv("RAG_WATCH_MAX_DELAY_S", "10"))
+WATCH_POLL_S = float(os.getenv("RAG_WATCH_POLL_S", "2.0"))
+
+# inotify(7)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# apply(changed, removed) -> files re-indexed
+ApplyFn = Callable[[List[Path], List[Path]], int]
+
+
+class _Inotify:
+    """Recursive inotify watch on a directory tree, minus what the walker prunes"""
+
+    def __init__(self, root: Path, walker: FileWalker):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify needs Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.walker = walker
+        self.dirs: Dict[int, Path] = {}
+        self.rules: Dict[Path, IgnoreRules] = {}  # ignore rules in force in each watched directory
+        self.root = root
+        self.add_tree(root)
+
+    def add_tree(self, top: Path) -> List[Path]:
+        """Watch top and every directory below it the walker would enter; returns the files found there"""
+        files: List[Path] = []
+        parent = self.rules.get(top.parent) if top != self.root else None
+        if parent is not None and self.walker.prunes(str(top), parent):
+            return files
+        stack = [(top, self.walker.rules_in(str(top), parent))]
+        while stack:
+            d, rules = stack.pop()
+            wd = self._add(self.fd, os.fsencode(str(d)), _WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == 28:  # ENOSPC: max_user_watches exhausted
+                    raise OSError(err, "inotify watch limit reached")
+                continue  # vanished or unreadable
+            self.dirs[wd] = d
+            self.rules[d] = rules
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self.walker.prunes(entry.path, rules):
+                                stack.append((Path(entry.path), self.walker.rules_in(entry.path, rules)))
+                        elif entry.is_file() and not rules.ignored(entry.path, False):
+                            files.append(Path(entry.path))
+            except OSError:
+                continue
+        return files
+
+    def ignored(self, path: Path) -> bool:
+        rules = self.rules.get(path.parent)
+        return rules is not None and rules.ignored(str(path), False)
+
+    def read(self, timeout: float) -> Iterator[Tuple[Optional[Path], int]]:
+        """Yield (path, mask) events; (None, IN_Q_OVERFLOW) means events were lost"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+            pos += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                yield None, mask
+                continue
+            if mask & IN_IGNORED:
+                self.rules.pop(self.dirs.pop(wd, None), None)
+                continue
+            base = self.dirs.get(wd)
+            if base is not None:
+                yield (base / os.fsdecode(name)) if name else base, mask
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Poller:
+    """mtime/size scan; only entries accepted by the filter and not pruned by the walker are stat'ed"""
+
+    def __init__(self, root: Path, accept: Callable[[str], bool], walker: FileWalker):
+        self.root = root
+        self.accept = accept
+        self.walker = walker
+        self.state = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        walker = self.walker
+        stack = [(str(self.root), walker.rules_in(str(self.root)))]
+        while stack:
+            d, rules = stack.pop()
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if not walker.prunes(entry.path, rules):
+                                    stack.append((entry.path, walker.rules_in(entry.path, rules)))
+                            elif (self.accept(entry.name) and not rules.ignored(entry.path, False)
+                                  and entry.is_file()):
+                                st = entry.stat()
+                                state[entry.path] = (st.st_mtime_ns, st.st_size)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return state
+
+    def changes(self) -> Tuple[List[Path], List[Path]]:
+        new = self._scan()
+        old, self.state = self.state, new
+        changed = [Path(p) for p, sig in new.items() if old.get(p) != sig]
+        removed = [Path(p) for p in old if p not in new]
+        return changed, removed
+
+
+class DirectoryWatcher:
+    """Background thread keeping one directory tree in sync with the index"""
+
+    def __init__(self, root: Path, apply: ApplyFn, accept: Callable[[str], bool],
+                 debounce: float = WATCH_DEBOUNCE_S, max_delay: float = WATCH_MAX_DELAY_S,
+                 poll: float = WATCH_POLL_S, use_inotify: bool = True, owner: str = "",
+                 walker: Optional[FileWalker] = None):
+        self.root = root
+        self.owner = owner  # whoever the index being kept in sync belongs to
+        self._apply = apply
+        self._accept = accept
+        self.walker = walker or FileWalker(accept=accept)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll = poll
+        self.backend = "poll"
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(root, self.walker)
+                self.backend = "inotify"
+            except (OSError, AttributeError):
+                self._inotify = None
+        self._poller = None if self._inotify else _Poller(root, accept, self.walker)
+        # path -> (first seen, removed?)
+        self._pending: Dict[Path, Tuple[float, bool]] = {}
+        self._last_event = 0.0
+        self._stop = threading.Event()
+        self.batches = 0
+        self.reindexed = 0
+        self.last_lag = 0.0
+        self.last_batch_at: Optional[float] = None
+        self.last_error = ""
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"rag-watch:{root.name}")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        if self._inotify:
+            self._inotify.close()
+
+    def lag(self) -> float:
+        """Age of the oldest change not yet indexed (0 when idle)"""
+        pending = list(self._pending.values())
+        return time.monotonic() - min(first for first, _ in pending) if pending else 0.0
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "root": str(self.root),
+            "backend": self.backend,
+            "owner": self.owner,
+            "pending": len(self._pending),
+            "lag_s": round(self.lag(), 2),
+            "last_lag_s": round(self.last_lag, 2),
+            "batches": self.batches,
+            "reindexed": self.reindexed,
+            "last_error": self.last_error,
+        }
+
+    def _mark(self, path: Path, removed: bool, now: float):
+        first = self._pending.get(path, (now, removed))[0]
+        self._pending[path] = (first, removed)
+        self._last_event = now
+
+    def _collect(self, timeout: float):
+        now = time.monotonic()
+        if self._poller is not None:
+            if self._stop.wait(timeout):
+                return
+            changed, removed = self._poller.changes()
+            now = time.monotonic()
+            for p in changed:
+                self._mark(p, False, now)
+            for p in removed:
+                self._mark(p, True, now)
+            return
+        for path, mask in self._inotify.read(timeout):
+            now = time.monotonic()
+            if path is None:
+                # Queue overflow: resync everything under the root
+                for fp in self._inotify.add_tree(self.root):
+                    if self._accept(fp.name):
+                        self._mark(fp, False, now)
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    for fp in self._inotify.add_tree(path):
+                        if self._accept(fp.name):
+                            self._mark(fp, False, now)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._mark(path, True, now)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                if self._accept(path.name):
+                    self._mark(path, True, now)
+            elif mask & IN_DELETE_SELF and path == self.root:
+                self._mark(path, True, now)
+            elif self._accept(path.name) and not self._inotify.ignored(path):
+                self._mark(path, False, now)
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        now = time.monotonic()
+        return now - self._last_event >= self.debounce or self.lag() >= self.max_delay
+
+    def _flush(self):
+        batch, self._pending = self._pending, {}
+        oldest = min(first for first, _ in batch.values())
+        # A path can be deleted and recreated within one batch: trust the disk
+        changed = [p for p in batch if p.is_file()]
+        removed = [p for p in batch if not p.exists()]
+        try:
+            self.reindexed += self._apply(changed, removed)
+            self.batches += 1
+            self.last_error = ""
+        except Exception as e:
+            self.last_error = str(e)[:200]
+        self.last_lag = time.monotonic() - oldest
+        self.last_batch_at = time.time()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.debounce if self._pending else self.poll
+                self._collect(wait if self._poller is not None else min(wait, self.debounce))
+                if self._due():
+                    self._flush()
+            except Exception as e:
+                self.last_error = str(e)[:200]
+                self._stop.wait(self.poll)
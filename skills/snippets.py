@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Query-aware snippet extraction.
+
+Finds the window of a document that covers the most distinct query terms
+(ties broken by total hits). Term positions come from one regex pass; window
+contents are counted with searchsorted plus per-term prefix sums, so a document
+is scored in linear time however many windows it has.
+"""
+import re
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+SNIPPET_CHARS = 200
+_WORD = re.compile(r"[a-z0-9_]{2,}")
+_HEADER = re.compile(r"\A(?:# (?:File|Type|CSV File|Preview)[^\n]*\n)+\n?")
+_LEAD = 30  # context kept before the first hit
+
+
+class Snippet(NamedTuple):
+    text: str
+    start: int  # offset of the window in the document
+    end: int
+    matches: List[Tuple[int, int]]  # (offset, length) of query terms, document offsets
+
+
+def _body_start(content: str) -> int:
+    """Skip the '# File:' / '# Type:' header prepended to code and CSV documents"""
+    m = _HEADER.match(content)
+    return m.end() if m else 0
+
+
+def best_passage(content: str, query: str = "", width: int = SNIPPET_CHARS) -> Snippet:
+    content = content or ""
+    base = _body_start(content)
+    terms = list(dict.fromkeys(_WORD.findall((query or "").lower())))
+    body = content[base:]
+    hits = []
+    if terms:
+        index = {t: i for i, t in enumerate(terms)}
+        hits = [(m.start(), m.end() - m.start(), index[m.group()])
+                for m in _WORD.finditer(body.lower()) if m.group() in index]
+    if not hits:
+        end = min(len(content), base + width)
+        return Snippet(content[base:end], base, end, [])
+
+    pos = np.fromiter((h[0] for h in hits), dtype=np.int64, count=len(hits))
+    term = np.fromiter((h[2] for h in hits), dtype=np.int64, count=len(hits))
+    # Window i spans hits[i:stop[i]]
+    stop = np.searchsorted(pos, pos + max(1, width - 2 * _LEAD), side="left")
+    # prefix[t, j] = hits of term t among the first j hits
+    onehot = np.zeros((len(terms), len(hits) + 1), dtype=np.int32)
+    onehot[term, np.arange(1, len(hits) + 1)] = 1
+    prefix = np.cumsum(onehot, axis=1)
+    idx = np.arange(len(hits))
+    distinct = ((prefix[:, stop] - prefix[:, idx]) > 0).sum(axis=0)
+    score = distinct * (len(hits) + 1) + (stop - idx)
+    best = int(np.argmax(score))
+
+    start = max(0, int(pos[best]) - _LEAD)
+    space = body.rfind(" ", 0, start + 1)
+    if start and space > start - _LEAD:
+        start = space + 1  # do not cut a word in half
+    end = min(len(body), start + width)
+    matches = [(base + p, n) for p, n, _ in hits if start <= p and p + n <= end]
+    return Snippet(body[start:end], base + start, base + end, matches)
+
+
+def render(snippet: Snippet, content: str, highlight: str = "**") -> str:
+    """One line: ellipses where the window cuts the document, query terms highlighted"""
+    parts = []
+    cursor = snippet.start
+    for off, n in snippet.matches:
+        parts.append(content[cursor:off])
+        parts.append(f"{highlight}{content[off:off + n]}{highlight}")
+        cursor = off + n
+    parts.append(content[cursor:snippet.end])
+    text = " ".join("".join(parts).split())
+    prefix = "…" if snippet.start > _body_start(content) else ""
+    suffix = "…" if snippet.end < len(content) else ""
+    return f"{prefix}{text}{suffix}"
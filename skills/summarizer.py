@@ -1,15 +1,122 @@
+import os
 import re
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z0-9']{2,}")
+
+# Length budget for summaries
+SUMMARY_SENTENCES = int(os.getenv("SUMMARY_SENTENCES", "3"))
+SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "0"))  # 0 = no character cap
+# Sentences ranked together; bounds the similarity matrix to WINDOW x WINDOW
+SUMMARY_WINDOW = int(os.getenv("SUMMARY_WINDOW", "400"))
+
+_DAMPING = 0.85
+_MAX_ITER = 50
+_TOL = 1e-5
+
+
+def _iter_sentences(text: str) -> Iterator[str]:
+    """Yield sentences lazily so huge inputs are never split into one big list"""
+    start = 0
+    for m in _SENTENCE_END.finditer(text):
+        s = text[start:m.start()].strip()
+        if s:
+            yield s
+        start = m.end()
+    s = text[start:].strip()
+    if s:
+        yield s
+
+
+def _textrank(sentences: List[str]) -> np.ndarray:
+    """TextRank scores over TF-IDF sentence vectors via power iteration"""
+    n = len(sentences)
+    tokens = [_WORD.findall(s.lower()) for s in sentences]
+    vocab = {}
+    for toks in tokens:
+        for t in toks:
+            vocab.setdefault(t, len(vocab))
+    if not vocab:
+        return np.zeros(n, dtype=np.float32)
+    tf = np.zeros((n, len(vocab)), dtype=np.float32)
+    for i, toks in enumerate(tokens):
+        for t in toks:
+            tf[i, vocab[t]] += 1.0
+    df = np.count_nonzero(tf, axis=0)
+    tfidf = tf * (np.log((1.0 + n) / (1.0 + df)) + 1.0)
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf /= np.where(norms > 0, norms, 1.0)
+
+    sim = tfidf @ tfidf.T
+    np.fill_diagonal(sim, 0.0)
+    row_sums = sim.sum(axis=1, keepdims=True)
+    # Sentences with no overlap link uniformly so the walk stays stochastic
+    trans = np.where(row_sums > 0, sim / np.where(row_sums > 0, row_sums, 1.0), 1.0 / n)
+
+    rank = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(_MAX_ITER):
+        nxt = (1.0 - _DAMPING) / n + _DAMPING * (trans.T @ rank)
+        if np.abs(nxt - rank).sum() < _TOL:
+            rank = nxt
+            break
+        rank = nxt
+    return rank
+
+
+def _select(candidates: List[Tuple[int, str]], budget: int) -> List[Tuple[int, str]]:
+    """Keep the top-ranked `budget` candidates"""
+    if len(candidates) <= budget:
+        return candidates
+    scores = _textrank([s for _, s in candidates])
+    top = np.argsort(-scores, kind="stable")[:budget]
+    return [candidates[i] for i in top]
+
+
+def summarize(text: str, max_sentences: int = SUMMARY_SENTENCES, max_chars: int = SUMMARY_MAX_CHARS,
+              window: int = SUMMARY_WINDOW) -> str:
+    """Extractive summary of `text`, keeping the original sentence order.
+
+    Long inputs are ranked window by window; each window's best sentences
+    compete again in a final round, so memory stays bounded by the window size.
+    """
+    max_sentences = max(1, max_sentences)
+    window = max(window, 2 * max_sentences)
+    candidates: List[Tuple[int, str]] = []
+    batch: List[Tuple[int, str]] = []
+    for pos, sentence in enumerate(_iter_sentences(text or "")):
+        batch.append((pos, sentence))
+        if len(batch) >= window:
+            candidates.extend(_select(batch, max_sentences))
+            batch = []
+            if len(candidates) >= window:
+                candidates = _select(candidates, max_sentences)
+    candidates.extend(_select(batch, max_sentences) if candidates else batch)
+    chosen = sorted(_select(candidates, max_sentences))
+    if max_chars > 0:
+        out, used = [], 0
+        for _, s in chosen:
+            if out and used + len(s) + 1 > max_chars:
+                break
+            out.append(s)
+            used += len(s) + 1
+        return " ".join(out)[:max_chars]
+    return " ".join(s for _, s in chosen)
+
 
 class SummarizerSkill:
     name = "summarize"
 
+    def __init__(self, max_sentences: int = SUMMARY_SENTENCES, max_chars: int = SUMMARY_MAX_CHARS):
+        self.max_sentences = max_sentences
+        self.max_chars = max_chars
+
     def can_handle(self, text: str) -> bool:
         return text.lower().startswith("summarize ")
 
     def handle(self, text: str) -> str:
-        # Very simple heuristic summarizer: take first N sentences
         content = text[len("summarize "):].strip()
-        sentences = re.split(r"(?<=[.!?])\s+", content)
-        if not sentences:
-            return "(nothing to summarize)"
-        return " ".join(sentences[:3])
+        summary = summarize(content, self.max_sentences, self.max_chars)
+        return summary or "(nothing to summarize)"
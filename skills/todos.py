@@ -1,29 +1,217 @@
+import os
+import queue
 import re
-from typing import List
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+from skills.base import current_scope
+
+_ROOT = Path(__file__).parents[1]
+TODO_DB = str(_ROOT / os.getenv("TODO_DB", "todo_storage/todos.db"))  # relative paths: from the repo root
+TODO_DUE_SOON_H = float(os.getenv("TODO_DUE_SOON_H", "24"))  # window for 'todo due'
+WRITE_BATCH = 256  # queued writes committed in one transaction
+LIST_LIMIT = 100
+
+_DUE = re.compile(r"\s+(?:due|by)[:\s]\s*", re.I)
+_IN = re.compile(r"^(?:in\s+)?(\d+(?:\.\d+)?)\s*([mhdw])$", re.I)
+_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS todos (
+    id      INTEGER PRIMARY KEY,
+    owner   TEXT    NOT NULL,
+    item    TEXT    NOT NULL,
+    due     REAL,
+    done    INTEGER NOT NULL DEFAULT 0,
+    created REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS todos_open ON todos(owner, done, id);
+CREATE INDEX IF NOT EXISTS todos_due ON todos(owner, due) WHERE done = 0 AND due IS NOT NULL;
+"""
+
+# Fixed SQL text, so sqlite3's per-connection statement cache prepares each once
+_ADD = "INSERT INTO todos (owner, item, due, created) VALUES (?, ?, ?, ?)"
+_DONE = "UPDATE todos SET done = 1 WHERE owner = ? AND id = ? AND done = 0"
+_CLEAR = "DELETE FROM todos WHERE owner = ?"
+_LIST = ("SELECT id, item, due FROM todos WHERE owner = ? AND done = 0 "
+         "ORDER BY id LIMIT ?")
+_DUE_SOON = ("SELECT id, item, due FROM todos WHERE owner = ? AND done = 0 "
+             "AND due IS NOT NULL AND due <= ? ORDER BY due LIMIT ?")
+
+
+def parse_due(value: str, now: Optional[float] = None) -> float:
+    """'2h', 'in 3d', 'today', 'tomorrow', '2026-10-20' or '2026-10-20 17:00' -> timestamp"""
+    now = time.time() if now is None else now
+    value = value.strip().lower()
+    m = _IN.match(value)
+    if m:
+        return now + float(m.group(1)) * _UNITS[m.group(2)]
+    if value in ("today", "tonight", "tomorrow"):
+        end = datetime.fromtimestamp(now).replace(hour=23, minute=59, second=0, microsecond=0)
+        return (end + timedelta(days=1 if value == "tomorrow" else 0)).timestamp()
+    when = datetime.fromisoformat(value)
+    if len(value) <= 10:
+        when = when.replace(hour=23, minute=59)  # a bare date means by the end of that day
+    return when.timestamp()
+
+
+def _fmt_due(due: Optional[float], now: float) -> str:
+    if due is None:
+        return ""
+    stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(due))
+    return f" (due {stamp}{', overdue' if due < now else ''})"
+
+
+class TodoStore:
+    """SQLite (WAL) todo table shared by every thread and worker process.
+
+    Reads use one connection per thread and never block on writers. Writes go
+    through a single writer thread that commits whatever has queued up in one
+    transaction; callers wait for their own result.
+    """
+
+    def __init__(self, path: str = TODO_DB):
+        if path == ":memory:" or path.startswith("file:"):
+            # Every thread opens its own connection: a private in-memory DB would be empty
+            raise ValueError(f"TODO_DB must be a file path, not {path!r}")
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._writes: "queue.Queue[Tuple[str, tuple, Future]]" = queue.Queue()
+        self.batches = 0
+        self.writes = 0
+        self._conn().executescript(_SCHEMA)
+        threading.Thread(target=self._writer, name="todo-writer", daemon=True).start()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None,
+                                   check_same_thread=False, cached_statements=32)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps it consistent
+            conn.execute("PRAGMA busy_timeout=5000")  # other uvicorn workers writing
+            self._local.conn = conn
+        return conn
+
+    def _writer(self):
+        conn = self._conn()
+        while True:
+            ops = [self._writes.get()]
+            while len(ops) < WRITE_BATCH:
+                try:
+                    ops.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            results: List[Any] = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, params, _ in ops:
+                    try:
+                        cur = conn.execute(sql, params)
+                        results.append(cur.lastrowid if sql is _ADD else cur.rowcount)
+                    except sqlite3.Error as e:
+                        results.append(e)  # only this statement is rolled back
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                results = [e] * len(ops)
+            self.batches += 1
+            self.writes += len(ops)
+            for (_, _, fut), res in zip(ops, results):
+                if isinstance(res, Exception):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+
+    def _write(self, sql: str, params: tuple) -> int:
+        fut: Future = Future()
+        self._writes.put((sql, params, fut))
+        return fut.result()
+
+    def add(self, owner: str, item: str, due: Optional[float] = None) -> int:
+        return self._write(_ADD, (owner, item, due, time.time()))
+
+    def done(self, owner: str, todo_id: int) -> bool:
+        return self._write(_DONE, (owner, todo_id)) > 0
+
+    def clear(self, owner: str) -> int:
+        return self._write(_CLEAR, (owner,))
+
+    def open(self, owner: str, limit: int = LIST_LIMIT) -> List[Tuple[int, str, Optional[float]]]:
+        return self._conn().execute(_LIST, (owner, limit)).fetchall()
+
+    def due_soon(self, owner: str, until: float, limit: int = LIST_LIMIT) -> List[Tuple[int, str, Optional[float]]]:
+        """Open todos due before until (overdue included), soonest first"""
+        return self._conn().execute(_DUE_SOON, (owner, until, limit)).fetchall()
+
 
 class TodoSkill:
     name = "todo"
 
-    def __init__(self):
-        self.todos: List[str] = []
+    def __init__(self, store: Optional[TodoStore] = None):
+        self.store = store or TodoStore()
+
+    def partition_key(self, text: str = "") -> str:
+        """Todos are per user (Discord/API), else per namespace (CLI), else one local list"""
+        scope = current_scope()
+        if scope.user:
+            return f"user:{scope.user}"
+        if scope.namespace:
+            return f"ns:{scope.namespace}"
+        return "local"
 
     def can_handle(self, text: str) -> bool:
         t = text.lower().strip()
-        return t.startswith("todo ") or t == "todo list" or t == "todo clear"
+        return t.startswith("todo ") or t in ("todo list", "todo clear", "todo due")
 
     def handle(self, text: str) -> str:
         t = text.strip()
         low = t.lower()
-        if low == "todo list":
-            if not self.todos:
-                return "(empty)"
-            return "\n".join(f"- {i+1}. {item}" for i, item in enumerate(self.todos))
-        if low == "todo clear":
-            self.todos.clear()
-            return "Cleared"
-        m = re.match(r"todo\s+add\s+(.+)", t, re.I)
-        if m:
-            item = m.group(1).strip()
-            self.todos.append(item)
-            return f"Added: {item}"
-        return "Try: 'todo add <item>' or 'todo list'"
+        owner = self.partition_key()
+        now = time.time()
+        try:
+            if low == "todo list":
+                rows = self.store.open(owner)
+                if not rows:
+                    return "(empty)"
+                return "\n".join(f"- {i}. {item}{_fmt_due(due, now)}" for i, item, due in rows)
+            if low == "todo clear":
+                self.store.clear(owner)
+                return "Cleared"
+            m = re.match(r"todo\s+due(?:\s+(.+))?$", t, re.I)
+            if m:
+                until = parse_due(m.group(1), now) if m.group(1) else now + TODO_DUE_SOON_H * 3600
+                rows = self.store.due_soon(owner, until)
+                if not rows:
+                    return f"Nothing due before {time.strftime('%Y-%m-%d %H:%M', time.localtime(until))}"
+                return "\n".join(f"- {i}. {item}{_fmt_due(due, now)}" for i, item, due in rows)
+            m = re.match(r"todo\s+done\s+#?(\d+)$", t, re.I)
+            if m:
+                todo_id = int(m.group(1))
+                return f"Done: {todo_id}" if self.store.done(owner, todo_id) else f"No open todo {todo_id}"
+            m = re.match(r"todo\s+add\s+(.+)", t, re.I)
+            if m:
+                item = m.group(1).strip()
+                due = None
+                # The last 'due'/'by' that is followed by a date wins ('drop by office due 2d')
+                for d in reversed(list(_DUE.finditer(item))):
+                    try:
+                        due = parse_due(item[d.end():], now)
+                    except ValueError:
+                        continue  # not a date: part of the item text
+                    item = item[:d.start()].strip()
+                    break
+                todo_id = self.store.add(owner, item, due)
+                return f"Added: {item} (#{todo_id}){_fmt_due(due, now)}"
+        except sqlite3.Error as e:
+            return f"❌ Todo store error: {e}"
+        except ValueError as e:
+            return f"❌ Bad due date: {e} (try 2h, 3d, tomorrow or 2026-10-20)"
+        return "Try: 'todo add <item> [due 2d|tomorrow|2026-10-20]', 'todo list', 'todo due [3d]' or 'todo done <id>'"
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+RAG Store Stress Test
+Hammers the fallback store with concurrent ingestion and queries and checks
+that nothing is lost, nothing raises, and queries keep flowing during writes.
+
+Usage: python stress_rag.py [--writers 4] [--readers 8] [--docs 500]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Keep the stress run on the fallback store
+os.environ["OLLAMA_BASE_URL"] = ""
+
+from skills.rag import RAGSkill, _FallbackStore
+
+WORDS = ("python", "numpy", "discord", "index", "vector", "search", "memory", "thread",
+         "lock", "snapshot", "cache", "query", "answer", "health", "triage", "todo")
+
+
+def _text(rng: random.Random, n: int = 40) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def stress(writers: int, readers: int, docs: int) -> bool:
+    rag = RAGSkill()
+    # Private store so the run never touches real rag_storage contents
+    rag.fallback = _FallbackStore(Path(tempfile.mkdtemp(prefix="rag_stress_")))
+    errors = []
+    queries = [0] * readers
+    done = threading.Event()
+
+    def writer(w: int):
+        rng = random.Random(w)
+        try:
+            for i in range(docs):
+                if i % 10 == 0:
+                    # Batched writes publish atomically; direct writes still go through the
+                    # writer so a shared index publishes them instead of remapping over them
+                    with rag._fallback_writer() as store:
+                        store.add_docs([(_text(rng), f"w{w}-b{i}-{j}") for j in range(5)])
+                else:
+                    rag.handle(f"rag add_text w{w}-{i} :: {_text(rng)}")
+        except Exception as e:
+            errors.append(f"writer {w}: {e!r}")
+
+    def reader(r: int):
+        rng = random.Random(1000 + r)
+        try:
+            while not done.is_set():
+                q = _text(rng, 4)
+                rag.handle(f"rag ask {q}")
+                rag.handle(f"rag summary {q}")
+                rag.fallback.lexical_search(q, k=5)
+                queries[r] += 1
+        except Exception as e:
+            errors.append(f"reader {r}: {e!r}")
+
+    threads = [threading.Thread(target=reader, args=(r,)) for r in range(readers)]
+    for t in threads:
+        t.start()
+    start = time.time()
+    wthreads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    for t in wthreads:
+        t.start()
+    for t in wthreads:
+        t.join()
+    elapsed = time.time() - start
+    done.set()
+    for t in threads:
+        t.join()
+
+    rag._publish_now(rag._shard())  # shared index: count what readers in other processes would map
+    batched = (docs + 9) // 10
+    expected = writers * ((docs - batched) + batched * 5)
+    got = len(rag.fallback)
+    ids = [doc_id for doc_id, _ in rag.fallback.iter_docs()]
+    print(f"⏱️ {elapsed:.2f}s: {got} docs ingested, {sum(queries)} query rounds "
+          f"({sum(queries) / max(elapsed, 1e-9):.0f}/s) during ingestion")
+    ok = True
+    if errors:
+        ok = False
+        print(f"❌ {len(errors)} errors, first: {errors[0]}")
+    if got != expected or len(set(ids)) != expected:
+        ok = False
+        print(f"❌ Expected {expected} unique docs, found {got} ({len(set(ids))} unique ids)")
+    print("✅ Stress test passed" if ok else "❌ Stress test failed")
+    return ok
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=8)
+    ap.add_argument("--docs", type=int, default=500, help="documents per writer")
+    args = ap.parse_args()
+    sys.exit(0 if stress(args.writers, args.readers, args.docs) else 1)
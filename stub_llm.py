@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Stub LLM Server
+Emulates the Ollama (/api/generate, /api/tags) and OpenAI
+(/v1/chat/completions, /v1/models) endpoints with configurable latency, so
+load tests and capacity planning run offline and reproducibly.
+
+Usage: python stub_llm.py [--port 11500] [--latency-ms 400] [--jitter-ms 100]
+                          [--tokens 64] [--tokens-per-s 200] [--error-rate 0]
+Then: OLLAMA_BASE_URL=http://127.0.0.1:11500 (or OPENAI_BASE_URL + any OPENAI_API_KEY)
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("the", "assistant", "index", "answer", "query", "local", "model", "stub", "fast", "result")
+
+
+class StubConfig:
+    def __init__(self, latency_ms: float = 400, jitter_ms: float = 100, tokens: int = 64,
+                 tokens_per_s: float = 200, error_rate: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens = tokens
+        self.tokens_per_s = tokens_per_s
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.served = 0
+
+    def draw(self):
+        """Time to first token (s) and whether this call fails"""
+        with self.lock:
+            self.served += 1
+            delay = max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+            return delay, self.rng.random() < self.error_rate
+
+    def tokens_for(self, prompt: str):
+        # Deterministic per prompt so repeated runs produce the same text
+        rng = random.Random(prompt)
+        return [rng.choice(WORDS) + " " for _ in range(self.tokens)]
+
+
+def make_handler(cfg: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, body):
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _read_body(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            try:
+                return json.loads(self.rfile.read(n) or b"{}")
+            except ValueError:
+                return {}
+
+        def _generation_time(self, tokens) -> float:
+            # Non-streaming calls still take as long as producing every token
+            return len(tokens) / cfg.tokens_per_s if cfg.tokens_per_s > 0 else 0.0
+
+        def _stream(self, content_type: str, frames):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            gap = 1.0 / cfg.tokens_per_s if cfg.tokens_per_s > 0 else 0.0
+            for frame in frames:
+                data = frame.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+                if gap:
+                    time.sleep(gap)
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._json(200, {"models": [{"name": "stub"}]})
+            elif self.path == "/v1/models":
+                self._json(200, {"data": [{"id": "stub"}]})
+            else:
+                self._json(404, {"error": "not found"})
+
+        def do_POST(self):
+            body = self._read_body()
+            if self.path == "/api/generate":
+                prompt = body.get("prompt", "")
+            elif self.path == "/v1/chat/completions":
+                prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+            else:
+                self._json(404, {"error": "not found"})
+                return
+            delay, fail = cfg.draw()
+            time.sleep(delay)
+            if fail:
+                self._json(503, {"error": "stub overloaded"})
+                return
+            tokens = cfg.tokens_for(prompt)
+            model = body.get("model", "stub")
+            if self.path == "/api/generate":
+                # Ollama streams by default
+                if body.get("stream", True):
+                    frames = [json.dumps({"model": model, "response": t, "done": False}) + "\n" for t in tokens]
+                    frames.append(json.dumps({"model": model, "response": "", "done": True}) + "\n")
+                    self._stream("application/x-ndjson", frames)
+                else:
+                    time.sleep(self._generation_time(tokens))
+                    # Opaque conversation state, as Ollama returns for follow-up requests
+                    context = body.get("context", []) + list(range(len(prompt.split()) + len(tokens)))
+                    self._json(200, {"model": model, "response": "".join(tokens), "done": True,
+                                     "context": context})
+            elif body.get("stream"):
+                frames = [
+                    "data: " + json.dumps({"choices": [{"delta": {"content": t}, "index": 0}]}) + "\n\n"
+                    for t in tokens
+                ]
+                frames.append("data: [DONE]\n\n")
+                self._stream("text/event-stream", frames)
+            else:
+                time.sleep(self._generation_time(tokens))
+                self._json(200, {
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": {"completion_tokens": len(tokens)},
+                })
+
+    return Handler
+
+
+def serve(port: int, cfg: StubConfig, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread and return the server (port 0 picks a free port)"""
+    server = ThreadingHTTPServer((host, port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="stub-llm").start()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11500)
+    ap.add_argument("--latency-ms", type=float, default=400, help="time to first token")
+    ap.add_argument("--jitter-ms", type=float, default=100)
+    ap.add_argument("--tokens", type=int, default=64, help="tokens per completion")
+    ap.add_argument("--tokens-per-s", type=float, default=200, help="token rate, streamed or not (0 = off)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    cfg = StubConfig(args.latency_ms, args.jitter_ms, args.tokens, args.tokens_per_s, args.error_rate, args.seed)
+    srv = serve(args.port, cfg, args.host)
+    print(f"🤖 Stub LLM on http://{args.host}:{srv.server_address[1]} "
+          f"({args.latency_ms:.0f}±{args.jitter_ms:.0f}ms, {args.tokens} tokens)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
@@ -0,0 +1,17 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Modules live at the repo root (no installed package)
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Modules that build an Assistant at import (server.py) must not touch the real stores
+_STORAGE = tempfile.mkdtemp(prefix="pa-tests-")
+atexit.register(shutil.rmtree, _STORAGE, ignore_errors=True)
+os.environ.setdefault("RAG_STORAGE_DIR", os.path.join(_STORAGE, "rag_storage"))
+os.environ.setdefault("TODO_DB", os.path.join(_STORAGE, "todo_storage", "todos.db"))
@@ -0,0 +1,130 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from assistant import Assistant, _ConcurrencyLimits
+
+
+def test_limits_per_user_and_guild():
+    limits = _ConcurrencyLimits(per_user=2, per_guild=3)
+    assert limits.acquire("a", "g") is None
+    assert limits.acquire("a", "g") is None
+    assert limits.acquire("a", "g") == "user"
+    assert limits.acquire("b", "g") is None
+    assert limits.acquire("c", "g") == "guild"
+    assert limits.acquire("c", None) is None  # a DM does not count against the guild
+    limits.release("a", "g")
+    assert limits.acquire("c", "g") is None
+
+
+def test_refused_acquire_takes_no_slot():
+    limits = _ConcurrencyLimits(per_user=5, per_guild=1)
+    assert limits.acquire("a", "g") is None
+    assert limits.acquire("b", "g") == "guild"
+    limits.release("a", "g")
+    assert limits._active == {}
+
+
+def test_zero_means_unlimited():
+    limits = _ConcurrencyLimits(per_user=0, per_guild=0)
+    assert all(limits.acquire("a", "g") is None for _ in range(100))
+
+
+class Gate:
+    """Stand-in for Assistant._dispatch that blocks until released and counts calls"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, q):
+        with self._lock:
+            self.calls.append(q)
+        assert self.release.wait(5)
+        if q == "todo list boom":
+            raise RuntimeError("backend down")
+        return {"answer": f"answer to {q}", "skill": "todo"}
+
+    def wait_calls(self, n, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while len(self.calls) < n and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert len(self.calls) >= n
+
+
+@pytest.fixture
+def assistant(monkeypatch):
+    a = Assistant()
+    gate = Gate()
+    monkeypatch.setattr(a, "_dispatch", gate)
+    a.limits = _ConcurrencyLimits(per_user=0, per_guild=0)
+    return a, gate
+
+
+def _followers(a, n):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with a._flights_lock:
+            if sum(f.followers for f in a._flights.values()) >= n:
+                return
+        time.sleep(0.005)
+    raise AssertionError("followers never joined")
+
+
+def test_identical_queries_share_one_computation(assistant):
+    a, gate = assistant
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(a.handle, "Todo  LIST", user="u1") for _ in range(8)]
+        gate.wait_calls(1)
+        _followers(a, 7)
+        gate.release.set()
+        results = [f.result() for f in futures]
+    assert gate.calls == ["Todo  LIST"]
+    assert sum(bool(r.get("coalesced")) for r in results) == 7
+    assert {r["answer"] for r in results} == {"answer to Todo  LIST"}
+    assert a._flights == {}
+
+
+def test_partitions_and_side_effects_are_not_coalesced(assistant):
+    a, gate = assistant
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(a.handle, "todo list", user="u1"), pool.submit(a.handle, "todo list", user="u2"),
+                   pool.submit(a.handle, "todo add milk", user="u1"), pool.submit(a.handle, "todo add milk", user="u1")]
+        gate.wait_calls(4)
+        gate.release.set()
+        assert not any(f.result().get("coalesced") for f in futures)
+
+
+def test_leader_error_reaches_followers(assistant):
+    a, gate = assistant
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(a.handle, "todo list boom", user="u1") for _ in range(3)]
+        gate.wait_calls(1)
+        _followers(a, 2)
+        gate.release.set()
+        for f in futures:
+            with pytest.raises(RuntimeError, match="backend down"):
+                f.result()
+    assert len(gate.calls) == 1
+
+
+def test_busy_reply_when_the_user_is_at_its_limit(assistant):
+    a, gate = assistant
+    a.limits = _ConcurrencyLimits(per_user=1, per_guild=0)
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(a.handle, "todo list", user="u1")
+        gate.wait_calls(1)
+        # A coalesced follower needs no slot of its own, new work does
+        follower = pool.submit(a.handle, "todo list", user="u1")
+        _followers(a, 1)
+        busy = a.handle("todo add milk", user="u1")
+        gate.release.set()
+        other = a.handle("todo add milk", user="u2")
+        assert first.result()["answer"] == "answer to todo list"
+        assert follower.result()["coalesced"]
+    assert busy["skill"] == "busy" and "user" in busy["answer"]
+    assert other["answer"] == "answer to todo add milk"
+    assert a.limits._active == {}
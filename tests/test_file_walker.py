@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from skills.file_walker import FileWalker, IgnoreRules, parse_gitignore
+
+
+def _ignored(text, rel, is_dir=False, base="/repo"):
+    rules = IgnoreRules(tuple(parse_gitignore(text, base)))
+    return rules.ignored(os.path.join(base, *rel.split("/")), is_dir)
+
+
+@pytest.mark.parametrize("pattern,rel,is_dir,expected", [
+    ("*.log", "app.log", False, True),
+    ("*.log", "deep/nested/app.log", False, True),
+    ("*.log", "app.log.txt", False, False),
+    ("/build", "build", True, True),
+    ("/build", "src/build", True, False),
+    ("docs/*.md", "docs/a.md", False, True),
+    ("docs/*.md", "docs/sub/a.md", False, False),
+    ("docs/**/*.md", "docs/sub/deeper/a.md", False, True),
+    ("**/tmp", "a/b/tmp", True, True),
+    ("cache/", "cache", True, True),
+    ("cache/", "cache", False, False),
+    ("file?.txt", "file1.txt", False, True),
+    ("file?.txt", "file10.txt", False, False),
+    ("[ab].txt", "a.txt", False, True),
+    ("[!ab].txt", "a.txt", False, False),
+    ("# comment", "# comment", False, False),
+])
+def test_gitignore_patterns(pattern, rel, is_dir, expected):
+    assert _ignored(pattern, rel, is_dir) is expected
+
+
+def test_last_matching_rule_wins():
+    text = "*.log\n!keep.log\n"
+    assert _ignored(text, "drop.log")
+    assert not _ignored(text, "keep.log")
+    assert _ignored(text + "keep.log\n", "keep.log")
+
+
+def test_rules_only_apply_below_their_directory():
+    rules = IgnoreRules(tuple(parse_gitignore("*.log", "/repo/sub")))
+    assert rules.ignored("/repo/sub/app.log", False)
+    assert not rules.ignored("/repo/app.log", False)
+
+
+def _tree(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data if isinstance(data, bytes) else data.encode())
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / ".git").mkdir()
+    _tree(tmp_path, {
+        ".gitignore": "*.log\nsecret/\n!important.log\n",
+        "README.md": "readme",
+        "app.log": "noise",
+        "important.log": "kept",
+        "src/main.py": "print('hi')",
+        "src/.gitignore": "generated_*.py\n",
+        "src/generated_api.py": "x = 1",
+        "secret/key.txt": "hunter2",
+        "node_modules/lib/index.js": "module.exports = 1",
+        "data/blob.txt": b"\0\1\2binary",
+        "data/big.txt": "x" * 2048,
+    })
+    return tmp_path
+
+
+@pytest.mark.parametrize("threads", [1, 4])
+def test_walk_prunes_ignored_denied_binary_and_large(repo, threads):
+    walker = FileWalker(max_bytes=1024, threads=threads)
+    found = sorted(p.relative_to(repo).as_posix() for p, _ in walker.walk(repo))
+    assert found == [".gitignore", "README.md", "important.log", "src/.gitignore", "src/main.py"]
+    assert walker.stats.binary == 1
+    assert walker.stats.too_large == 1
+    assert walker.stats.ignored >= 4  # app.log, secret/, node_modules/, generated_api.py
+
+
+def test_walk_without_gitignore(repo):
+    walker = FileWalker(max_bytes=0, gitignore=False, threads=1)
+    found = {p.relative_to(repo).as_posix() for p, _ in walker.walk(repo)}
+    assert {"app.log", "secret/key.txt", "src/generated_api.py", "data/big.txt"} <= found
+    assert "node_modules/lib/index.js" not in found
+
+
+def test_accept_filter_and_sizes(repo):
+    walker = FileWalker(accept=lambda name: name.endswith(".py"), threads=1)
+    assert [(p.relative_to(repo).as_posix(), size) for p, size in walker.walk(repo)] == [("src/main.py", 11)]
+
+
+def test_allowed_matches_walk(repo):
+    walker = FileWalker(max_bytes=1024, threads=1)
+    assert walker.allowed(repo / "src" / "main.py", repo)
+    assert not walker.allowed(repo / "src" / "generated_api.py", repo)
+    assert not walker.allowed(repo / "secret" / "key.txt", repo)
+    assert not walker.allowed(repo / "node_modules" / "lib" / "index.js", repo)
+    assert walker.allowed(repo / "important.log", repo)
+    assert not walker.allowed(repo / "app.log", repo)
+    # Rules from the enclosing repository apply without passing the root
+    assert not walker.allowed(repo / "src" / "generated_api.py")
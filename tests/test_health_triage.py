@@ -0,0 +1,81 @@
+import pytest
+
+from skills.health_triage import EMERGENCY, ROUTINE, URGENT, HealthTriageSkill, scan_symptoms
+
+
+def _found(text):
+    return [(m.symptom, m.negated) for m in scan_symptoms(text)]
+
+
+@pytest.mark.parametrize("text,expected", [
+    # A cue's scope ends at the next clause, so a later red flag is still raised
+    ("pt is a 40 yo with no known allergies presenting with chest pain", [("chest pain", False)]),
+    ("no chest pain but short of breath", [("chest pain", True), ("shortness of breath", False)]),
+    ("no fever, cough", [("fever", True), ("cough", False)]),
+    ("no fever and chest pain", [("fever", True), ("chest pain", False)]),
+    ("denies nausea, reports chest pressure", [("nausea", True), ("chest pain", False)]),
+    # ... and at the first symptom it reaches, unless the list goes on with or/nor
+    ("denies fever or chills", [("fever", True), ("fever", True)]),
+    ("not dizzy nor nauseous", [("dizziness", True), ("nausea", True)]),
+    ("without headache fatigue", [("headache", True), ("fatigue", False)]),
+    # Only within NEGATION_WINDOW words
+    ("no idea why but I have had for three days a cough", [("cough", False)]),
+    ("negative for chest pain", [("chest pain", True)]),
+    ("without a headache", [("headache", True)]),
+    ("I know my back pain is bad", [("back pain", False)]),
+])
+def test_negation_scope(text, expected):
+    assert _found(text) == expected
+
+
+@pytest.mark.parametrize("text", ["I sob every night", "temperature normal", "took my temperature"])
+def test_ambiguous_words_are_not_symptoms(text):
+    assert scan_symptoms(text) == []
+
+
+def test_raised_temperature_is_fever():
+    assert _found("running a temperature since monday") == [("fever", False)]
+
+
+def test_tiers_and_longest_synonym():
+    found = scan_symptoms("severe headache, sweating and a cough; difficulty breathing")
+    assert [(m.symptom, m.tier) for m in found] == [
+        ("severe headache", URGENT), ("sweating", URGENT), ("cough", ROUTINE), ("shortness of breath", EMERGENCY),
+    ]
+
+
+def _sections(text):
+    return HealthTriageSkill().handle(f"triage {text}")
+
+
+def test_emergency_is_flagged():
+    out = _sections("pt is a 40 yo with no known allergies presenting with chest pain")
+    assert "Potential Red Flags Detected:\n- chest pain" in out
+    assert "call local emergency services" in out
+
+
+def test_urgent_without_emergency():
+    out = _sections("confused and sweaty, no chest pain")
+    assert "Potential Red Flags" not in out
+    assert "Symptoms Worth Prompt Attention:" in out
+    assert "Denied / Negated:\n- chest pain" in out
+
+
+def test_routine_only():
+    out = _sections("headache, cough")
+    assert "Recognized Symptoms:\n- headache [routine]\n- cough [routine]" in out
+    assert "Red Flags" not in out and "Prompt Attention" not in out
+
+
+def test_affirmed_mention_wins_over_negated_one():
+    out = _sections("no chest pain at rest, chest pain when walking")
+    assert "Denied / Negated" not in out
+    assert "- chest pain [emergency]" in out
+
+
+def test_routing():
+    skill = HealthTriageSkill()
+    assert skill.can_handle("triage headache")
+    assert skill.can_handle("Triage help")
+    assert not skill.can_handle("triaged")
+    assert "not medical advice" in skill.handle("triage help")
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+import llm_backends
+from llm_backends import CLOSED, HALF_OPEN, OPEN, Backend, CircuitBreaker, Completion, LLMRouter
+
+
+class FakeBackend(Backend):
+    def __init__(self, name, delay=0.0, fail=False):
+        super().__init__()
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def complete(self, prompt, timeout, options=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} down")
+        return Completion(f"{self.name}: {prompt}", self.name)
+
+    def probe(self):
+        return not self.fail
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=2, reset_s=60)
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow() and not breaker.available()
+
+
+def test_half_open_admits_a_single_trial():
+    breaker = CircuitBreaker(failures=1, reset_s=0.0)
+    breaker.record_failure()
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow() and not breaker.available()
+    breaker.record_failure()  # the trial failed: open again
+    assert breaker.state == OPEN
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.failures == 0
+
+
+def test_concurrent_callers_share_one_half_open_trial():
+    breaker = CircuitBreaker(failures=1, reset_s=0.0)
+    breaker.record_failure()
+    admitted = []
+    threads = [threading.Thread(target=lambda: admitted.append(breaker.allow())) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert admitted.count(True) == 1
+
+
+def _router(*backends, hedge=False):
+    return LLMRouter(list(backends), timeout=5, hedge=hedge, probe_interval=0)
+
+
+def test_fails_over_to_the_next_backend():
+    down, up = FakeBackend("down", fail=True), FakeBackend("up")
+    assert _router(down, up).complete("hi") == Completion("up: hi", "up")
+    assert down.breaker.failures == 1 and down.last_error == "down down"
+
+
+def test_reasons_when_nothing_can_answer():
+    assert _router().generate("hi") == "(LLM not configured)"
+    down = FakeBackend("down", fail=True)
+    router = _router(down)
+    assert router.generate("hi") == "(LLM unavailable: all backends failed)"
+    down.breaker.state, down.breaker.opened_at = OPEN, time.monotonic()
+    assert router.generate("hi") == "(LLM unavailable: all backends tripped)"
+    assert down.calls == 1
+
+
+def test_ordering_prefers_healthy_then_fast_backends():
+    slow, fast, flaky = FakeBackend("slow"), FakeBackend("fast"), FakeBackend("flaky")
+    slow.latency.add(2.0)
+    fast.latency.add(0.1)
+    flaky.latency.add(0.01)
+    flaky.breaker.failures = 1
+    assert [b.name for b in _router(slow, fast, flaky)._ordered()] == ["fast", "slow", "flaky"]
+
+
+def test_hedged_request_returns_the_first_success(monkeypatch):
+    monkeypatch.setattr(llm_backends, "LLM_HEDGE_MIN_S", 0.05)
+    stuck, spare = FakeBackend("stuck", delay=1.0), FakeBackend("spare")
+    stuck.latency.add(0.01)
+    spare.latency.add(0.02)
+    start = time.monotonic()
+    out = _router(stuck, spare, hedge=True).complete("hi")
+    assert out.backend == "spare"
+    assert time.monotonic() - start < 0.5
+    assert stuck.calls == spare.calls == 1
+
+
+@pytest.mark.parametrize("hedge", [False, True])
+def test_fast_first_backend_needs_no_second_call(hedge):
+    first, second = FakeBackend("first"), FakeBackend("second")
+    first.latency.add(0.01)
+    second.latency.add(0.02)
+    assert _router(first, second, hedge=hedge).complete("hi").backend == "first"
+    assert second.calls == 0
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from skills.base import Scope, current_scope, scoped
+from skills.rag import _PrimaryHealth, _with_timeout, _WriteJournal
+
+
+def _entry(i):
+    return {"content": f"doc {i}", "metadata": {"path": f"p{i}"}, "source": "text"}
+
+
+def test_journal_survives_a_restart(tmp_path):
+    journal = _WriteJournal(tmp_path / "journal.jsonl")
+    for i in range(3):
+        assert journal.append(_entry(i))
+    assert not journal.append(_entry(3), unless=lambda: True)
+    assert _WriteJournal(tmp_path / "journal.jsonl").pending == 3
+
+
+def test_replay_keeps_the_unapplied_tail(tmp_path):
+    journal = _WriteJournal(tmp_path / "journal.jsonl")
+    for i in range(4):
+        journal.append(_entry(i))
+    seen = []
+
+    def apply(entry):
+        if entry["content"] == "doc 2":
+            raise ConnectionError("still down")
+        seen.append(entry["content"])
+
+    switched = []
+    applied, error = journal.replay(apply, then=lambda: switched.append(True))
+    assert [e["content"] for e in applied] == seen == ["doc 0", "doc 1"]
+    assert isinstance(error, ConnectionError) and not switched
+    assert journal.pending == 2
+    applied, error = journal.replay(lambda entry: None, then=lambda: switched.append(True))
+    assert [e["content"] for e in applied] == ["doc 2", "doc 3"]
+    assert error is None and switched == [True] and journal.pending == 0
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_outage_trips_offline_then_replays_and_recovers(tmp_path):
+    journal = _WriteJournal(tmp_path / "journal.jsonl")
+    up = threading.Event()
+    probes, replayed, dropped = [], [], []
+
+    def probe():
+        probes.append(1)
+        if not up.is_set():
+            raise ConnectionError("refused")
+
+    health = _PrimaryHealth(probe, journal, replay=replayed.append, interval=0.01, threshold=2,
+                            replayed=dropped.extend)
+    health.record_failure(ConnectionError("refused"))
+    assert health.online
+    health.record_failure(ConnectionError("refused"))
+    assert not health.online and health.last_error == "refused"
+    journal.append(_entry(1))
+    _wait(lambda: len(probes) >= 2)
+    assert not health.online
+    up.set()
+    _wait(lambda: health.online)
+    assert [e["content"] for e in replayed] == [e["content"] for e in dropped] == ["doc 1"]
+    assert journal.pending == 0 and health.failures == 0
+
+
+def test_recover_replays_a_journal_left_by_a_previous_run(tmp_path):
+    journal = _WriteJournal(tmp_path / "journal.jsonl")
+    journal.append(_entry(1))
+    replayed = []
+    health = _PrimaryHealth(lambda: None, journal, replay=replayed.append, interval=0.01)
+    health.recover()
+    assert not health.online
+    _wait(lambda: health.online)
+    assert len(replayed) == 1
+
+
+def test_with_timeout_keeps_the_scope_and_gives_up_on_hung_calls():
+    with scoped(Scope(user="42")):
+        assert _with_timeout(current_scope, 1.0).user == "42"
+    with pytest.raises(TimeoutError):
+        _with_timeout(time.sleep, 0.05, 1.0)
+    with pytest.raises(KeyError):
+        _with_timeout({}.__getitem__, 1.0, "missing")
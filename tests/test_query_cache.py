@@ -0,0 +1,50 @@
+import numpy as np
+
+from skills.rag import _simple_embed, _tokenize
+from skills.rag_query_cache import QueryCache, querying
+
+
+def test_values_come_from_the_original_text():
+    cache = QueryCache(8)
+    a = cache.get("vector", "Hello\nWorld", _simple_embed, key=str.lower)
+    b = cache.get("vector", "hello world", _simple_embed, key=str.lower)
+    assert np.array_equal(a, _simple_embed("Hello\nWorld"))
+    assert np.array_equal(b, _simple_embed("hello world"))
+    assert cache.get("vector", "HELLO\nWORLD", _simple_embed, key=str.lower) is a
+    assert cache.stats()["by_kind"]["vector"] == (1, 2)
+
+
+def test_lexical_keys_ignore_case_and_whitespace():
+    cache = QueryCache(8)
+    first = cache.get("lexical", "Circuit  Breaker", _tokenize)
+    assert cache.get("lexical", "circuit breaker", _tokenize) is first
+    assert first == ("circuit", "breaker")
+
+
+def test_lru_bound_and_disabled_cache():
+    cache = QueryCache(2)
+    for q in ("a", "b", "c"):
+        cache.get("lexical", q, list)
+    assert cache.stats()["entries"] == 2
+    calls = []
+    off = QueryCache(0)
+    off.get("lexical", "x", calls.append)
+    off.get("lexical", "x", calls.append)
+    assert calls == ["x", "x"]
+
+
+def test_wrapped_embedder_only_caches_queries():
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [float(len(text))]
+
+    cached = QueryCache(8).wrap("primary", embed)
+    cached("chunk")
+    cached("chunk")
+    with querying():
+        assert cached("Query") == [5.0]
+        assert cached("Query") == [5.0]
+        cached("query")  # the primary's embedder may be case-sensitive
+    assert calls == ["chunk", "chunk", "Query", "query"]
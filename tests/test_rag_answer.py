@@ -0,0 +1,69 @@
+import pytest
+
+from skills.rag_answer import approx_tokens, build_prompt, followup_prompt, pack_context, _truncate
+
+
+def _words(n, word="token"):
+    return " ".join([word] * n)
+
+
+@pytest.mark.parametrize("text,tokens", [
+    ("", 0),
+    ("hi there", 3),
+    ("internationalization", 5),  # pieces of up to four characters
+    ("f(x) = 1;", 7),
+])
+def test_approx_tokens(text, tokens):
+    assert approx_tokens(text) == tokens
+
+
+def test_truncate_cuts_at_a_word_boundary():
+    assert _truncate("alpha beta gamma delta", 0) == ""
+    assert _truncate("alpha beta gamma delta", 100) == "alpha beta gamma delta"
+    out = _truncate("alpha beta gamma delta", 4)
+    assert out == "alpha beta …"
+    assert approx_tokens(out) == 4
+    assert approx_tokens(_truncate("alpha beta gamma delta", 1)) == 1
+
+
+def test_passages_keep_rank_order_and_skip_duplicates():
+    packed = pack_context([("a.md", "first   passage"), ("b.md", "second passage"), ("c.md", "first passage")],
+                          budget=200)
+    assert packed.sources == ["a.md", "b.md"]
+    assert packed.text == "[1] a.md\nfirst passage\n\n[2] b.md\nsecond passage"
+    assert packed.tokens == approx_tokens(packed.text)
+    assert packed.dropped == 0
+
+
+def test_budget_is_respected():
+    passages = [(f"doc{i}.md", _words(100, f"w{i}")) for i in range(10)]
+    for budget in (50, 150, 333, 1000):
+        packed = pack_context(passages, budget=budget)
+        assert packed.tokens == approx_tokens(packed.text) <= budget
+        assert len(packed.sources) + packed.dropped == 10
+
+
+def test_oversized_best_passage_is_truncated_rather_than_dropped():
+    packed = pack_context([("big.md", _words(500)), ("small.md", "short answer")], budget=120)
+    assert packed.sources[0] == "big.md"
+    assert "…" in packed.text
+    assert packed.tokens <= 120
+
+
+def test_slivers_are_dropped():
+    packed = pack_context([("a.md", _words(90)), ("b.md", _words(80, "other"))], budget=110)
+    assert packed.sources == ["a.md"] and packed.dropped == 1
+
+
+def test_digest_identifies_the_context():
+    a = pack_context([("a.md", "same text")])
+    assert a.digest == pack_context([("a.md", "same   text")]).digest
+    assert a.digest != pack_context([("b.md", "same text")]).digest
+
+
+def test_prompts():
+    packed = pack_context([("a.md", "The sky is blue.")])
+    prompt = build_prompt(packed, "What colour is the sky?")
+    assert "[1] a.md\nThe sky is blue." in prompt
+    assert prompt.endswith("Question: What colour is the sky?\nAnswer:")
+    assert "What is it?" in followup_prompt("What is it?")
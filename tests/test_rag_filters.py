@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from skills.rag import _FallbackStore
+from skills.rag_filters import MetaColumns, SearchFilter, parse_filters
+
+NOW = 1_000_000.0
+
+
+def test_parse_filters_splits_tokens_from_query():
+    flt, rest = parse_filters("rag ask ext:py,.MD source:file since:2h how does it work", now=NOW)
+    assert rest == "rag ask how does it work"
+    assert flt.exts == ("py", "md")
+    assert flt.sources == ("file",)
+    assert flt.since == NOW - 7200
+
+
+def test_parse_filters_paths_are_absolute():
+    flt, rest = parse_filters('path:"some dir" question')
+    assert flt.paths == (os.path.abspath("some dir"),)
+    assert rest == "question"
+
+
+def test_parse_filters_rejects_bad_since():
+    with pytest.raises(ValueError):
+        parse_filters("since:yesterdayish question")
+
+
+def test_empty_filter_is_falsy():
+    assert not SearchFilter()
+    assert SearchFilter(exts=("py",))
+
+
+def test_matches_row_at_a_time():
+    flt = SearchFilter(exts=("py",), paths=("/srv/code",), since=NOW)
+    assert flt.matches("/srv/code/a.py", added=NOW)
+    assert not flt.matches("/srv/codebase/a.py", added=NOW)
+    assert not flt.matches("/srv/code/a.md", added=NOW)
+    assert not flt.matches("/srv/code/a.py", added=NOW - 1)
+
+
+def test_mask_by_columns():
+    meta = MetaColumns().reserve(4, 0)
+    rows = [("/srv/code/a.py", "file", NOW), ("/srv/code/sub/b.py", "file", NOW - 100),
+            ("/srv/docs/c.md", "file", NOW), ("pasted", "text", NOW)]
+    for row, (path, source, added) in enumerate(rows):
+        meta.set(row, path, source, added)
+
+    def source_of(row):
+        return rows[row][0]
+
+    assert list(meta.mask(SearchFilter(exts=("py",)), 4, source_of)) == [True, True, False, False]
+    assert list(meta.mask(SearchFilter(paths=("/srv/code",)), 4, source_of)) == [True, True, False, False]
+    assert list(meta.mask(SearchFilter(paths=("/srv/code/a.py",)), 4, source_of)) == [True, False, False, False]
+    assert list(meta.mask(SearchFilter(sources=("text",)), 4, source_of)) == [False, False, False, True]
+    assert list(meta.mask(SearchFilter(since=NOW), 4, source_of)) == [True, False, True, True]
+    assert not meta.mask(SearchFilter(exts=("rs",)), 4, source_of).any()
+
+
+def test_filtered_store_search(tmp_path):
+    store = _FallbackStore(tmp_path)
+    store.add_docs([
+        ("def handler(event): return event", "/srv/code/handler.py#0", "file"),
+        ("The handler processes every incoming event.", "/srv/docs/handler.md#0", "file"),
+        ("handler handler handler", "pasted", "text"),
+    ])
+    hits = store.search("handler", k=5, flt=SearchFilter(exts=("md",)))
+    assert [h[0] for h in hits] == ["/srv/docs/handler.md#0"]
+    hits = store.search("handler", k=5, flt=SearchFilter(paths=("/srv/code/handler.py",)))
+    assert [h[0] for h in hits] == ["/srv/code/handler.py#0"]
+    hits = store.lexical_search("handler", k=5, flt=SearchFilter(sources=("text",)))
+    assert [h[0] for h in hits] == ["pasted"]
+    store.remove(["/srv/docs"])
+    assert store.search("handler", k=5, flt=SearchFilter(exts=("md",))) == []
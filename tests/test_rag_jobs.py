@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+
+import pytest
+
+import skills.rag_jobs as rag_jobs
+from skills.rag_jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, IngestJob, JobQueue
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_progress_rate_and_summary():
+    job = IngestJob("/data", shard="guild-1")
+    job.state = RUNNING
+    job.started_at = time.time() - 2
+    job.files_total, job.bytes_total = 4, 4000
+    job.file_done(1000, True)
+    job.file_done(1000, False)
+    assert (job.files_seen, job.indexed, job.skipped, job.bytes) == (2, 1, 1, 2000)
+    assert job.rate() == pytest.approx(1000, rel=0.05)
+    assert job.eta() == pytest.approx(2, rel=0.05)
+    d = job.to_dict()
+    assert d["shard"] == "guild-1" and d["state"] == RUNNING and d["eta_s"] is not None
+    assert "2/4 files, 1 indexed, 1 skipped" in job.summary()
+
+
+def test_jobs_run_and_record_their_outcome():
+    def run(job):
+        if job.path == "bad":
+            raise OSError("unreadable")
+        job.file_done(10, True)
+
+    jobs = JobQueue(run, workers=2)
+    good, bad = jobs.submit("good"), jobs.submit("bad")
+    _wait(lambda: good.state == DONE and bad.state == FAILED)
+    assert good.indexed == 1 and good.finished_at >= good.started_at
+    assert bad.error == "unreadable"
+    assert [j.id for j in jobs.list()] == [good.id, bad.id]
+    assert jobs.get(good.id) is good and jobs.get("nope") is None
+
+
+def test_cancel_running_and_queued_jobs():
+    started = threading.Event()
+
+    def run(job):
+        started.set()
+        while True:
+            job.check()
+            time.sleep(0.01)
+
+    jobs = JobQueue(run, workers=1)
+    running, waiting = jobs.submit("a"), jobs.submit("b")
+    assert started.wait(5)
+    assert jobs.cancel(waiting.id).state == CANCELLED  # never started
+    assert waiting.state == CANCELLED and waiting.started_at is None
+    jobs.cancel(running.id)
+    _wait(lambda: running.state == CANCELLED)
+    assert jobs.cancel("nope") is None
+
+
+def test_full_queue_refuses_new_jobs():
+    release = threading.Event()
+    jobs = JobQueue(lambda job: release.wait(5), workers=1, depth=1)
+    first = jobs.submit("a")
+    _wait(lambda: first.state != QUEUED)
+    jobs.submit("b")
+    with pytest.raises(queue.Full):
+        jobs.submit("c")
+    assert jobs.pending() == 1
+    release.set()
+
+
+def test_only_recent_finished_jobs_are_kept(monkeypatch):
+    monkeypatch.setattr(rag_jobs, "KEEP_FINISHED", 2)
+    jobs = JobQueue(lambda job: None, workers=1)
+    for i in range(5):
+        job = jobs.submit(str(i))
+        _wait(lambda: job.state == DONE)
+    jobs.submit("last")
+    paths = [j.path for j in jobs.list()]
+    # "last" may finish before the prune, then "3" goes too
+    assert paths in (["3", "4", "last"], ["4", "last"])
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from skills.rag import _FallbackStore
+from skills.rag_snapshot import (
+    KEEP_GENERATIONS, Snapshot, current_generation, load_snapshot, publish_from, snapshot_root, writer_lock,
+)
+
+DOCS = [
+    ("Writers publish snapshots atomically.", "/srv/docs/a.md#0", "file", 1000.0),
+    ("Readers never block on writers.", "/srv/docs/a.md#1", "file", 1001.0),
+    ("Ünïcode text survives the round trip ✓", "note", "text", 1002.0),
+]
+
+
+@pytest.fixture(params=["float32", "float16", "int8"])
+def store(request, tmp_path):
+    s = _FallbackStore(tmp_path / "live", dtype=request.param)
+    s.add_docs(DOCS)
+    return s
+
+
+def _same(a: _FallbackStore, b: _FallbackStore):
+    assert dict(a.iter_docs()) == dict(b.iter_docs())
+    va, vb = a.view(), b.view()
+    assert np.array_equal(va.emb[:va.n], vb.emb[:vb.n])
+    assert np.allclose(va.scales[:va.n], vb.scales[:vb.n])
+    assert a.search("who blocks readers", k=3) == b.search("who blocks readers", k=3)
+
+
+def test_export_import_roundtrip(store, tmp_path):
+    assert store.export(tmp_path / "export") == len(DOCS)
+    snap = Snapshot(tmp_path / "export", verify=True)
+    assert snap.dtype == store.dtype
+    assert [m["source"] for m in snap.metas] == ["file", "file", "text"]
+    loaded = _FallbackStore.from_snapshot(tmp_path / "copy", snap)
+    _same(store, loaded)
+    v = loaded.view()
+    assert list(v.meta.added[:v.n]) == [1000.0, 1001.0, 1002.0]
+
+
+def test_export_skips_tombstoned_rows(store, tmp_path):
+    store.remove(["/srv/docs/a.md"])
+    assert store.export(tmp_path / "export") == 1
+    assert [m["id"] for m in Snapshot(tmp_path / "export").metas] == ["note"]
+
+
+def test_checksum_mismatch_is_rejected(store, tmp_path):
+    store.export(tmp_path / "export")
+    with open(tmp_path / "export" / "content.bin", "r+b") as f:
+        f.seek(8)
+        f.write(b"X")
+    with pytest.raises(ValueError, match="checksum"):
+        Snapshot(tmp_path / "export", verify=True)
+
+
+def test_mapped_store_copies_on_write(store, tmp_path):
+    root = snapshot_root(tmp_path / "shared")
+    with writer_lock(root):
+        name = store.publish(root)
+    assert current_generation(root) == name
+    loaded = _FallbackStore.from_snapshot(tmp_path / "shared", load_snapshot(root))
+    assert not loaded.view().emb.flags.writeable
+    loaded.add_docs([("One more document after mapping.", "extra", "text")])
+    assert len(loaded) == len(DOCS) + 1
+    assert dict(loaded.iter_docs())["note"] == DOCS[2][0]
+    # The published generation is untouched
+    assert len(load_snapshot(root).metas) == len(DOCS)
+
+
+def test_generations_advance_and_prune(store, tmp_path):
+    root = snapshot_root(tmp_path / "shared")
+    store.export(tmp_path / "export")
+    names = []
+    with writer_lock(root):
+        for _ in range(KEEP_GENERATIONS + 2):
+            names.append(publish_from(root, tmp_path / "export"))
+    assert names == [f"gen-{i:08d}" for i in range(1, KEEP_GENERATIONS + 3)]
+    assert current_generation(root) == names[-1]
+    assert sorted(p.name for p in root.glob("gen-*")) == names[-KEEP_GENERATIONS:]
+    assert load_snapshot(root).generation == len(names)
@@ -0,0 +1,160 @@
+import random
+
+import numpy as np
+import pytest
+
+from skills.rag import COMPACT_MIN, _FallbackStore, _quantize, _simple_embed
+from skills.rag_budget import MemoryBudget
+from skills.rag_snapshot import Snapshot
+
+DOCS = [
+    ("def connect(host, port):\n    return socket.create_connection((host, port))", "/srv/code/net.py#0", "file"),
+    ("The quarterly report shows revenue growth in every region.", "/srv/docs/report.md#0", "file"),
+    ("Snapshots are published atomically by swapping the CURRENT pointer.", "/srv/docs/snap.md#0", "file"),
+    ("Remember to water the tomato plants every morning before work.", "garden note", "text"),
+]
+
+
+def _store(tmp_path, dtype="float32", **kwargs):
+    store = _FallbackStore(tmp_path, dtype=dtype, **kwargs)
+    store.add_docs(DOCS)
+    return store
+
+
+@pytest.mark.parametrize("mode", ["float32", "float16", "int8"])
+def test_quantize_roundtrip(mode):
+    vec = _simple_embed("reciprocal rank fusion merges result lists")
+    q, scale = _quantize(vec, mode)
+    assert q.dtype == np.dtype(mode)
+    assert np.allclose(q.astype(np.float32) * scale, vec, atol=0.01)
+
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_quantized_search_ranks_exact_text_first(tmp_path, dtype):
+    store = _store(tmp_path, dtype)
+    assert store.view().emb.dtype == np.dtype(dtype)
+    for content, doc_id, _ in DOCS:
+        hits = store.search(content, k=2)
+        assert hits[0][0] == doc_id
+        assert hits[0][2] == content
+
+
+WORDS = ("alpha beta gamma delta index query snapshot writer reader vector token embed cache shard "
+         "guild user file chunk search rank fusion score model local fast slow").split()
+
+
+def _corpus(n=1500, queries=100):
+    rng = random.Random(1)
+    docs = [(" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))), f"d{i}", "text") for i in range(n)]
+    qs = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))) for _ in range(queries)]
+    return docs, qs
+
+
+def _top(store, queries, k=5):
+    return [[h[0] for h in store.search(q, k=k)] for q in queries]
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_rescore_agrees_with_float32_store(tmp_path, dtype):
+    docs, queries = _corpus()
+    exact = _FallbackStore(tmp_path / "f32", "float32")
+    exact.add_docs(docs)
+    store = _FallbackStore(tmp_path / dtype, dtype, rescore=4)
+    store.add_docs(docs)
+    expected = _top(exact, queries)
+    assert _top(store, queries) == expected
+    hits, want = store.search(queries[0], k=5), exact.search(queries[0], k=5)
+    assert np.allclose([h[1] for h in hits], [h[1] for h in want], atol=1e-5)
+
+    # The float32 copies survive a snapshot round trip and compaction
+    store.export(tmp_path / "export")
+    loaded = _FallbackStore.from_snapshot(tmp_path / "loaded", Snapshot(tmp_path / "export", verify=True))
+    assert _top(loaded, queries) == expected
+    store.remove([f"d{i}" for i in range(0, len(docs), 2)])
+    exact.remove([f"d{i}" for i in range(0, len(docs), 2)])
+    store._maybe_compact(force=True)
+    assert store.view().exact_ref[:store.view().n].min() >= 0
+    assert _top(store, queries) == _top(exact, queries)
+
+
+def test_without_exact_vectors_ranking_stays_quantized(tmp_path):
+    docs, queries = _corpus(300, 20)
+    plain = _FallbackStore(tmp_path / "plain", "int8", rescore=0)
+    plain.add_docs(docs)
+    assert plain.view().exact is None
+    # An older snapshot without exact.npy maps fine; its rows just skip rescoring
+    plain.export(tmp_path / "export")
+    loaded = _FallbackStore.from_snapshot(tmp_path / "loaded", Snapshot(tmp_path / "export"))
+    assert loaded.view().exact is not None
+    assert _top(loaded, queries) == _top(plain, queries)
+
+
+def test_replace_and_remove_tombstone_rows(tmp_path):
+    store = _store(tmp_path)
+    store.add_docs([("Snapshots are now copied, not swapped.", "/srv/docs/snap.md#0", "file")],
+                   replace=["/srv/docs/snap.md"])
+    assert len(store) == len(DOCS)
+    ids = {doc_id for doc_id, _ in store.iter_docs()}
+    contents = dict(store.iter_docs())
+    assert contents["/srv/docs/snap.md#0"].startswith("Snapshots are now copied")
+    assert store.remove(["/srv/docs"]) == 2
+    assert {doc_id for doc_id, _ in store.iter_docs()} == ids - {"/srv/docs/report.md#0", "/srv/docs/snap.md#0"}
+    assert all(not h[0].startswith("/srv/docs") for h in store.search("quarterly report", k=5))
+
+
+def test_old_view_survives_writes(tmp_path):
+    store = _store(tmp_path)
+    before = store.view()
+    store.remove(["/srv/code/net.py"])
+    store.clear()
+    assert before.live == len(DOCS)
+    assert before.ids[:before.n] == [d[1] for d in DOCS]
+
+
+def test_compaction_drops_tombstones(tmp_path):
+    store = _FallbackStore(tmp_path)
+    n = COMPACT_MIN + 10
+    store.add_docs((f"document number {i}", f"/d/{i}.txt#0", "file") for i in range(n))
+    store.remove([f"/d/{i}.txt" for i in range(n - 5)])
+    v = store.view()
+    assert v.n == v.live == 5
+    assert sorted(doc_id for doc_id, _ in store.iter_docs()) == sorted(f"/d/{i}.txt#0" for i in range(n - 5, n))
+
+
+def test_lexical_search(tmp_path):
+    store = _store(tmp_path)
+    hits = store.lexical_search("tomato plants", k=2)
+    assert hits[0][0] == "garden note"
+
+
+def test_budget_evicts_oldest_to_spill_and_restores(tmp_path):
+    store = _FallbackStore(tmp_path)
+    store.add_docs((f"old note {i} " + "x" * 200, f"note{i}", "text", 1000.0 + i) for i in range(10))
+    used = sum(store.memory_usage().values())
+    store.budget = MemoryBudget(limit=used, policy="oldest")
+    store.add_docs([("fresh note " + "y" * 200, "fresh", "text")])
+    ids = {doc_id for doc_id, _ in store.iter_docs()}
+    assert "fresh" in ids and "note0" not in ids and "note9" in ids
+    assert sum(store.memory_usage().values()) <= used
+    assert store.memory_usage()["embeddings"] == store._per_vec() * len(store)
+    spilled = list(store.spill.take())
+    assert [r["id"] for r in spilled] == [f"note{i}" for i in range(len(spilled))]
+    assert spilled[0]["added"] == 1000.0
+    assert store.spill.pending() == (0, 0)
+
+    store.budget = MemoryBudget(limit=0)
+    store.add_docs([(r["content"], r["id"], r["source"], r["added"]) for r in spilled])
+    assert len(store) == 11
+    v = store.view()
+    row = v.ids.index("note0")
+    assert v.meta.added[row] == 1000.0
+
+
+def test_quota_policy_only_evicts_sources_over_quota(tmp_path):
+    store = _FallbackStore(tmp_path)
+    store.budget = MemoryBudget(limit=0, policy="quota", quotas={"discord_attachment": 2000})
+    store.add_docs((f"attachment {i} " + "z" * 300, f"att{i}", "discord_attachment") for i in range(10))
+    store.add_docs((f"file {i} " + "w" * 300, f"/f/{i}.txt#0", "file") for i in range(10))
+    ids = {doc_id for doc_id, _ in store.iter_docs()}
+    assert all(f"/f/{i}.txt#0" in ids for i in range(10))
+    assert 0 < sum(doc_id.startswith("att") for doc_id in ids) < 10
@@ -0,0 +1,129 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from skills.file_walker import FileWalker
+from skills.rag_watch import DirectoryWatcher, _Inotify, _Poller
+
+BACKENDS = [False, pytest.param(True, marks=pytest.mark.skipif(not sys.platform.startswith("linux"),
+                                                                reason="inotify needs Linux"))]
+
+
+def _txt(name: str) -> bool:
+    return name.endswith(".txt")
+
+
+def _tree(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(data)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    (tmp_path / ".git").mkdir()
+    _tree(tmp_path, {
+        ".gitignore": "generated/\n*.tmp.txt\n",
+        "notes.txt": "notes",
+        "docs/guide.txt": "guide",
+        "node_modules/pkg/readme.txt": "dependency",
+        ".git/description.txt": "vcs",
+        "generated/out.txt": "build output",
+        "docs/scratch.tmp.txt": "ignored file",
+    })
+    return tmp_path
+
+
+class Recorder:
+    def __init__(self):
+        self.changed = set()
+        self.removed = set()
+        self._cond = threading.Condition()
+
+    def __call__(self, changed, removed):
+        with self._cond:
+            self.changed.update(changed)
+            self.removed.update(removed)
+            self._cond.notify_all()
+        return len(changed)
+
+    def wait_for(self, predicate, timeout=5.0):
+        with self._cond:
+            assert self._cond.wait_for(lambda: predicate(self), timeout), (self.changed, self.removed)
+
+    def reset(self):
+        with self._cond:
+            self.changed.clear()
+            self.removed.clear()
+
+
+@pytest.fixture(params=BACKENDS, ids=["poll", "inotify"])
+def watched(request, repo):
+    rec = Recorder()
+    watcher = DirectoryWatcher(repo, rec, accept=_txt, debounce=0.05, max_delay=1.0, poll=0.05,
+                               use_inotify=request.param, walker=FileWalker(accept=_txt, threads=1))
+    if request.param and watcher.backend != "inotify":
+        watcher.stop()
+        pytest.skip("inotify unavailable")
+    yield repo, watcher, rec
+    watcher.stop()
+
+
+def test_add_modify_delete_are_reported(watched):
+    repo, watcher, rec = watched
+    new = repo / "docs" / "new.txt"
+    new.write_text("fresh")
+    rec.wait_for(lambda r: new in r.changed)
+    rec.reset()
+    guide = repo / "docs" / "guide.txt"
+    guide.write_text("guide, second edition")
+    rec.wait_for(lambda r: guide in r.changed)
+    rec.reset()
+    (repo / "notes.txt").unlink()
+    rec.wait_for(lambda r: repo / "notes.txt" in r.removed)
+    assert watcher.batches >= 3 and not watcher.last_error
+
+
+def test_new_subdirectories_are_watched(watched):
+    repo, _, rec = watched
+    deep = repo / "fresh" / "deeper"
+    deep.mkdir(parents=True)
+    time.sleep(0.2)  # let inotify pick up the new directories before writing into them
+    (deep / "a.txt").write_text("a")
+    rec.wait_for(lambda r: deep / "a.txt" in r.changed)
+
+
+def test_pruned_directories_and_ignored_files_are_not_reported(watched):
+    repo, _, rec = watched
+    for rel in ("node_modules/pkg/index.txt", ".git/HEAD.txt", "generated/more.txt", "docs/scratch.tmp.txt"):
+        (repo / rel).write_text("noise")
+    (repo / "node_modules" / "fresh").mkdir()
+    (repo / "node_modules" / "fresh" / "x.txt").write_text("noise")
+    marker = repo / "docs" / "marker.txt"
+    marker.write_text("real change")
+    rec.wait_for(lambda r: marker in r.changed)
+    time.sleep(0.2)
+    assert rec.changed == {marker}
+
+
+def test_poller_never_descends_into_pruned_directories(repo):
+    poller = _Poller(repo, _txt, FileWalker(accept=_txt, threads=1))
+    assert {Path(p).relative_to(repo).as_posix() for p in poller.state} == {"notes.txt", "docs/guide.txt"}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify needs Linux")
+def test_inotify_only_watches_directories_the_walker_enters(repo):
+    try:
+        ino = _Inotify(repo, FileWalker(accept=_txt, threads=1))
+    except OSError:
+        pytest.skip("inotify unavailable")
+    try:
+        assert sorted(p.relative_to(repo).as_posix() for p in ino.dirs.values()) == [".", "docs"]
+        assert ino.add_tree(repo / "node_modules") == []
+        assert ino.ignored(repo / "docs" / "scratch.tmp.txt")
+    finally:
+        ino.close()
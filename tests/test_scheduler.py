@@ -0,0 +1,76 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from scheduler import Job, Scheduler, load_jobs
+
+
+class RecordingAssistant:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def handle(self, query, **kwargs):
+        with self._lock:
+            self.calls.append((query, kwargs))
+        return {"answer": f"ran {query}"}
+
+
+def test_runs_act_as_the_cli_caller():
+    assistant = RecordingAssistant()
+    out = []
+    scheduler = Scheduler(assistant, [Job("ns", "rag jobs", 0.01)], echo=out.append,
+                          namespace="team", operator=True)
+    asyncio.run(scheduler.run(2))
+    assert assistant.calls == [("rag jobs", {"namespace": "team", "operator": True})] * 2
+    assert len(out) == 2 and out[0].endswith("ns: ran rag jobs")
+
+
+class SlowAssistant:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = 0
+
+    def handle(self, query, **kwargs):
+        self.calls += 1
+        time.sleep(self.seconds)
+        return {"answer": "done"}
+
+
+def test_iterations_count_started_runs_not_skipped_ticks():
+    assistant = SlowAssistant(0.12)
+    job = Job("slow", "todo list", 0.05)
+    out = []
+    asyncio.run(Scheduler(assistant, [job], echo=out.append).run(3))
+    assert assistant.calls == job.runs == 3
+    assert job.skipped >= 1
+    assert any("previous run still active" in line for line in out)
+
+
+def test_timed_out_runs_count_as_failures():
+    job = Job("hung", "todo list", 0.05, timeout=0.05)
+    out = []
+    asyncio.run(Scheduler(SlowAssistant(0.2), [job], echo=out.append).run(1))
+    assert job.failures == 1
+    assert any("timed out" in line for line in out)
+
+
+def test_jobs_run_concurrently():
+    jobs = [Job(f"j{i}", "todo list", 10) for i in range(4)]
+    start = time.monotonic()
+    asyncio.run(Scheduler(SlowAssistant(0.2), jobs, echo=lambda line: None).run(1))
+    assert time.monotonic() - start < 0.6
+
+
+def test_load_jobs_validates_entries(tmp_path):
+    path = tmp_path / "jobs.json"
+    path.write_text(json.dumps({"jobs": [{"cmd": "todo list", "every": 5, "output": "file:/tmp/x"}]}))
+    (job,) = load_jobs(str(path))
+    assert (job.name, job.every, job.output) == ("job1", 5.0, "file:/tmp/x")
+    for bad in ({"jobs": []}, {"jobs": [{"cmd": "x"}]}, {"jobs": [{"cmd": "x", "every": 0}]}):
+        path.write_text(json.dumps(bad))
+        with pytest.raises(ValueError):
+            load_jobs(str(path))
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+import skills.rag as rag
+from skills.base import Scope, scoped
+from skills.rag_jobs import JobQueue
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    monkeypatch.setattr(rag, "SHARD_BY", "guild")
+    monkeypatch.setattr(server, "OPERATOR_TOKEN", "s3cret")
+    release = threading.Event()
+    queue = JobQueue(lambda job: release.wait(5), workers=1)
+    monkeypatch.setattr(server.rag, "jobs", queue)
+    mine = queue.submit("/data/a", shard="guild-1")
+    theirs = queue.submit("/data/b", shard="guild-2")
+    yield mine, theirs
+    release.set()
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def test_job_listing_only_shows_visible_shards(client, jobs):
+    mine, theirs = jobs
+    listed = client.get("/rag/jobs", params={"user": "u1", "guild": "1"}).json()["jobs"]
+    assert [j["id"] for j in listed] == [mine.id]
+    assert client.get("/rag/jobs", params={"namespace": "elsewhere"}).json()["jobs"] == []
+
+
+def test_operator_token_sees_every_job(client, jobs):
+    listed = client.get("/rag/jobs", headers={"X-Operator-Token": "s3cret"}).json()["jobs"]
+    assert {j["id"] for j in listed} == {job.id for job in jobs}
+    wrong = client.get("/rag/jobs", headers={"X-Operator-Token": "guess"}).json()["jobs"]
+    assert wrong == []
+
+
+def test_other_tenants_jobs_can_neither_be_read_nor_cancelled(client, jobs):
+    mine, theirs = jobs
+    params = {"user": "u1", "guild": "1"}
+    assert client.get(f"/rag/jobs/{mine.id}", params=params).json()["id"] == mine.id
+    assert client.get(f"/rag/jobs/{theirs.id}", params=params).status_code == 404
+    assert client.delete(f"/rag/jobs/{theirs.id}", params=params).status_code == 404
+    assert not theirs.cancelled
+    assert client.delete(f"/rag/jobs/{theirs.id}", params={"guild": "2"}).status_code == 200
+    assert theirs.cancelled
+
+
+@pytest.mark.parametrize("path", ["/etc", "../../outside", "exports/../../.."])
+def test_snapshot_paths_must_stay_in_the_export_dir(client, path):
+    for endpoint in ("/rag/export", "/rag/import"):
+        res = client.post(endpoint, json={"path": path, "namespace": "team"})
+        assert res.status_code == 400, (endpoint, path)
+
+
+def test_export_path_resolves_inside_the_export_dir():
+    assert server._export_path("team/2026") == str(server.EXPORT_DIR / "team" / "2026")
+
+
+def test_jobs_and_shards_listings_are_not_shared_across_callers(monkeypatch):
+    monkeypatch.setattr(rag, "SHARD_BY", "guild")
+
+    def key(text, scope):
+        with scoped(scope):
+            return server.rag.partition_key(text)
+
+    a, b = Scope(user="1", guild="7"), Scope(user="2", guild="7")
+    assert key("rag ask hello", a) == key("rag ask hello", b)
+    for text in ("rag jobs", "rag shards"):
+        assert key(text, a) != key(text, b)
+        assert key(text, a) != key(text, a._replace(operator=True))
+    assert server.assistant._flight_key("rag jobs cancel abc") is None
@@ -0,0 +1,64 @@
+import pytest
+
+import skills.rag as rag
+from skills.base import Scope, current_scope, scoped
+from skills.rag import DEFAULT_SHARD, shard_for, visible_to
+
+
+@pytest.mark.parametrize("shard_by,scope,expected", [
+    ("guild", Scope(), DEFAULT_SHARD),
+    ("guild", Scope(user="42"), "user-42"),
+    ("guild", Scope(user="42", guild="7", channel="9"), "guild-7"),
+    ("channel", Scope(user="42", guild="7", channel="9"), "guild-7-channel-9"),
+    ("channel", Scope(user="42", guild="7"), "guild-7"),
+    ("user", Scope(user="42", guild="7"), "user-42"),
+    ("none", Scope(user="42", guild="7"), DEFAULT_SHARD),
+    ("guild", Scope(user="42", namespace="team/a b"), "ns-team_a_b"),
+    ("guild", Scope(user="../../etc"), "user-.._.._etc"),
+])
+def test_shard_for(monkeypatch, shard_by, scope, expected):
+    monkeypatch.setattr(rag, "SHARD_BY", shard_by)
+    assert shard_for(scope) == expected
+
+
+def test_shard_names_stay_inside_the_storage_dir(monkeypatch):
+    monkeypatch.setattr(rag, "SHARD_BY", "guild")
+    assert "/" not in shard_for(Scope(user="a/../../b"))
+
+
+def test_visibility_within_a_guild(monkeypatch):
+    monkeypatch.setattr(rag, "SHARD_BY", "channel")
+    me = Scope(user="42", guild="7", channel="9")
+    assert visible_to(me, DEFAULT_SHARD)
+    assert visible_to(me, "guild-7-channel-9")
+    assert visible_to(me, "guild-7-channel-10")
+    assert visible_to(me, "guild-7")
+    assert visible_to(me, "user-42")
+    assert not visible_to(me, "guild-70")
+    assert not visible_to(me, "guild-8-channel-9")
+    assert not visible_to(me, "user-43")
+    assert not visible_to(me, "ns-7")
+
+
+def test_visibility_for_dms_and_namespaces(monkeypatch):
+    monkeypatch.setattr(rag, "SHARD_BY", "guild")
+    assert visible_to(Scope(user="42"), "user-42")
+    assert not visible_to(Scope(user="42"), "guild-7")
+    assert visible_to(Scope(namespace="team"), "ns-team")
+    assert not visible_to(Scope(namespace="team"), "ns-other")
+    assert not visible_to(Scope(), "user-42")
+
+
+def test_only_operators_see_everything():
+    assert not visible_to(Scope(user="42"), "user-43")
+    assert visible_to(Scope(operator=True), "user-43")
+    assert visible_to(Scope(user="42", operator=True), "guild-8-channel-1")
+
+
+def test_scoped_restores_previous_scope():
+    outer = Scope(user="1")
+    with scoped(outer):
+        with scoped(Scope(user="2")):
+            assert current_scope().user == "2"
+        assert current_scope() is outer
+    assert current_scope() == Scope()
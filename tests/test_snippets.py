@@ -0,0 +1,56 @@
+import random
+import re
+
+import pytest
+
+from skills.snippets import _LEAD, best_passage, render
+
+FILLER = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+
+def _doc(rng, n, terms):
+    return " ".join(rng.choice(terms) if rng.random() < 0.05 else rng.choice(FILLER) for _ in range(n))
+
+
+def test_window_covering_most_distinct_terms_wins():
+    doc = ("alpha " + "filler " * 60 + "alpha alpha alpha " + "filler " * 60
+           + "alpha beta gamma " + "filler " * 60)
+    snip = best_passage(doc, "alpha beta gamma", width=80)
+    assert {"alpha", "beta", "gamma"} <= set(snip.text.split())
+    assert [doc[off:off + n] for off, n in snip.matches] == ["alpha", "beta", "gamma"]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_a_brute_force_search(seed):
+    rng = random.Random(seed)
+    terms = ["apple", "banana", "cherry", "date"]
+    doc = _doc(rng, 800, terms)
+    width = 120
+    snip = best_passage(doc, " ".join(terms), width=width)
+    hits = [(m.start(), m.group()) for m in re.finditer(r"[a-z0-9_]{2,}", doc) if m.group() in terms]
+    span = width - 2 * _LEAD
+    best = max(len({t for p, t in hits if start <= p < start + span}) for start, _ in hits)
+    found = {doc[off:off + n] for off, n in snip.matches}
+    assert len(found) >= best
+
+
+def test_header_is_skipped_and_no_hits_gives_the_start():
+    doc = "# File: a.py\n# Type: python\n\nbody text here and more body text"
+    snip = best_passage(doc, "nothing matches", width=10)
+    assert snip.text == "body text " and snip.matches == []
+    assert render(snip, doc) == "body text…"
+
+
+def test_render_highlights_terms_and_marks_cuts():
+    doc = "x " * 100 + "the quick brown fox jumps " + "y " * 100
+    snip = best_passage(doc, "Fox QUICK", width=70)
+    out = render(snip, doc)
+    assert "**quick**" in out and "**fox**" in out
+    assert out.startswith("…") and out.endswith("…")
+    assert "\n" not in out
+
+
+def test_words_are_not_cut_at_the_window_start():
+    doc = "supercalifragilistic " * 10 + "needle " + "hay " * 50
+    snip = best_passage(doc, "needle", width=80)
+    assert snip.start == 0 or doc[snip.start - 1] == " "
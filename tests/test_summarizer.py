@@ -0,0 +1,53 @@
+import random
+
+from skills.summarizer import SummarizerSkill, _iter_sentences, summarize
+
+TOPIC = [
+    "The cat sat on the warm mat by the window.",
+    "A cat likes a warm mat and a sunny window.",
+    "Every cat in the house wants the warm window mat.",
+]
+NOISE = [
+    "Quarterly tax filings are due in April.",
+    "The bridge was painted bright orange.",
+]
+
+
+def test_sentence_splitting():
+    assert list(_iter_sentences("One. Two!  Three?\nFour")) == ["One.", "Two!", "Three?", "Four"]
+    assert list(_iter_sentences("   ")) == []
+
+
+def test_short_text_is_returned_whole():
+    text = "First point. Second point."
+    assert summarize(text, max_sentences=3) == text
+
+
+def test_central_sentences_win_and_keep_their_order():
+    text = " ".join([NOISE[0], TOPIC[0], NOISE[1], TOPIC[1], TOPIC[2]])
+    summary = summarize(text, max_sentences=2)
+    picked = [s for s in TOPIC if s in summary]
+    assert len(picked) == 2 and not any(n in summary for n in NOISE)
+    assert summary == " ".join(picked)  # original order
+
+
+def test_character_cap():
+    text = " ".join(TOPIC)
+    summary = summarize(text, max_sentences=3, max_chars=60)
+    assert len(summary) <= 60 and summary in text
+
+
+def test_windowed_ranking_of_long_inputs():
+    rng = random.Random(7)
+    sentences = [rng.choice(NOISE + TOPIC) for _ in range(3000)] + ["Cat mat window warm sunny house cat."]
+    summary = summarize(" ".join(sentences), max_sentences=3, window=50)
+    chosen = list(_iter_sentences(summary))
+    assert len(chosen) == 3
+    assert all(s in sentences for s in chosen)
+
+
+def test_skill_reply():
+    skill = SummarizerSkill(max_sentences=1)
+    assert skill.can_handle("Summarize this")
+    assert skill.handle("summarize    ") == "(nothing to summarize)"
+    assert skill.handle("summarize " + " ".join(TOPIC + NOISE)) in TOPIC
@@ -0,0 +1,120 @@
+import re
+import threading
+from datetime import datetime
+
+import pytest
+
+from skills.base import Scope, scoped
+from skills.todos import TodoSkill, TodoStore, parse_due
+
+NOW = datetime(2026, 10, 19, 12, 0).timestamp()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TodoStore(str(tmp_path / "todos.db"))
+
+
+@pytest.fixture
+def skill(store):
+    return TodoSkill(store)
+
+
+def test_memory_databases_are_rejected():
+    for path in (":memory:", "file:todos?mode=memory"):
+        with pytest.raises(ValueError):
+            TodoStore(path)
+
+
+def test_store_add_list_done_clear(store):
+    a = store.add("u1", "first")
+    b = store.add("u1", "second", due=NOW)
+    store.add("u2", "someone else's")
+    assert [(i, item) for i, item, _ in store.open("u1")] == [(a, "first"), (b, "second")]
+    assert store.done("u1", a)
+    assert not store.done("u1", a)
+    assert not store.done("u2", b)  # only the owner can close it
+    assert [i for i, _, _ in store.open("u1")] == [b]
+    assert store.clear("u1") == 2  # done items included
+    assert store.open("u1") == []
+    assert len(store.open("u2")) == 1
+
+
+def test_due_soon_orders_by_due_date(store):
+    store.add("u", "later", due=NOW + 3600)
+    store.add("u", "no date")
+    store.add("u", "overdue", due=NOW - 60)
+    store.add("u", "far away", due=NOW + 30 * 86400)
+    assert [item for _, item, _ in store.due_soon("u", NOW + 86400)] == ["overdue", "later"]
+
+
+def test_concurrent_writes_are_batched(store):
+    def add(n):
+        for i in range(25):
+            store.add(f"user{n}", f"item {i}")
+
+    threads = [threading.Thread(target=add, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert store.writes == 200
+    assert store.batches <= 200
+    assert all(len(store.open(f"user{n}")) == 25 for n in range(8))
+
+
+def test_a_second_store_sees_committed_writes(store):
+    store.add("u", "shared")
+    other = TodoStore(store.path)
+    assert [item for _, item, _ in other.open("u")] == ["shared"]
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("2h", NOW + 7200),
+    ("in 3d", NOW + 3 * 86400),
+    ("30m", NOW + 1800),
+    ("today", datetime(2026, 10, 19, 23, 59).timestamp()),
+    ("tomorrow", datetime(2026, 10, 20, 23, 59).timestamp()),
+    ("2026-10-25", datetime(2026, 10, 25, 23, 59).timestamp()),
+    ("2026-10-25 17:00", datetime(2026, 10, 25, 17, 0).timestamp()),
+])
+def test_parse_due(value, expected):
+    assert parse_due(value, NOW) == expected
+
+
+def test_parse_due_rejects_text():
+    with pytest.raises(ValueError):
+        parse_due("the office", NOW)
+
+
+def test_skill_partitions_by_caller(skill):
+    with scoped(Scope(user="1")):
+        skill.handle("todo add mine")
+    with scoped(Scope(namespace="team")):
+        skill.handle("todo add ours")
+        assert skill.partition_key() == "ns:team"
+        assert "ours" in skill.handle("todo list")
+        assert "mine" not in skill.handle("todo list")
+    with scoped(Scope(user="1", namespace="team")):
+        assert skill.partition_key() == "user:1"
+        assert "mine" in skill.handle("todo list")
+    assert skill.partition_key() == "local"
+    assert skill.handle("todo list") == "(empty)"
+
+
+def test_skill_due_parsing_keeps_item_text(skill):
+    out = skill.handle("todo add drop by the office due 2d")
+    assert out.startswith("Added: drop by the office (#")
+    assert "(due " in out
+    out = skill.handle("todo add stand by me")
+    assert out.startswith("Added: stand by me (#")
+    assert "(due " not in out
+
+
+def test_skill_done_and_errors(skill):
+    todo_id = int(re.search(r"#(\d+)", skill.handle("todo add write tests")).group(1))
+    assert skill.handle(f"todo done #{todo_id}") == f"Done: {todo_id}"
+    assert skill.handle(f"todo done {todo_id}") == f"No open todo {todo_id}"
+    assert skill.handle("todo due someday").startswith("❌ Bad due date")
+    assert skill.handle("todo frobnicate").startswith("Try:")
+    assert skill.handle("todo clear") == "Cleared"
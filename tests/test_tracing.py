@@ -0,0 +1,72 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+
+def test_spans_outside_a_request_are_free():
+    assert tracing.span("anything") is tracing._NOOP
+    assert tracing.current_trace() is None
+    with tracing.span("anything"):
+        pass
+
+
+def test_nested_spans_depths_totals_and_attrs():
+    with tracing.request("ask") as trace:
+        assert tracing.current_trace() is trace
+        with tracing.span("outer", k=5):
+            with tracing.span("inner"):
+                pass
+            with tracing.span("inner"):
+                pass
+    assert tracing.current_trace() is None
+    out = trace.to_dict()
+    assert [(s["name"], s["depth"]) for s in out["spans"]] == [("outer", 0), ("inner", 1), ("inner", 1)]
+    assert out["spans"][0]["attrs"] == {"k": 5}
+    assert out["totals"]["inner"]["count"] == 2
+    assert out["duration_ms"] >= out["totals"]["outer"]["total_ms"]
+    assert out["dropped_spans"] == 0 and out["profile"] is None
+
+
+def test_bound_pool_work_reports_into_the_request():
+    def work():
+        with tracing.span("pooled"):
+            time.sleep(0.01)
+
+    with tracing.request("ask") as trace, ThreadPoolExecutor(2, thread_name_prefix="pool") as pool:
+        list(pool.map(lambda f: f(), [tracing.bind(work), tracing.bind(work), work]))
+    spans = trace.to_dict()["spans"]
+    assert len(spans) == 2  # the unbound call ran outside the trace
+    assert all(s["thread"].startswith("pool") for s in spans)
+
+
+def test_span_cap_keeps_counting(monkeypatch):
+    monkeypatch.setattr(tracing, "MAX_SPANS", 3)
+    with tracing.request("ask") as trace:
+        for _ in range(10):
+            with tracing.span("step"):
+                pass
+    out = trace.to_dict()
+    assert len(out["spans"]) == 3 and out["dropped_spans"] == 7
+    assert out["totals"]["step"]["count"] == 10
+
+
+def test_forced_profile_is_dumped(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "PROFILE_DIR", tmp_path)
+    with tracing.request("ask", profile=True) as trace:
+        sum(i * i for i in range(1000))
+    assert trace.profile_path and trace.profile_path.endswith(".prof")
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".prof", ".txt"]
+    assert not tracing._profiler_lock.locked()
+
+
+def test_slow_requests_are_logged(monkeypatch, tmp_path, caplog):
+    monkeypatch.setattr(tracing, "PROFILE_SLOW_MS", 0)
+    monkeypatch.setattr(tracing, "PROFILE_DIR", tmp_path)
+    with caplog.at_level(logging.WARNING, logger="assistant.trace"):
+        with tracing.request("ask") as trace:
+            with tracing.span("embed"):
+                pass
+    assert any(trace.id in r.getMessage() and "embed=" in r.getMessage() for r in caplog.records)
+    assert list(tmp_path.iterdir()) == []  # not profiled: nothing to dump
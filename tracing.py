@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Lightweight per-request tracing and on-demand profiling.
+
+A trace lives in a context variable for the duration of one request; code
+marks stages with ``with span("embed"):``. Outside a request span() is a
+shared no-op, so instrumentation costs next to nothing in the CLI or in
+background jobs.
+
+Profiling: a request runs under cProfile when forced (X-Profile header /
+profile=True) or sampled (PA_PROFILE_SAMPLE). Its pstats are dumped to
+logs/profiles/ if it was forced or took longer than PA_PROFILE_SLOW_MS.
+cProfile only sees the request thread; work on pool threads shows up as
+spans instead.
+"""
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+PROFILE_SAMPLE = float(os.getenv("PA_PROFILE_SAMPLE", "0"))      # fraction of requests profiled
+PROFILE_SLOW_MS = float(os.getenv("PA_PROFILE_SLOW_MS", "1000"))  # dump/log threshold
+PROFILE_DIR = Path(os.getenv("PA_PROFILE_DIR", Path(__file__).parent / "logs" / "profiles"))
+MAX_SPANS = 500  # per trace; later spans are only counted in the totals
+
+logger = logging.getLogger("assistant.trace")
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("pa_trace", default=None)
+# Only one cProfile profiler may be active per process
+_profiler_lock = threading.Lock()
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.spans: List[Dict[str, Any]] = []
+        self.totals: Dict[str, List[float]] = {}  # name -> [count, total ms]
+        self.profile_path: Optional[str] = None
+        self._depth = contextvars.ContextVar(f"pa_trace_depth_{self.id}", default=0)
+        self._lock = threading.Lock()
+
+    def record(self, name: str, start: float, end: float, depth: int, attrs: Dict[str, Any]):
+        ms = (end - start) * 1000.0
+        with self._lock:
+            total = self.totals.setdefault(name, [0, 0.0])
+            total[0] += 1
+            total[1] += ms
+            if len(self.spans) < MAX_SPANS:
+                entry = {"name": name, "start_ms": round((start - self.start) * 1000.0, 3),
+                         "duration_ms": round(ms, 3), "depth": depth,
+                         "thread": threading.current_thread().name}
+                if attrs:
+                    entry["attrs"] = attrs
+                self.spans.append(entry)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "id": self.id,
+                "name": self.name,
+                "duration_ms": round(self.duration_ms, 3),
+                "spans": sorted(self.spans, key=lambda s: s["start_ms"]),
+                "totals": {k: {"count": c, "total_ms": round(ms, 3)} for k, (c, ms) in self.totals.items()},
+                "dropped_spans": max(0, sum(int(c) for c, _ in self.totals.values()) - len(self.spans)),
+                "profile": self.profile_path,
+            }
+
+    def summary(self) -> str:
+        parts = sorted(self.totals.items(), key=lambda kv: kv[1][1], reverse=True)
+        return ", ".join(f"{k}={ms:.1f}ms/{int(c)}" for k, (c, ms) in parts[:8])
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "start", "depth", "token")
+
+    def __init__(self, trace: Trace, name: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.depth = self.trace._depth.get()
+        self.token = self.trace._depth.set(self.depth + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        self.trace._depth.reset(self.token)
+        self.trace.record(self.name, self.start, end, self.depth, self.attrs)
+        return False
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs):
+    """Time a stage of the current request (no-op when no trace is active)"""
+    trace = _current.get()
+    return _NOOP if trace is None else _Span(trace, name, attrs)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def bind(fn):
+    """Run fn in a copy of the caller's context, so pool threads report into the same trace"""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
+
+
+def _dump_profile(trace: Trace, prof: cProfile.Profile) -> str:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    base = PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{trace.id}"
+    prof.dump_stats(str(base.with_suffix(".prof")))
+    out = io.StringIO()
+    pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(40)
+    base.with_suffix(".txt").write_text(f"{trace.name} {trace.duration_ms:.1f}ms\n\n{out.getvalue()}",
+                                        encoding="utf-8")
+    return str(base.with_suffix(".prof"))
+
+
+@contextmanager
+def request(name: str, profile: bool = False):
+    """Open a trace for one request; profile it if forced or sampled"""
+    trace = Trace(name)
+    token = _current.set(trace)
+    wanted = profile or (PROFILE_SAMPLE > 0 and random.random() < PROFILE_SAMPLE)
+    prof = None
+    if wanted and _profiler_lock.acquire(blocking=False):
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:  # another profiler (e.g. a debugger) is active
+            prof = None
+            _profiler_lock.release()
+    try:
+        yield trace
+    finally:
+        trace.duration_ms = (time.perf_counter() - trace.start) * 1000.0
+        _current.reset(token)
+        if prof is not None:
+            prof.disable()
+            _profiler_lock.release()
+            if profile or trace.duration_ms >= PROFILE_SLOW_MS:
+                try:
+                    trace.profile_path = _dump_profile(trace, prof)
+                except OSError as e:
+                    logger.warning("Could not write profile for %s: %s", trace.id, e)
+        if trace.duration_ms >= PROFILE_SLOW_MS:
+            logger.warning("Slow request %s (%s) %.1fms: %s", trace.id, trace.name, trace.duration_ms,
+                           trace.summary())